@@ -0,0 +1,61 @@
+"""
+Jira REST mock server for offline benchmarks.
+
+Implements POST /rest/api/3/issue and POST /rest/api/3/issue/bulk.
+
+Configuration (environment):
+    MOCK_JIRA_LATENCY       seconds per request (default 0.2)
+    MOCK_JIRA_ERROR_RATE    fraction of requests answered with 429 (default 0)
+"""
+import asyncio
+import itertools
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("MOCK_JIRA_LATENCY", "0.2"))
+ERROR_RATE = float(os.getenv("MOCK_JIRA_ERROR_RATE", "0"))
+
+app = FastAPI()
+_ids = itertools.count(1)
+stats = {"requests": 0, "issues": 0, "rate_limited": 0}
+
+
+async def _admit():
+    stats["requests"] += 1
+    await asyncio.sleep(LATENCY)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        stats["rate_limited"] += 1
+        return JSONResponse(status_code=429, content={"errorMessages": ["Rate limit exceeded"]}, headers={"Retry-After": "1"})
+    return None
+
+
+def _issue():
+    issue_id = next(_ids)
+    stats["issues"] += 1
+    return {"id": str(issue_id), "key": f"BENCH-{issue_id}", "self": f"/rest/api/3/issue/{issue_id}"}
+
+
+@app.post("/rest/api/3/issue")
+async def create_issue(request: Request):
+    await request.json()
+    rejected = await _admit()
+    if rejected:
+        return rejected
+    return JSONResponse(status_code=201, content=_issue())
+
+
+@app.post("/rest/api/3/issue/bulk")
+async def create_issues_bulk(request: Request):
+    body = await request.json()
+    rejected = await _admit()
+    if rejected:
+        return rejected
+    return JSONResponse(status_code=201, content={"issues": [_issue() for _ in body.get("issueUpdates", [])], "errors": []})
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
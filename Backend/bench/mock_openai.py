@@ -0,0 +1,223 @@
+"""
+OpenAI-compatible mock server for offline benchmarks.
+
+Serves /v1/chat/completions (plain and streaming) with canned answers that
+match what each caller in the backend expects: crew agents, the o3 plan and
+refinement prompts, JSON extraction prompts and code snippets.
+
+Configuration (environment):
+    MOCK_OPENAI_LATENCY        seconds before the first token (default 0.5)
+    MOCK_OPENAI_TOKEN_DELAY    seconds between streamed chunks (default 0.005)
+    MOCK_OPENAI_ERROR_RATE     fraction of requests answered with 429 (default 0)
+    MOCK_OPENAI_MODEL_LATENCY  JSON of per-model latencies, e.g. {"o3": 30}
+    MOCK_OPENAI_CACHE_SPEEDUP  latency saved per cached prompt token share (default 0.5)
+
+Prompt caching is simulated like the real API: prompts of 1024+ tokens
+report the longest previously seen prefix, in 128-token steps, as
+cached_tokens, and answer faster the more of the prompt was cached.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY = float(os.getenv("MOCK_OPENAI_LATENCY", "0.5"))
+TOKEN_DELAY = float(os.getenv("MOCK_OPENAI_TOKEN_DELAY", "0.005"))
+ERROR_RATE = float(os.getenv("MOCK_OPENAI_ERROR_RATE", "0"))
+MODEL_LATENCY = json.loads(os.getenv("MOCK_OPENAI_MODEL_LATENCY", "{}"))
+CACHE_SPEEDUP = float(os.getenv("MOCK_OPENAI_CACHE_SPEEDUP", "0.5"))
+
+# ~4 characters per token, as in _usage
+CACHE_MIN_CHARS = 1024 * 4
+CACHE_STEP_CHARS = 128 * 4
+CACHE_MAX_PREFIXES = 100_000
+_seen_prefixes = {}
+
+SECTION_TITLES = [
+    "Executive Summary & Project Charter",
+    "Business Goals and Objectives",
+    "Work Breakdown Structure (WBS) with Effort Estimation",
+    "Task Dependencies",
+    "Risk Assessment and Mitigation",
+    "Architecture Recommendation",
+    "Timeline and Sprint Plan",
+    "Resource & Team Structure",
+    "Budget & Cost Breakdown",
+    "Quality and Governance",
+    "Best Practices and Modern Trends",
+]
+
+PLAN = "# **Project Plan: Benchmark Project**\n\n" + "\n\n".join(
+    f"### {i}. {title}\n" + "\n".join(f"- **Point {j}** for {title.lower()} with enough text to look realistic." for j in range(1, 9))
+    for i, title in enumerate(SECTION_TITLES, start=1)
+)
+
+TASKS = json.dumps([
+    {"summary": f"Task {i}", "description": f"Implement deliverable {i} described in the plan."} for i in range(1, 9)
+])
+
+BRIEF = json.dumps({
+    "projectName": "Benchmark Project",
+    "projectDescription": "A web platform used for load testing.",
+    "stakeholder": "Operations",
+    "category": "Web",
+    "startDate": "2025-01-01",
+    "expectedDuration": "6",
+    "durationUnit": "months",
+    "teamSize": "6",
+    "budget": "250000 EUR",
+    "experience": "Senior",
+    "locationType": "Remote",
+    "frontend": ["React"],
+    "backend": ["FastAPI"],
+    "database": ["PostgreSQL"],
+    "cloud": ["AWS"],
+    "devops": ["GitHub Actions"],
+    "design": ["Figma"],
+    "otherTech": "",
+})
+
+CATEGORIES = json.dumps([
+    {"name": "Frontend", "tech": ["React"]},
+    {"name": "Backend", "tech": ["FastAPI"]},
+    {"name": "Database", "tech": ["PostgreSQL"]},
+    {"name": "Cloud", "tech": ["AWS"]},
+    {"name": "DevOps", "tech": ["GitHub Actions"]},
+    {"name": "Design", "tech": ["Figma"]},
+])
+
+SNIPPET = json.dumps({"task": "Benchmark task", "language": "Python", "snippet": "def handler():\n    return {'ok': True}"})
+
+app = FastAPI()
+stats = {"requests": 0, "streams": 0, "errors": 0}
+
+
+def _text(messages) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "\n".join(parts)
+
+
+def canned_answer(messages) -> str:
+    text = _text(messages)
+    lowered = text.lower()
+
+    if "map plan feedback" in lowered:
+        return "[9]"
+    if "SECTION TO REVISE" in text:
+        match = re.search(r"SECTION TO REVISE:\n(.+)", text)
+        heading = match.group(1) if match else "### 9. Budget & Cost Breakdown"
+        return f"{heading}\n- **Revised** content for the benchmark."
+    if "extract the following fields" in lowered:
+        return BRIEF
+    if "extract the tech stack" in lowered:
+        return CATEGORIES
+    if '"snippet"' in text:
+        return SNIPPET
+    if "software architect" in lowered or "expert planner and editor" in lowered:
+        return PLAN
+
+    # everything else is a crew agent: JSON task lists or stage analysis
+    if "json" in lowered:
+        answer = TASKS
+    else:
+        answer = "Stage analysis: " + " ".join(f"finding {i}." for i in range(1, 40))
+
+    # CrewAI agents expect the ReAct "Final Answer:" format
+    if "final answer" in lowered:
+        return f"Thought: I now can give a great answer\nFinal Answer: {answer}"
+    return answer
+
+
+def _cached_tokens(model: str, text: str) -> int:
+    """
+    Tokens of the longest prefix seen before (per model); remembers this prompt's prefixes.
+    """
+    if len(text) < CACHE_MIN_CHARS:
+        return 0
+    cached = 0
+    for end in range(CACHE_MIN_CHARS, len(text) + 1, CACHE_STEP_CHARS):
+        digest = hashlib.sha1(f"{model}\0{text[:end]}".encode("utf-8")).digest()
+        if digest in _seen_prefixes:
+            cached = end // 4
+        else:
+            _seen_prefixes[digest] = None
+    while len(_seen_prefixes) > CACHE_MAX_PREFIXES:
+        del _seen_prefixes[next(iter(_seen_prefixes))]
+    return cached
+
+
+def _usage(model, messages, content):
+    text = _text(messages)
+    prompt_tokens = len(text) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": _cached_tokens(model, text)},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(status_code=429, content={"error": {"message": "Rate limit reached", "type": "rate_limit"}})
+
+    model = body.get("model", "mock")
+    messages = body.get("messages", [])
+    content = canned_answer(messages)
+    usage = _usage(model, messages, content)
+    cached_share = usage["prompt_tokens_details"]["cached_tokens"] / max(usage["prompt_tokens"], 1)
+    await asyncio.sleep(MODEL_LATENCY.get(model, LATENCY) * (1 - CACHE_SPEEDUP * cached_share))
+
+    if not body.get("stream"):
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    stats["streams"] += 1
+
+    async def events():
+        for start in range(0, len(content), 16):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_DELAY)
+        final = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [],
+            "usage": usage,
+        }
+        yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
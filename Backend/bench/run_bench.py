@@ -0,0 +1,451 @@
+"""
+Offline load test for the FastAPI backend.
+
+Starts the OpenAI and Jira mocks as subprocesses, serves main.app with uvicorn
+on a background thread and drives every route at a fixed concurrency. For each
+endpoint it reports p50/p95/p99 latency, requests/sec, time to first byte for
+streaming routes and the event-loop lag seen by the server while that endpoint
+was under load. Results are written as JSON tagged with the git commit so runs
+can be compared across commits.
+
+Run from the Backend directory:
+
+    python bench/run_bench.py --concurrency 8 --requests 32
+    python bench/run_bench.py --endpoints generate-project-plan,refine-project-plan
+    python bench/run_bench.py --compare bench/results/<earlier run>.json
+
+The LLM cache, stage reuse and checkpoints are disabled unless --cache is
+given, so every request reaches the mock and the numbers reflect the uncached
+path.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_openai import PLAN  # noqa: E402
+
+PROJECT = {
+    "projectName": "Benchmark Project",
+    "projectDescription": "A web platform used for load testing.",
+    "stakeholder": "Operations",
+    "category": "Web",
+    "startDate": "2025-01-01",
+    "expectedDuration": "6",
+    "durationUnit": "months",
+    "teamSize": "6",
+    "budget": "250000 EUR",
+    "experience": "Senior",
+    "locationType": "Remote",
+    "frontend": ["React"],
+    "backend": ["FastAPI"],
+    "database": ["PostgreSQL"],
+    "cloud": ["AWS"],
+    "devops": ["GitHub Actions"],
+    "design": ["Figma"],
+    "otherTech": "",
+}
+
+FREE_TEXT = (
+    "We are building a customer portal for Operations with React and FastAPI on AWS. "
+    "Six senior engineers, remote, starting January 2025 for six months, budget 250k EUR."
+)
+
+TICKETS = [{"summary": f"Task {i}", "description": f"Implement deliverable {i}."} for i in range(1, 61)]
+
+# (name, method, path, body, kind) where kind is "json", "stream" or "job"
+SCENARIOS = [
+    ("generate-project-plan", "POST", "/api/generate-project-plan", PROJECT, "json"),
+    ("generate-project-plan-free-text", "POST", "/api/generate-project-plan", {"text": FREE_TEXT}, "json"),
+    ("generate-project-plan-stream", "POST", "/api/generate-project-plan/stream", PROJECT, "stream"),
+    ("jobs-project-plan", "POST", "/api/jobs/project-plan", PROJECT, "job"),
+    ("refine-project-plan", "POST", "/api/refine-project-plan",
+     {"original_plan": PLAN, "user_feedback": "Cut the budget by 10%."}, "json"),
+    ("refine-project-plan-stream", "POST", "/api/refine-project-plan/stream",
+     {"original_plan": PLAN, "user_feedback": "Cut the budget by 10%."}, "stream"),
+    ("generate-jira-tickets-from-plan", "POST", "/api/generate-jira-tickets-from-plan", {"plan": PLAN}, "json"),
+    ("generate-jira-tickets-from-plan-stream", "POST", "/api/generate-jira-tickets-from-plan/stream",
+     {"plan": PLAN}, "stream"),
+    ("push-finalized-tickets", "POST", "/api/push-finalized-tickets", TICKETS, "json"),
+    ("saved-tickets", "GET", "/api/saved-tickets?limit=50", None, "json"),
+    ("get-suggested-dev-tasks", "POST", "/api/get-suggested-dev-tasks", {"final_plan": PLAN}, "json"),
+    ("get-suggested-dev-tasks-stream", "POST", "/api/get-suggested-dev-tasks/stream", {"final_plan": PLAN}, "stream"),
+    ("generate-code-snippet", "POST", "/api/generate-code-snippet",
+     {"task_name": "Login API", "task_description": "JWT login endpoint.", "final_plan": PLAN}, "json"),
+    ("generate-code-snippet-batch", "POST", "/api/generate-code-snippet/batch",
+     {"final_plan": PLAN, "tasks": [{"task_name": f"Task {i}", "task_description": f"Implement part {i}."} for i in range(8)]},
+     "stream"),
+    ("get-dev-categories", "POST", "/api/get-dev-categories", {"final_plan": PLAN}, "json"),
+    ("get-tasks-by-category", "POST", "/api/get-tasks-by-category",
+     {"category": "Backend", "final_plan": PLAN}, "json"),
+    ("get-tasks-by-category-stream", "POST", "/api/get-tasks-by-category/stream",
+     {"category": "Backend", "final_plan": PLAN}, "stream"),
+    ("get-tasks-by-category-batch", "POST", "/api/get-tasks-by-category/batch", {"final_plan": PLAN}, "stream"),
+    ("llm-cache-stats", "GET", "/api/llm-cache/stats", None, "json"),
+    ("llm-http-pool-stats", "GET", "/api/llm-http-pool/stats", None, "json"),
+    ("llm-prompt-cache-stats", "GET", "/api/llm-prompt-cache/stats", None, "json"),
+    ("metrics", "GET", "/metrics", None, "json"),
+]
+
+JOB_POLL_SECONDS = 0.05
+LAG_INTERVAL_SECONDS = 0.01
+
+
+# ------------------ HELPERS ------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def git_commit() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_mock(module: str, port: int, env: dict) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--app-dir", BENCH_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    wait_until_up(f"http://127.0.0.1:{port}/stats")
+    return process
+
+
+def app_env(openai_port: int, jira_port: int, workdir: str, cache: bool = False) -> dict:
+    """
+    Environment that points the app at the mocks and keeps its state in `workdir`.
+    """
+    return {
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_BASE": f"http://127.0.0.1:{openai_port}/v1",
+        "JIRA_BASE_URL": f"http://127.0.0.1:{jira_port}",
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench",
+        "JIRA_PROJECT_KEY": "BENCH",
+        "LLM_CACHE_ENABLED": "true" if cache else "false",
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "TICKET_STORE_PATH": os.path.join(workdir, "saved_tickets.sqlite3"),
+        "LEGACY_TICKET_JSON_PATH": os.path.join(workdir, "saved_tickets.json"),
+        "STAGE_REUSE_ENABLED": "true" if cache else "false",
+        "STAGE_REUSE_PATH": os.path.join(workdir, "stage_runs.sqlite3"),
+        "CHECKPOINTS_ENABLED": "true" if cache else "false",
+        "CHECKPOINT_PATH": os.path.join(workdir, "stage_checkpoints.sqlite3"),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+    }
+
+
+class LoopLagMonitor:
+    """
+    Samples event-loop lag on the server loop: how late a short sleep wakes up.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self.running = True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            expected = loop.time() + LAG_INTERVAL_SECONDS
+            await asyncio.sleep(LAG_INTERVAL_SECONDS)
+            self.samples.append((time.monotonic(), max(loop.time() - expected, 0.0)))
+
+    def window(self, start: float, end: float) -> list:
+        return [lag for at, lag in self.samples if start <= at <= end]
+
+
+class AppServer:
+    """
+    main.app under uvicorn on its own thread and event loop, next to a lag monitor.
+    """
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.monitor = LoopLagMonitor()
+        self.thread = threading.Thread(target=self._run, name="bench-server", daemon=True)
+
+    def _run(self):
+        async def serve():
+            monitor = asyncio.create_task(self.monitor.run())
+            await self.server.serve()
+            self.monitor.running = False
+            await monitor
+
+        asyncio.run(serve())
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+# ------------------ LOAD DRIVER ------------------
+
+async def timed_request(client: httpx.AsyncClient, method: str, path: str, body, kind: str) -> dict:
+    started = time.perf_counter()
+    first_byte = None
+
+    if kind == "stream":
+        async with client.stream(method, path, json=body) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+        ok = response.status_code < 400
+    else:
+        response = await client.request(method, path, json=body)
+        ok = response.status_code < 400
+        if kind == "job" and ok:
+            job_id = response.json()["job_id"]
+            while True:
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                status = (await client.get(f"/api/jobs/{job_id}")).json()["status"]
+                if status in ("succeeded", "failed"):
+                    ok = status == "succeeded"
+                    break
+
+    return {"seconds": time.perf_counter() - started, "ttfb": first_byte, "ok": ok, "status": response.status_code}
+
+
+async def run_scenario(client, scenario, requests: int, concurrency: int) -> tuple:
+    name, method, path, body, kind = scenario
+    remaining = iter(range(requests))
+    results = []
+
+    async def worker():
+        for _ in remaining:
+            try:
+                results.append(await timed_request(client, method, path, body, kind))
+            except httpx.HTTPError as e:
+                results.append({"seconds": 0.0, "ttfb": None, "ok": False, "status": type(e).__name__})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return results, time.perf_counter() - started
+
+
+def summarize(results: list, elapsed: float, lags: list) -> dict:
+    latencies = [r["seconds"] for r in results if r["ok"]]
+    ttfbs = [r["ttfb"] for r in results if r["ok"] and r["ttfb"] is not None]
+    summary = {
+        "requests": len(results),
+        "errors": sum(not r["ok"] for r in results),
+        "error_statuses": sorted({str(r["status"]) for r in results if not r["ok"]}),
+        "rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 0.50), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "p99_s": round(percentile(latencies, 0.99), 4),
+        "max_s": round(max(latencies, default=0.0), 4),
+        "loop_lag_p50_ms": round(percentile(lags, 0.50) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+    }
+    if ttfbs:
+        summary["ttfb_p50_s"] = round(percentile(ttfbs, 0.50), 4)
+        summary["ttfb_p95_s"] = round(percentile(ttfbs, 0.95), 4)
+    return summary
+
+
+async def drive(base_url: str, scenarios: list, args, monitor: LoopLagMonitor) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    report = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for scenario in scenarios:
+            name = scenario[0]
+            start = time.monotonic()
+            results, elapsed = await run_scenario(client, scenario, args.requests, args.concurrency)
+            report[name] = summarize(results, elapsed, monitor.window(start, time.monotonic()))
+            print_row(name, report[name])
+    return report
+
+
+# ------------------ REPORTING ------------------
+
+HEADER = f"{'endpoint':40} {'req':>4} {'err':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'lag p99':>9} {'lag max':>9}"
+
+
+def print_row(name: str, s: dict):
+    print(
+        f"{name:40} {s['requests']:>4} {s['errors']:>4} {s['rps']:>8.2f} {s['p50_s']:>8.3f} {s['p95_s']:>8.3f} "
+        f"{s['p99_s']:>8.3f} {s['loop_lag_p99_ms']:>7.1f}ms {s['loop_lag_max_ms']:>7.1f}ms",
+        flush=True,
+    )
+
+
+def print_comparison(current: dict, previous: dict):
+    print(f"\nvs {previous['commit']} ({previous['timestamp']}):")
+    print(f"{'endpoint':40} {'p50':>16} {'p95':>16} {'rps':>16}")
+    for name, now in current["endpoints"].items():
+        before = previous["endpoints"].get(name)
+        if not before:
+            continue
+
+        def delta(field, fmt):
+            old, new = before[field], now[field]
+            change = f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+            return f"{format(new, fmt)} ({change})"
+
+        print(f"{name:40} {delta('p50_s', '.3f'):>16} {delta('p95_s', '.3f'):>16} {delta('rps', '.2f'):>16}")
+
+
+# ------------------ MAIN ------------------
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=32, help="requests per endpoint")
+    parser.add_argument("--endpoints", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock OpenAI seconds per call")
+    parser.add_argument("--model-latency", default="{}", help='per-model mock latency as JSON, e.g. {"o3": 30}')
+    parser.add_argument("--token-delay", type=float, default=0.005, help="mock OpenAI seconds per streamed chunk")
+    parser.add_argument("--jira-latency", type=float, default=0.2, help="mock Jira seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock calls answered with 429")
+    parser.add_argument("--timeout", type=float, default=600.0, help="client timeout per request")
+    parser.add_argument("--cache", action="store_true", help="keep the LLM cache, stage reuse and checkpoints enabled")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"), help="directory for the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.list:
+        for name, method, path, _, kind in SCENARIOS:
+            print(f"{name:40} {method:5} {path} ({kind})")
+        return
+
+    scenarios = SCENARIOS
+    if args.endpoints:
+        wanted = args.endpoints.split(",")
+        unknown = set(wanted) - {s[0] for s in SCENARIOS}
+        if unknown:
+            sys.exit(f"Unknown endpoints: {', '.join(sorted(unknown))} (see --list)")
+        scenarios = [s for s in SCENARIOS if s[0] in wanted]
+
+    openai_port, jira_port, app_port = free_port(), free_port(), free_port()
+    workdir = tempfile.mkdtemp(prefix="plan-bench-")
+    mocks = [
+        start_mock("mock_openai", openai_port, {
+            "MOCK_OPENAI_LATENCY": str(args.llm_latency),
+            "MOCK_OPENAI_TOKEN_DELAY": str(args.token_delay),
+            "MOCK_OPENAI_ERROR_RATE": str(args.error_rate),
+            "MOCK_OPENAI_MODEL_LATENCY": args.model_latency,
+        }),
+        start_mock("mock_jira", jira_port, {
+            "MOCK_JIRA_LATENCY": str(args.jira_latency),
+            "MOCK_JIRA_ERROR_RATE": str(args.error_rate),
+        }),
+    ]
+
+    # must be set before main (and load_dotenv) is imported; .env never overrides these
+    os.environ.update(app_env(openai_port, jira_port, workdir, cache=args.cache))
+    os.environ["JOB_QUEUE_MAX"] = str(max(args.requests * 2, 100))
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    server = None
+    try:
+        import_started = time.perf_counter()
+        from main import app
+        import_seconds = time.perf_counter() - import_started
+
+        server = AppServer(app, app_port)
+        server.start()
+
+        print(HEADER)
+        endpoints = asyncio.run(drive(f"http://127.0.0.1:{app_port}", scenarios, args, server.monitor))
+        mock_stats = {
+            "openai": httpx.get(f"http://127.0.0.1:{openai_port}/stats").json(),
+            "jira": httpx.get(f"http://127.0.0.1:{jira_port}/stats").json(),
+        }
+    finally:
+        if server:
+            server.stop()
+        for mock in mocks:
+            mock.terminate()
+            mock.wait()
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    result = {
+        **git_commit(),
+        "timestamp": timestamp,
+        "python": sys.version.split()[0],
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+            "model_latency": json.loads(args.model_latency),
+            "token_delay": args.token_delay,
+            "jira_latency": args.jira_latency,
+            "error_rate": args.error_rate,
+            "cache": args.cache,
+        },
+        "app_import_seconds": round(import_seconds, 3),
+        "endpoints": endpoints,
+        "mock_stats": mock_stats,
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{timestamp}-{result['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get("config") != result["config"]:
+            print("Warning: runs used different settings, numbers are not directly comparable.")
+        print_comparison(result, previous)
+
+
+if __name__ == "__main__":
+    main()
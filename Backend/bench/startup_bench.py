@@ -0,0 +1,135 @@
+"""
+Cold-start benchmark for the FastAPI backend.
+
+Each run starts a fresh Python process that imports main, serves the app with
+uvicorn against the OpenAI/Jira mocks and sends the first requests. Reported
+per run:
+
+    import      seconds to import main
+    startup     seconds until uvicorn is serving (lifespan included)
+    first_http  first response from /metrics
+    first_llm   first direct OpenAI route (/api/get-dev-categories)
+    first_crew  first crew route (/api/get-suggested-dev-tasks)
+
+The medians are printed and written as JSON tagged with the git commit, next
+to the load test results. Run from the Backend directory:
+
+    python bench/startup_bench.py --runs 5
+    python bench/startup_bench.py --no-preload
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from run_bench import BACKEND_DIR, BENCH_DIR, PLAN, AppServer, app_env, free_port, git_commit, start_mock
+
+HEAVY_MODULES = ["crewai", "litellm", "langchain_openai", "openai", "requests"]
+METRICS = ["import", "startup", "first_http", "first_llm", "first_crew"]
+
+
+def child():
+    """
+    One cold start, run in a fresh interpreter; prints its timings as JSON.
+    """
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    timings = {}
+
+    started = time.perf_counter()
+    from main import app
+    timings["import"] = time.perf_counter() - started
+    loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    port = free_port()
+    server = AppServer(app, port)
+    started = time.perf_counter()
+    server.start()
+    timings["startup"] = time.perf_counter() - started
+
+    requests = [
+        ("first_http", "GET", "/metrics", None),
+        ("first_llm", "POST", "/api/get-dev-categories", {"final_plan": PLAN}),
+        ("first_crew", "POST", "/api/get-suggested-dev-tasks", {"final_plan": PLAN}),
+    ]
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=300.0) as client:
+            for name, method, path, body in requests:
+                started = time.perf_counter()
+                client.request(method, path, json=body).raise_for_status()
+                timings[name] = time.perf_counter() - started
+    finally:
+        server.stop()
+
+    print(json.dumps({"timings": timings, "loaded_at_import": loaded}))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock OpenAI seconds per call")
+    parser.add_argument("--no-preload", action="store_true", help="start with CREW_PRELOAD=false")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results"), help="directory for the JSON results")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child()
+        return
+
+    openai_port, jira_port = free_port(), free_port()
+    mocks = [
+        start_mock("mock_openai", openai_port, {"MOCK_OPENAI_LATENCY": str(args.llm_latency)}),
+        start_mock("mock_jira", jira_port, {}),
+    ]
+
+    runs = []
+    try:
+        for i in range(args.runs):
+            workdir = tempfile.mkdtemp(prefix="plan-startup-")
+            env = {**os.environ, **app_env(openai_port, jira_port, workdir),
+                   "CREW_PRELOAD": "false" if args.no_preload else "true"}
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child"],
+                env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            runs.append(run)
+            print(f"run {i + 1}: " + "  ".join(f"{m} {run['timings'][m]:.3f}s" for m in METRICS))
+    finally:
+        for mock in mocks:
+            mock.terminate()
+            mock.wait()
+
+    medians = {m: round(statistics.median(r["timings"][m] for r in runs), 3) for m in METRICS}
+    print("\nmedian: " + "  ".join(f"{m} {medians[m]:.3f}s" for m in METRICS))
+    print(f"loaded at import: {', '.join(runs[0]['loaded_at_import']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    result = {
+        **git_commit(),
+        "timestamp": timestamp,
+        "python": sys.version.split()[0],
+        "config": {"runs": args.runs, "llm_latency": args.llm_latency, "preload": not args.no_preload},
+        "median": medians,
+        "runs": runs,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"startup-{timestamp}-{result['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
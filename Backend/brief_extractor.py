@@ -0,0 +1,463 @@
+"""
+Rule-based extraction of ProjectInput fields from a free-text brief.
+
+Labeled lines ("Team Size: 5", "- **Budget:** 250k EUR") are read directly,
+everything else falls back to prose patterns and a dictionary of technology
+names. Every field gets a confidence score so the caller only has to ask
+the LLM for the fields the rules could not settle.
+"""
+import re
+from dataclasses import dataclass, field
+
+# Canonical names follow the options of the project form in the frontend.
+TECH_DICTIONARY = {
+    "frontend": {
+        "React": ["react", "react.js", "reactjs"],
+        "Angular": ["angular", "angularjs"],
+        "Vue.js": ["vue", "vue.js", "vuejs"],
+        "Svelte": ["svelte", "sveltekit"],
+        "Next.js": ["next.js", "nextjs"],
+        "Nuxt": ["nuxt", "nuxt.js"],
+        "TypeScript": ["typescript"],
+        "Tailwind CSS": ["tailwind", "tailwindcss"],
+        "Material UI": ["material ui", "material-ui", "mui"],
+        "Redux": ["redux"],
+        "React Native": ["react native"],
+        "Flutter": ["flutter"],
+        "Swift": ["swift", "swiftui"],
+    },
+    "backend": {
+        "Node.js": ["node", "node.js", "nodejs"],
+        "Express": ["express", "express.js"],
+        "NestJS": ["nestjs", "nest.js"],
+        "C#/.NET": [".net", "dotnet", "asp.net", "c#"],
+        "Go": ["golang"],
+        "Python": ["python"],
+        "FastAPI": ["fastapi"],
+        "Django": ["django"],
+        "Flask": ["flask"],
+        "Java": ["java"],
+        "Spring Boot": ["spring boot", "spring"],
+        "Kotlin": ["kotlin"],
+        "Ruby on Rails": ["ruby on rails", "rails"],
+        "PHP": ["php"],
+        "Laravel": ["laravel"],
+        "Rust": ["rust"],
+        "GraphQL": ["graphql"],
+    },
+    "database": {
+        "SQL": ["sql"],
+        "PostgreSQL": ["postgresql", "postgres"],
+        "MySQL": ["mysql"],
+        "MariaDB": ["mariadb"],
+        "SQL Server": ["sql server", "mssql"],
+        "SQLite": ["sqlite"],
+        "MongoDB": ["mongodb", "mongo"],
+        "Firebase": ["firebase", "firestore"],
+        "DynamoDB": ["dynamodb"],
+        "Redis": ["redis"],
+        "Elasticsearch": ["elasticsearch"],
+        "Cassandra": ["cassandra"],
+        "Neo4j": ["neo4j"],
+        "Supabase": ["supabase"],
+    },
+    "cloud": {
+        "AWS": ["aws", "amazon web services"],
+        "Azure": ["azure", "microsoft azure"],
+        "Google Cloud": ["google cloud", "gcp", "google cloud platform"],
+        "Heroku": ["heroku"],
+        "Vercel": ["vercel"],
+        "Netlify": ["netlify"],
+        "DigitalOcean": ["digitalocean", "digital ocean"],
+        "Cloudflare": ["cloudflare"],
+    },
+    "devops": {
+        "Docker": ["docker"],
+        "Kubernetes": ["kubernetes", "k8s"],
+        "Jenkins": ["jenkins"],
+        "GitHub Actions": ["github actions"],
+        "GitLab CI": ["gitlab ci", "gitlab-ci", "gitlab ci/cd"],
+        "CircleCI": ["circleci"],
+        "Terraform": ["terraform"],
+        "Ansible": ["ansible"],
+        "Helm": ["helm"],
+        "Argo CD": ["argocd", "argo cd"],
+        "Prometheus": ["prometheus"],
+        "Grafana": ["grafana"],
+    },
+    "design": {
+        "Figma": ["figma"],
+        "Adobe XD": ["adobe xd"],
+        "Sketch": ["sketch"],
+        "InVision": ["invision"],
+        "Miro": ["miro"],
+        "Storybook": ["storybook"],
+        "Zeplin": ["zeplin"],
+    },
+    "otherTech": {
+        "Stripe": ["stripe"],
+        "Kafka": ["kafka"],
+        "RabbitMQ": ["rabbitmq"],
+        "Auth0": ["auth0"],
+        "Keycloak": ["keycloak"],
+        "Twilio": ["twilio"],
+        "OpenAI API": ["openai"],
+    },
+}
+
+# Aliases that are also everyday English ("a swift rollout", "at the helm"). In
+# prose they only count when capitalized mid-sentence or next to a tech word.
+AMBIGUOUS_ALIASES = {"swift", "express", "spring", "helm", "sketch", "node", "rails", "miro", "flutter", "rust", "flask"}
+TECH_CONTEXT_WORDS = {
+    "framework", "frameworks", "library", "libraries", "language", "stack", "using", "built", "written",
+    "developed", "coded", "backend", "back-end", "frontend", "front-end", "server", "api", "apis", "sdk",
+    "runtime", "app", "apps", "ios", "mobile", "chart", "charts", "cluster", "deployed", "design", "designs",
+    "designed", "mockup", "mockups", "wireframe", "wireframes", "prototypes", "board", "boards",
+}
+
+TECH_FIELDS = ["frontend", "backend", "database", "cloud", "devops", "design"]
+
+# Same order as the fields in the LLM extraction prompt
+BRIEF_FIELDS = [
+    "projectName", "projectDescription", "stakeholder", "category", "startDate", "expectedDuration",
+    "durationUnit", "teamSize", "budget", "experience", "locationType", *TECH_FIELDS, "otherTech",
+]
+
+# Label synonyms for "Label: value" lines, matched case-insensitively
+FIELD_LABELS = {
+    "projectName": ["project name", "project title", "name", "title", "project"],
+    "projectDescription": ["project description", "description", "overview", "summary", "about"],
+    "stakeholder": ["stakeholder", "stakeholders", "client", "customer", "sponsor", "product owner"],
+    "category": ["project category", "category", "project type", "type"],
+    "startDate": ["start date", "start", "starting", "kickoff", "kick-off"],
+    "expectedDuration": ["expected duration", "duration", "timeline", "timeframe", "time frame"],
+    "teamSize": ["team size", "team", "headcount", "developers"],
+    "budget": ["budget", "budget in euros", "cost", "funding"],
+    "experience": ["team experience", "experience", "experience level", "seniority"],
+    "locationType": ["team location type", "location type", "location", "work model", "work mode"],
+    "frontend": ["frontend", "front-end", "front end", "ui", "client side"],
+    "backend": ["backend", "back-end", "back end", "server", "server side", "api"],
+    "database": ["database", "databases", "db", "data store", "storage"],
+    "cloud": ["cloud", "cloud provider", "hosting", "infrastructure"],
+    "devops": ["devops", "ci/cd", "cicd", "deployment"],
+    "design": ["design", "design tools", "ux", "ui/ux", "ux/ui"],
+    "otherTech": ["other tech", "other technologies", "other", "additional tech", "integrations"],
+}
+
+CATEGORIES = {
+    "Internal": ["internal", "in-house", "back office", "back-office"],
+    "Client-facing": ["client-facing", "customer-facing", "client facing", "customer facing", "public-facing"],
+    "R&D": ["r&d", "research", "prototype", "proof of concept", "poc", "experimental"],
+}
+EXPERIENCE_LEVELS = {
+    "Beginner": ["beginner", "junior", "entry-level", "entry level", "graduate"],
+    "Intermediate": ["intermediate", "mid-level", "mid level", "medior"],
+    "Advanced": ["advanced", "senior", "expert"],
+}
+LOCATION_TYPES = {
+    "Remote": ["remote", "distributed", "fully remote"],
+    "Onsite": ["onsite", "on-site", "on site", "in office", "in-office", "co-located"],
+    "Hybrid": ["hybrid"],
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20, "a dozen": 12,
+}
+MONTHS = {
+    name: index for index, names in enumerate(
+        [("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+         ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"),
+         ("november", "nov"), ("december", "dec")], start=1)
+    for name in names
+}
+
+# Confidence levels
+LABELED = 0.95
+PATTERN = 0.8
+WEAK = 0.5
+MISSING = 0.0
+
+_NUMBER = r"\b(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")\b"
+_LABEL_LINE = re.compile(r"^\s*(?:[-*•]\s*|\d+[.)]\s*)?(?:\*\*|__)?([A-Za-z][A-Za-z /&()-]{0,40}?)(?:\*\*|__)?\s*[:：]\s*(?:\*\*|__)?\s*(.*)$")
+# prose only counts with team context ("team of 5", "5 developers", "a 5-person team"),
+# not "5 people per account"
+_TEAM = re.compile(
+    r"team of\s+" + _NUMBER
+    + r"|" + _NUMBER + r"[\s-]+(?:[a-z-]+\s+){0,2}?(?:developer|dev|engineer|fte|team member)s?\b"
+    + r"|" + _NUMBER + r"[\s-]+(?:person|people|member)s?\s+team\b",
+    re.I,
+)
+# a "Team Size:" value is a headcount by itself ("5", "5 people")
+_HEADCOUNT = re.compile(r"\s*" + _NUMBER + r"(?:\s+(?:person|people|member|developer|engineer)s?)?\s*$", re.I)
+_AMOUNT = r"\d+(?:[.,]\d+)*"
+_DURATION = re.compile(_NUMBER + r"[\s-]*(day|week|month|year)s?\b(?!\s+(?:of\s+)?experience)", re.I)
+_BUDGET = re.compile(
+    r"[$€£]\s?" + _AMOUNT + r"(?:\s?(?:k|m|thousand|million)\b)?"
+    r"|\b" + _AMOUNT + r"\s?(?:k|m|thousand|million)?\s?(?:(?:eur(?:os?)?|usd|dollars?|gbp)\b|[€$£])",
+    re.I,
+)
+_START_CUE = re.compile(r"(?:start\w*|begin\w*|kick\w*(?:[\s-]off)?|commenc\w*|from)\W+(?:\w+\W+){0,3}$", re.I)
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_MONTH_DATE = re.compile(r"\b(" + "|".join(MONTHS) + r")\.?\s+(?:(\d{1,2})(?:st|nd|rd|th)?,?\s+)?(\d{4})\b", re.I)
+_QUARTER_DATE = re.compile(r"\bQ([1-4])\s*(\d{4})\b", re.I)
+_NAMED = re.compile(r"(?:called|named|codenamed|project)\s+[\"“']([^\"”']{2,60})[\"”']|(?:called|named)\s+([A-Z][\w-]*(?:\s+[A-Z][\w-]*){0,4})")
+_HEADING = re.compile(r"^\s*#+\s*(.+?)\s*$")
+_GENERIC_HEADINGS = {"brief", "project brief", "overview", "project overview", "project description", "description"}
+
+_SENTENCE_START = re.compile(r"(?:^|[.!?:]\s+|\n[\s#>*•-]*)$")
+_WORD = re.compile(r"[a-z0-9#+]+(?:[.-][a-z0-9#+]+)*")
+
+
+def _alias_pattern(aliases: list):
+    if not aliases:
+        return None
+    return re.compile(r"(?<![\w.#/])(?:" + "|".join(re.escape(a) for a in aliases) + r")(?![\w#])", re.I)
+
+
+# group -> [(canonical, pattern for plain aliases, pattern for ambiguous aliases)]
+_ALIAS_PATTERNS = {
+    group: [
+        (canonical,
+         _alias_pattern([a for a in aliases if a not in AMBIGUOUS_ALIASES]),
+         _alias_pattern([a for a in aliases if a in AMBIGUOUS_ALIASES]))
+        for canonical, aliases in names.items()
+    ]
+    for group, names in TECH_DICTIONARY.items()
+}
+_TECH_WORDS = {
+    alias for names in TECH_DICTIONARY.values() for aliases in names.values()
+    for alias in aliases if alias not in AMBIGUOUS_ALIASES
+}
+_CANONICAL = {
+    alias: canonical for names in TECH_DICTIONARY.values() for canonical, aliases in names.items()
+    for alias in aliases + [canonical.lower()]
+}
+_LABEL_TO_FIELD = {label: name for name, labels in FIELD_LABELS.items() for label in labels}
+
+
+@dataclass
+class BriefExtraction:
+    fields: dict = field(default_factory=dict)
+    confidence: dict = field(default_factory=dict)
+
+    def set(self, name: str, value, confidence: float):
+        if confidence >= self.confidence.get(name, -1):
+            self.fields[name] = value
+            self.confidence[name] = confidence
+
+    def low_confidence(self, threshold: float) -> list:
+        return [name for name in BRIEF_FIELDS if self.confidence.get(name, MISSING) < threshold]
+
+
+# ------------------ VALUE PARSERS ------------------
+
+def _to_number(token: str):
+    token = token.lower().strip()
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    value = float(token)
+    return int(value) if value.is_integer() else value
+
+
+def _first_group(match) -> str:
+    return next(group for group in match.groups() if group)
+
+
+def _match_vocabulary(text: str, vocabulary: dict):
+    lowered = text.lower()
+    for canonical, words in vocabulary.items():
+        if any(re.search(r"(?<!\w)" + re.escape(w) + r"(?!\w)", lowered) for w in [canonical.lower(), *words]):
+            return canonical
+    return None
+
+
+def parse_duration(text: str):
+    match = _DURATION.search(text)
+    if not match:
+        return None
+    amount, unit = _to_number(match.group(1)), match.group(2).lower()
+    if unit == "year":
+        amount, unit = amount * 12, "month"
+    return str(amount), unit + "s"
+
+
+def parse_team_size(text: str):
+    match = _TEAM.search(text)
+    if match:
+        return str(_to_number(_first_group(match)))
+    number = _HEADCOUNT.match(text)
+    return str(_to_number(number.group(1))) if number else None
+
+
+def _date_matches(text: str):
+    for match in _ISO_DATE.finditer(text):
+        yield match.start(), match.group(0)
+    for match in _MONTH_DATE.finditer(text):
+        month = MONTHS[match.group(1).lower()]
+        yield match.start(), f"{match.group(3)}-{month:02d}-{int(match.group(2) or 1):02d}"
+    for match in _QUARTER_DATE.finditer(text):
+        yield match.start(), f"{match.group(2)}-{(int(match.group(1)) - 1) * 3 + 1:02d}-01"
+
+
+def parse_date(text: str):
+    """
+    First date in `text` as YYYY-MM-DD (ISO, "March 3, 2025", "January 2025", "Q2 2025").
+    """
+    return min(_date_matches(text), default=(None, None))[1]
+
+
+def parse_start_date(text: str):
+    """
+    A date in prose counts as the start date only when it follows a cue such as "starting".
+    """
+    for position, date in sorted(_date_matches(text)):
+        if _START_CUE.search(text[max(position - 40, 0):position]):
+            return date
+    return None
+
+
+def split_tech_list(text: str) -> list:
+    """
+    "React, TypeScript and Tailwind" -> canonical names; unknown names are kept as written.
+    """
+    names = []
+    for token in re.split(r",|;|\band\b|\s/\s|\n", text):
+        token = token.strip(" .-*`")
+        if not token or token.lower() in ("none", "n/a", "-", "tbd"):
+            continue
+        canonical = _CANONICAL.get(token.lower(), token)
+        if canonical not in names:
+            names.append(canonical)
+    return names
+
+
+def _used_as_tech(text: str, match) -> bool:
+    """
+    An ambiguous alias names the technology when it is capitalized mid-sentence
+    ("built on Node", not "Swift delivery" at a sentence start) or when one of
+    the two words around it is a tech context word or another tech name.
+    """
+    word = match.group(0)
+    before, after = text[max(match.start() - 60, 0):match.start()], text[match.end():match.end() + 60]
+    if word[0].isupper() and not word.isupper() and not _SENTENCE_START.search(before):
+        return True
+    neighbours = _WORD.findall(before.lower())[-2:] + _WORD.findall(after.lower())[:2]
+    return any(w in TECH_CONTEXT_WORDS or w in _TECH_WORDS for w in neighbours)
+
+
+def find_tech(text: str) -> dict:
+    found = {}
+    for group, patterns in _ALIAS_PATTERNS.items():
+        names = [
+            canonical for canonical, plain, ambiguous in patterns
+            if (plain and plain.search(text))
+            or (ambiguous and any(_used_as_tech(text, m) for m in ambiguous.finditer(text)))
+        ]
+        # "React Native" should not also count as React
+        if "React Native" in names and not re.search(r"(?<![\w.])react(?!\s+native)(?:\.js|js)?(?![\w])", text, re.I):
+            names.remove("React")
+        found[group] = names
+    return found
+
+
+# ------------------ EXTRACTION ------------------
+
+def _labeled_values(text: str) -> tuple:
+    """
+    "Label: value" lines mapped to field names, plus the lines that are not labels.
+    A label with an empty value takes the following non-label lines (e.g. a bullet list).
+    """
+    values = {}
+    rest = []
+    current = None
+    for line in text.splitlines():
+        match = _LABEL_LINE.match(line)
+        label = match.group(1).strip().lower() if match else None
+        if label in _LABEL_TO_FIELD:
+            current = _LABEL_TO_FIELD[label]
+            values[current] = match.group(2).strip().strip("*_ ").strip()
+            continue
+        if current and values[current] == "" and line.strip().startswith(("-", "*", "•")):
+            values[current] = line.strip(" -*•")
+            continue
+        if current and line.strip().startswith(("-", "*", "•")) and current in TECH_FIELDS + ["otherTech"]:
+            values[current] += ", " + line.strip(" -*•")
+            continue
+        current = None
+        rest.append(line)
+    return values, "\n".join(rest).strip()
+
+
+def extract_brief(text: str) -> BriefExtraction:
+    """
+    Extract ProjectInput fields from a free-text brief with rules only.
+    """
+    result = BriefExtraction()
+    labeled, prose = _labeled_values(text)
+
+    for name, value in labeled.items():
+        if not value:
+            continue
+        if name in TECH_FIELDS:
+            result.set(name, split_tech_list(value), LABELED)
+        elif name == "otherTech":
+            result.set(name, ", ".join(split_tech_list(value)), LABELED)
+        elif name == "expectedDuration":
+            duration = parse_duration(value)
+            if duration:
+                result.set("expectedDuration", duration[0], LABELED)
+                result.set("durationUnit", duration[1], LABELED)
+        elif name == "teamSize":
+            size = parse_team_size(value)
+            if size:
+                result.set(name, size, LABELED)
+        elif name == "startDate":
+            date = parse_date(value)
+            result.set(name, date or value, LABELED if date else PATTERN)
+        elif name == "category":
+            result.set(name, _match_vocabulary(value, CATEGORIES) or value, LABELED)
+        elif name == "experience":
+            result.set(name, _match_vocabulary(value, EXPERIENCE_LEVELS) or value, LABELED)
+        elif name == "locationType":
+            result.set(name, _match_vocabulary(value, LOCATION_TYPES) or value, LABELED)
+        else:
+            result.set(name, value, LABELED)
+
+    # prose patterns for whatever the labels did not cover
+    duration = parse_duration(text)
+    if duration:
+        result.set("expectedDuration", duration[0], PATTERN)
+        result.set("durationUnit", duration[1], PATTERN)
+    size = _TEAM.search(text)
+    if size:
+        result.set("teamSize", str(_to_number(_first_group(size))), PATTERN)
+    budget = _BUDGET.search(text)
+    if budget:
+        result.set("budget", budget.group(0).strip(), PATTERN)
+    start = parse_start_date(text)
+    if start:
+        result.set("startDate", start, PATTERN)
+    for name, vocabulary in (("category", CATEGORIES), ("experience", EXPERIENCE_LEVELS), ("locationType", LOCATION_TYPES)):
+        value = _match_vocabulary(text, vocabulary)
+        if value:
+            result.set(name, value, PATTERN)
+
+    name = _NAMED.search(text)
+    if name:
+        result.set("projectName", (name.group(1) or name.group(2)).strip(), PATTERN)
+    else:
+        heading = next((m.group(1).strip("*_ ") for m in map(_HEADING.match, text.splitlines()) if m), "")
+        if heading and heading.lower() not in _GENERIC_HEADINGS:
+            result.set("projectName", heading.split(":")[-1].strip() or heading, PATTERN)
+
+    tech = find_tech(text)
+    mentioned_any = any(tech[group] for group in TECH_FIELDS)
+    for group in TECH_FIELDS:
+        # no mention of a category in a brief that names other tech most likely means "none"
+        result.set(group, tech[group], PATTERN if tech[group] or mentioned_any else WEAK)
+    result.set("otherTech", ", ".join(tech["otherTech"]), PATTERN if mentioned_any else WEAK)
+
+    description = prose or text
+    result.set("projectDescription", re.sub(r"\s+", " ", description).strip()[:2000], PATTERN if prose else WEAK)
+    return result
@@ -0,0 +1,83 @@
+"""
+Stage checkpoints for the planning pipeline.
+
+Each stage output is written as soon as the stage finishes, under a run ID
+derived from the normalized brief. When a request fails halfway (a stage
+error, or a timeout in the final plan call) and is retried with the same
+brief, the pipeline resumes from the stages that are still missing, and the
+final document can be regenerated from the stored outputs alone.
+Checkpoints older than CHECKPOINT_TTL_SECONDS are ignored and purged.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "true").lower() == "true"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "stage_checkpoints.sqlite3")
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+
+# Purge expired checkpoints once every N writes
+_PURGE_EVERY = 100
+
+
+def run_id_for(agent_input) -> str:
+    """
+    Run ID of a normalized brief: the same brief always maps to the same run.
+    """
+    payload = json.dumps(agent_input, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class CheckpointStore:
+    def __init__(self, path=CHECKPOINT_PATH, ttl_seconds=CHECKPOINT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stage_checkpoints (
+                    run_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, stage)
+                )
+                """
+            )
+        return self._conn
+
+    def save(self, run_id: str, stage: str, output: str):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO stage_checkpoints (run_id, stage, output, created_at) VALUES (?, ?, ?, ?)",
+                (run_id, stage, output, now),
+            )
+            self._writes += 1
+            if self._writes % _PURGE_EVERY == 0:
+                db.execute("DELETE FROM stage_checkpoints WHERE created_at < ?", (now - self.ttl_seconds,))
+
+    def load(self, run_id: str) -> dict:
+        """
+        {stage: output} of the run's unexpired checkpoints.
+        """
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT stage, output FROM stage_checkpoints WHERE run_id = ? AND created_at >= ?",
+                (run_id, time.time() - self.ttl_seconds),
+            ).fetchall()
+        return dict(rows)
+
+
+checkpoint_store = CheckpointStore()
@@ -0,0 +1,155 @@
+"""
+Token budgets for the context passed between pipeline stages.
+
+Each stage receives the outputs of the stages it depends on; this module
+counts their tokens and condenses them to the stage's budget so prompts no
+longer grow with every stage. Condensing is extractive: headings, table
+rows and bullet points are kept before running prose, and order is kept.
+"""
+import json
+import logging
+import os
+import re
+
+# Tokens of upstream analysis a stage receives (split across its dependencies)
+STAGE_CONTEXT_TOKENS = int(os.getenv("STAGE_CONTEXT_TOKENS", "1500"))
+# Tokens of merged stage outputs passed to the final plan prompt
+PLAN_CONTEXT_TOKENS = int(os.getenv("PLAN_CONTEXT_TOKENS", "8000"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_loaded = False
+
+_SEPARATOR = re.compile(r"^\s*([-*_=])\1{2,}\s*$")
+_HEADING = re.compile(r"^\s*#{1,6}\s")
+_TABLE_ROW = re.compile(r"^\s*\|")
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s")
+_EMPHASIS = re.compile(r"\*\*[^*]+\*\*|\d")
+
+OMITTED = "[…]"
+
+
+def _get_encoding():
+    # tiktoken is optional and needs its encoding files; without them counts are estimated
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            logger.info("tiktoken unavailable (%s), estimating token counts", type(e).__name__)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token for English prose and markdown
+    return (len(text) + 3) // 4
+
+
+def _line_priority(line: str) -> int:
+    if _HEADING.match(line):
+        return 0
+    if _TABLE_ROW.match(line) or (_BULLET.match(line) and _EMPHASIS.search(line)):
+        return 1
+    if _BULLET.match(line):
+        return 2
+    return 3
+
+
+def compress_text(text: str, max_tokens: int) -> str:
+    """
+    Condense `text` to about `max_tokens`: blank runs and separators are
+    dropped first, then lines are kept by priority (headings, tables and
+    key bullets, other bullets, prose) in their original order. Omitted
+    stretches are marked with […].
+    """
+    text = (text or "").strip()
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    lines = [l.rstrip() for l in text.splitlines() if l.strip() and not _SEPARATOR.match(l) and not _TABLE_RULE.match(l)]
+    costs = [count_tokens(l) + 1 for l in lines]
+    keep = [False] * len(lines)
+    used = 0
+    for priority in range(4):
+        for i, line in enumerate(lines):
+            if keep[i] or _line_priority(line) != priority:
+                continue
+            if used + costs[i] > max_tokens:
+                continue
+            keep[i] = True
+            used += costs[i]
+
+    result = []
+    for i, line in enumerate(lines):
+        if keep[i]:
+            result.append(line)
+        elif not result or result[-1] != OMITTED:
+            result.append(OMITTED)
+
+    if not any(keep):
+        # a single huge paragraph: keep its beginning
+        return _truncate(lines[0] if lines else text, max_tokens) + f" {OMITTED}"
+    return "\n".join(result)
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def allocate(sizes: dict, budget: int) -> dict:
+    """
+    Split `budget` across texts of the given token sizes: short texts keep
+    everything and their unused share goes to the longer ones.
+    """
+    allocation = {}
+    remaining = dict(sizes)
+    left = budget
+    while remaining:
+        share = left // len(remaining)
+        fitting = {name: size for name, size in remaining.items() if size <= share}
+        if not fitting:
+            for name in remaining:
+                allocation[name] = share
+            break
+        for name, size in fitting.items():
+            allocation[name] = size
+            left -= size
+            del remaining[name]
+    return allocation
+
+
+def fit_to_budget(texts: dict, budget: int) -> dict:
+    """
+    Condense a {name: text} mapping so the texts together fit `budget` tokens.
+    """
+    sizes = {name: count_tokens(text) for name, text in texts.items()}
+    if sum(sizes.values()) <= budget:
+        return dict(texts)
+    allocation = allocate(sizes, budget)
+    return {name: compress_text(text, allocation[name]) for name, text in texts.items()}
+
+
+def compact_summary(input_data: dict) -> str:
+    """
+    Normalized project input as compact JSON without empty fields.
+    """
+    def prune(value):
+        if isinstance(value, dict):
+            pruned = {k: prune(v) for k, v in value.items()}
+            return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+        return value
+
+    return json.dumps(prune(input_data), ensure_ascii=False, separators=(",", ":"))
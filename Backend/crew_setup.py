@@ -1,100 +1,481 @@
 # crew_setup.py
-from crewai import Task, Crew
-from agents import (
-    # Existing agents
-    project_intake_analyst,
-    business_objectives_mapper,
-    risk_identifier,
-    architecture_recommender,
-    timeline_estimator,
-    trend_research_agent,
-    ticket_generator_agent,
-
-    # New agents for added depth
-    effort_estimator_agent,
-    dependency_mapper_agent,
-    sprint_planner_agent,
-    critic_agent,
-)
-
-def build_crew(input_data):
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from llm_cache import llm_cache, cache_enabled, is_valid, make_key
+from llm_client import paused_for_rate_limit, retryable_errors, stream_chat_completion
+from metrics import CONTEXT_TOKENS, LLM_FALLBACKS, STAGE_RESUMED, STAGE_REUSED, record_crew_usage, record_llm_call, track_stage
+from http_pool import install_litellm_sessions
+from context_budget import PLAN_CONTEXT_TOKENS, STAGE_CONTEXT_TOKENS, compact_summary, count_tokens, fit_to_budget
+from model_router import route
+from rate_limiter import effective_priority, estimate_tokens, rate_limiter
+from stage_reuse import STAGE_REUSE_ENABLED, stage_runs
+from checkpoints import CHECKPOINTS_ENABLED, checkpoint_store, run_id_for
+from agents import AGENT_SPECS
+
+# Max number of stage crews running at once across all plan requests
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "10"))
+# CrewAI console output; per-stage timings and tokens are logged by metrics either way
+CREW_VERBOSE = os.getenv("CREW_VERBOSE", "true").lower() == "true"
+# Import crewai and build the stage crews in the background at startup
+CREW_PRELOAD = os.getenv("CREW_PRELOAD", "true").lower() == "true"
+
+_stage_executor = ThreadPoolExecutor(max_workers=PIPELINE_MAX_WORKERS, thread_name_prefix="stage")
+_crew_templates = {}
+_crew_templates_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    name: str
+    title: str
+    agent: str
+    description: str
+    expected_output: str
+    depends_on: List[str] = field(default_factory=list)
+    # tokens of upstream output this stage receives (default STAGE_CONTEXT_TOKENS)
+    context_tokens: Optional[int] = None
+    # brief fields the output depends on; when they match a similar past run its output
+    # is reused (see stage_reuse). Every stage sees the full summary, so the description
+    # belongs in the key of any stage whose output follows the project scope. None: always run.
+    reuse_fields: Optional[List[str]] = None
+
+
+# Planning pipeline as a DAG: every stage lists the stages whose output it needs.
+# intake / objectives / risk / architecture / trends only need the summary and
+# run in parallel; the critic reviews everything before ticket generation.
+PIPELINE_STAGES = [
+    Stage(
+        name="intake",
+        title="Project Intake Analysis",
+        agent="project_intake_analyst",
+        description="Refine and validate this project input: {summary}",
+        expected_output="A well-structured summary of validated and completed input fields",
+    ),
+    Stage(
+        name="objectives",
+        title="Business Objectives",
+        agent="business_objectives_mapper",
+        description="Extract goals and KPIs from: {summary}",
+        expected_output="A list of business goals and measurable KPIs for this project",
+    ),
+    Stage(
+        name="risk",
+        title="Risk Analysis",
+        agent="risk_identifier",
+        description="Analyze risks for: {summary}",
+        expected_output="A list of risks with brief mitigation strategies relevant to the project’s tech, team, and scope",
+        reuse_fields=[
+            "projectDescription", "techStack", "meta.teamSize", "meta.experience", "meta.duration",
+            "meta.budget", "meta.locationType",
+        ],
+    ),
+    Stage(
+        name="architecture",
+        title="Architecture Recommendation",
+        agent="architecture_recommender",
+        description="Recommend a system architecture for: {summary}",
+        expected_output="A detailed architecture plan based on the provided tech stack, budget, and team size",
+    ),
+    Stage(
+        name="trends",
+        title="Modern Trends and Best Practices",
+        agent="trend_research_agent",
+        description="Suggest modern best practices and tooling updates for: {summary}",
+        expected_output="A brief overview of current industry trends, modern tooling choices, and best practices for similar systems",
+        reuse_fields=["projectDescription", "techStack", "meta.otherTech"],
+    ),
+    Stage(
+        name="effort",
+        title="Effort Estimation",
+        agent="effort_estimator_agent",
+        description="Estimate effort (developer-days or story points) for major deliverables in: {summary}",
+        expected_output="Effort estimation for each major deliverable/task, with totals per phase",
+        depends_on=["intake", "objectives", "architecture"],
+    ),
+    Stage(
+        name="dependencies",
+        title="Task Dependencies",
+        agent="dependency_mapper_agent",
+        description="Identify task dependencies and opportunities for parallel execution for: {summary}",
+        expected_output="List of dependencies, parallel work streams, and identification of critical path",
+        depends_on=["intake", "architecture"],
+    ),
+    Stage(
+        name="sprints",
+        title="Sprint Plan",
+        agent="sprint_planner_agent",
+        description="Distribute deliverables into realistic 2-week sprints for a 6-month roadmap for: {summary}",
+        expected_output="12 sprints with allocated features, parallel execution where possible, and milestones",
+        depends_on=["effort", "dependencies"],
+    ),
+    Stage(
+        name="critic",
+        title="Plan Critique",
+        agent="critic_agent",
+        description="Review the draft project plan for realism, gaps, and execution readiness based on: {summary}",
+        expected_output="Critique and recommendations for improving the plan so it’s execution-ready",
+        depends_on=["intake", "objectives", "risk", "architecture", "trends", "effort", "dependencies", "sprints"],
+        context_tokens=3000,
+    ),
+    Stage(
+        name="tickets",
+        title="Suggested Tickets",
+        agent="ticket_generator_agent",
+        description="Extract actionable tasks from the project plan and suggest them as JIRA ticket summaries and descriptions",
+        expected_output='A JSON list of {"summary": ..., "description": ...} for each suggested ticket, derived from key project plan sections',
+        depends_on=["effort", "dependencies", "sprints"],
+    ),
+]
+
+
+def input_dict(input_data):
     if hasattr(input_data, "dict"):
-        summary = str(input_data.dict())
-    else:
-        # Already a dict (from normalize_input)
-        summary = str(input_data)
-
-    # Ordered workflow: validation → objectives → risks → architecture →
-    # estimation → dependencies → sprint planning → trends → critic → tickets
-    tasks = [
-        Task(
-            agent=project_intake_analyst,
-            description=f"Refine and validate this project input: {summary}",
-            expected_output="A well-structured summary of validated and completed input fields"
-        ),
-        Task(
-            agent=business_objectives_mapper,
-            description=f"Extract goals and KPIs from: {summary}",
-            expected_output="A list of business goals and measurable KPIs for this project"
-        ),
-        Task(
-            agent=risk_identifier,
-            description=f"Analyze risks for: {summary}",
-            expected_output="A list of risks with brief mitigation strategies relevant to the project’s tech, team, and scope"
-        ),
-        Task(
-            agent=architecture_recommender,
-            description=f"Recommend a system architecture for: {summary}",
-            expected_output="A detailed architecture plan based on the provided tech stack, budget, and team size"
-        ),
-        Task(
-            agent=effort_estimator_agent,
-            description=f"Estimate effort (developer-days or story points) for major deliverables in: {summary}",
-            expected_output="Effort estimation for each major deliverable/task, with totals per phase"
-        ),
-        Task(
-            agent=dependency_mapper_agent,
-            description=f"Identify task dependencies and opportunities for parallel execution for: {summary}",
-            expected_output="List of dependencies, parallel work streams, and identification of critical path"
-        ),
-        Task(
-            agent=sprint_planner_agent,
-            description=f"Distribute deliverables into realistic 2-week sprints for a 6-month roadmap for: {summary}",
-            expected_output="12 sprints with allocated features, parallel execution where possible, and milestones"
-        ),
-        Task(
-            agent=trend_research_agent,
-            description=f"Suggest modern best practices and tooling updates for: {summary}",
-            expected_output="A brief overview of current industry trends, modern tooling choices, and best practices for similar systems"
-        ),
-        Task(
-            agent=critic_agent,
-            description=f"Review the draft project plan for realism, gaps, and execution readiness based on: {summary}",
-            expected_output="Critique and recommendations for improving the plan so it’s execution-ready"
-        ),
-        Task(
-            agent=ticket_generator_agent,
-            description="Extract actionable tasks from the project plan and suggest them as JIRA ticket summaries and descriptions",
-            expected_output='A JSON list of {"summary": ..., "description": ...} for each suggested ticket, derived from key project plan sections'
+        return input_data.dict()
+    # Already a dict (from normalize_input)
+    return input_data if isinstance(input_data, dict) else None
+
+
+def build_summary(input_data) -> str:
+    data = input_dict(input_data)
+    return compact_summary(data) if data is not None else str(input_data)
+
+
+class CrewTemplate:
+    """
+    Single-task crews for one agent on one model, built ahead of the request
+    and reused: a run checks out an idle crew, binds only the task text via
+    kickoff inputs and returns the crew to the pool afterwards. A crew (and
+    its agent, which kickoff mutates) is never used by two runs at once.
+    """
+
+    def __init__(self, agent_name: str, model: str, timeout: float, max_tokens: int = None):
+        self.agent_name = agent_name
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from crewai import LLM, Agent, Crew, Task
+
+        install_litellm_sessions()
+        agent = Agent(
+            **AGENT_SPECS[self.agent_name],
+            llm=LLM(model=self.model, timeout=self.timeout, max_completion_tokens=self.max_tokens, max_retries=0),
+            # timeouts go to the fallback model instead of being retried by the crew or litellm
+            max_retry_limit=0,
+            verbose=CREW_VERBOSE,
         )
+        task = Task(agent=agent, description="{task_description}", expected_output="{task_expected_output}")
+        return Crew(agents=[agent], tasks=[task], process="sequential", verbose=CREW_VERBOSE)
+
+    def kickoff(self, description: str, expected_output: str):
+        """
+        Run the task and return the CrewOutput plus the token usage of this run.
+        """
+        with self._lock:
+            crew = self._idle.pop() if self._idle else None
+        if crew is None:
+            crew = self._build()
+        # agent token counters accumulate over kickoffs
+        before = crew.calculate_usage_metrics().model_dump()
+        output = crew.kickoff(inputs={"task_description": description, "task_expected_output": expected_output})
+        after = crew.calculate_usage_metrics()
+        for name, value in before.items():
+            setattr(after, name, getattr(after, name) - value)
+        with self._lock:
+            self._idle.append(crew)
+        return output, after
+
+    def prebuild(self):
+        crew = self._build()
+        with self._lock:
+            self._idle.append(crew)
+
+
+def crew_template(agent_name: str, model: str, timeout: float, max_tokens: int = None) -> CrewTemplate:
+    key = (agent_name, model, timeout, max_tokens)
+    with _crew_templates_lock:
+        template = _crew_templates.get(key)
+        if template is None:
+            template = _crew_templates[key] = CrewTemplate(agent_name, model, timeout, max_tokens)
+        return template
+
+
+def preload_crews():
+    """
+    Import crewai and build one crew per pipeline stage on its primary model,
+    so the first plan request finds them ready.
+    """
+    started = time.perf_counter()
+    for stage in PIPELINE_STAGES:
+        profile = route(f"stage:{stage.name}")
+        primary_timeout, _ = profile.timeouts()
+        template = crew_template(stage.agent, profile.model, primary_timeout, profile.max_tokens)
+        if not template._idle:
+            template.prebuild()
+    logger.info("preloaded %d stage crews in %.2fs", len(PIPELINE_STAGES), time.perf_counter() - started)
+
+
+def run_agent_task(agent: str, description: str, expected_output: str, endpoint: str = None,
+                   validate: Callable = None, refresh: bool = False) -> str:
+    """
+    Run a single-task Crew for the agent named `agent` (see agents.AGENT_SPECS)
+    and return its raw output.
+    The model, timeout and output cap come from the `endpoint` profile (see
+    model_router); on a timeout or overload the task is rerun once on the
+    fallback model; a 429 pauses the model in rate_limiter and the task queues
+    again. Results are cached by (model, agent persona, task)
+    unless `endpoint` has opted out of the LLM cache, the fallback answered
+    or `validate` (e.g. require_json_items) rejects the output. `refresh`
+    skips the cached result and stores the new one.
+    """
+    profile = route(endpoint)
+    primary_timeout, fallback_timeout = profile.timeouts()
+
+    spec = AGENT_SPECS[agent]
+    tokens = estimate_tokens([spec["role"], spec["goal"], spec["backstory"], description, expected_output], profile.max_tokens)
+
+    def kickoff(model: str, timeout: float) -> str:
+        template = crew_template(agent, model, timeout, profile.max_tokens)
+        deadline = time.monotonic() + timeout
+        pauses = 0
+        while True:
+            started = time.perf_counter()
+            reservation = rate_limiter.acquire_sync(
+                model, tokens, effective_priority(profile.priority), timeout=deadline - time.monotonic() - 1.0
+            )
+            try:
+                output, usage = template.kickoff(description, expected_output)
+            except Exception as e:
+                rate_limiter.settle(reservation, 0)
+                record_crew_usage(endpoint, model, time.perf_counter() - started, None, outcome="error")
+                if paused_for_rate_limit(endpoint, model, e, deadline, pauses):
+                    pauses += 1
+                    continue
+                raise
+            rate_limiter.settle(reservation, getattr(usage, "total_tokens", None))
+            record_crew_usage(endpoint, model, time.perf_counter() - started, usage)
+            return output.raw
+
+    use_cache = cache_enabled(endpoint)
+    key = make_key(profile.model, [spec["role"], spec["goal"], spec["backstory"], description], expected_output=expected_output)
+    if use_cache and not refresh:
+        cached = llm_cache.get(key)
+        if cached is not None and is_valid(cached, validate):
+            record_llm_call(endpoint, profile.model, 0.0, outcome="cache_hit")
+            return cached
+        if cached is not None:
+            llm_cache.delete(key)
+
+    started = time.perf_counter()
+    try:
+        raw = kickoff(profile.model, primary_timeout)
+    except retryable_errors() as e:
+        if not profile.fallback_model:
+            raise
+        logger.warning("crew endpoint=%s model=%s failed (%s), falling back to %s",
+                       endpoint, profile.model, type(e).__name__, profile.fallback_model)
+        LLM_FALLBACKS.labels(endpoint or "unknown", profile.model, profile.fallback_model, type(e).__name__).inc()
+        return kickoff(profile.fallback_model, fallback_timeout)
+
+    if use_cache and is_valid(raw, validate):
+        llm_cache.set(key, raw, time.perf_counter() - started)
+    return raw
+
+
+def agent_messages(agent: str, description: str, expected_output: str) -> list:
+    """
+    Chat messages for running the agent named `agent` on a task directly,
+    using the same persona/task layout a single-task Crew would send.
+    """
+    spec = AGENT_SPECS[agent]
+    return [
+        {"role": "system", "content": f"You are {spec['role']}. {spec['backstory']}\nYour personal goal is: {spec['goal']}"},
+        {"role": "user", "content": f"Current Task: {description}\n\nThis is the expected criteria for your answer: {expected_output}"},
     ]
 
-    crew = Crew(
-        agents=[
-            project_intake_analyst,
-            business_objectives_mapper,
-            risk_identifier,
-            architecture_recommender,
-            effort_estimator_agent,
-            dependency_mapper_agent,
-            sprint_planner_agent,
-            trend_research_agent,
-            critic_agent,
-            ticket_generator_agent
-        ],
-        tasks=tasks,
-        process="sequential",
-        verbose=True
-    )
 
-    return crew
+async def stream_agent_task(agent: str, description: str, expected_output: str, endpoint: str = None,
+                            validate: Callable = None):
+    """
+    Streaming counterpart of run_agent_task: one chat completion with the
+    agent's model and persona, yielded as content deltas.
+    """
+    messages = agent_messages(agent, description, expected_output)
+    async for delta in stream_chat_completion(messages, endpoint=endpoint, validate=validate):
+        yield delta
+
+
+def build_stage_description(stage: Stage, summary: str, upstream: dict) -> str:
+    """
+    Outputs of the stages this stage depends on are appended to its
+    description as context, condensed to the stage's token budget.
+    """
+    description = stage.description.format(summary=summary)
+    if upstream:
+        titles = {s.name: s.title for s in PIPELINE_STAGES}
+        budget = stage.context_tokens or STAGE_CONTEXT_TOKENS
+        condensed = fit_to_budget(upstream, budget)
+        CONTEXT_TOKENS.labels(f"stage:{stage.name}", "raw").observe(sum(map(count_tokens, upstream.values())))
+        CONTEXT_TOKENS.labels(f"stage:{stage.name}", "sent").observe(sum(map(count_tokens, condensed.values())))
+        context = "\n\n".join(f"### {titles[name]}\n{output}" for name, output in condensed.items())
+        description += f"\n\nUse the following upstream analysis:\n\n{context}"
+    return description
+
+
+def run_stage(stage: Stage, summary: str, upstream: dict, refresh: bool = False) -> str:
+    description = build_stage_description(stage, summary, upstream)
+    with track_stage(stage.name):
+        return run_agent_task(
+            stage.agent, description, stage.expected_output, endpoint=f"stage:{stage.name}", refresh=refresh
+        )
+
+
+def run_dag(stages, run, executor=None) -> dict:
+    """
+    Run every stage as soon as all of its dependencies have finished.
+    `run(stage, upstream)` receives the outputs of the stage's direct
+    dependencies and returns the stage output. Returns {stage name: output}.
+    """
+    executor = executor or _stage_executor
+    names = {s.name for s in stages}
+    for stage in stages:
+        unknown = set(stage.depends_on) - names
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(unknown)}")
+
+    outputs = {}
+    pending = {s.name: s for s in stages}
+    running = {}
+
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dep in outputs for dep in stage.depends_on):
+                    upstream = {dep: outputs[dep] for dep in stage.depends_on}
+                    # carry the request context (trace ID) into the stage thread
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, run, stage, upstream)] = name
+                    del pending[name]
+
+            if not running:
+                raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outputs[running.pop(future)] = future.result()
+    finally:
+        for future in running:
+            future.cancel()
+
+    return outputs
+
+
+def merge_stage_outputs(outputs: dict, stages=None, budget: int = None) -> str:
+    """
+    Merge stage outputs in pipeline order into one text for build_prompt_from_agents,
+    condensed to `budget` tokens when one is given.
+    """
+    stages = stages or PIPELINE_STAGES
+    if budget:
+        condensed = fit_to_budget(outputs, budget)
+        CONTEXT_TOKENS.labels("plan", "raw").observe(sum(map(count_tokens, outputs.values())))
+        CONTEXT_TOKENS.labels("plan", "sent").observe(sum(map(count_tokens, condensed.values())))
+        outputs = condensed
+    return "\n\n".join(f"## {s.title}\n{outputs[s.name]}" for s in stages if s.name in outputs)
+
+
+def reusable_stage_outputs(data: dict) -> dict:
+    """
+    {stage name: output} taken from similar past runs (see stage_reuse).
+    """
+    try:
+        reused = stage_runs.reusable_outputs(data, PIPELINE_STAGES)
+    except Exception:
+        logger.exception("stage reuse lookup failed, running every stage")
+        return {}
+    for name, (_, run_id, similarity) in reused.items():
+        logger.info("stage=%s reused from run=%d similarity=%.2f", name, run_id, similarity)
+        STAGE_REUSED.labels(name).inc()
+    return {name: output for name, (output, _, _) in reused.items()}
+
+
+def load_checkpoints(run_id: str) -> dict:
+    try:
+        done = checkpoint_store.load(run_id)
+    except Exception:
+        logger.exception("could not read checkpoints of run=%s", run_id)
+        return {}
+    names = {s.name for s in PIPELINE_STAGES}
+    done = {name: output for name, output in done.items() if name in names}
+    if done:
+        logger.info("run=%s resuming with %d of %d stages done", run_id, len(done), len(PIPELINE_STAGES))
+        for name in done:
+            STAGE_RESUMED.labels(name).inc()
+    return done
+
+
+def save_checkpoint(run_id: str, stage: str, output: str):
+    try:
+        checkpoint_store.save(run_id, stage, output)
+    except Exception:
+        logger.exception("could not checkpoint stage=%s of run=%s", stage, run_id)
+
+
+def run_pipeline(input_data, force_full_run: bool = False) -> str:
+    """
+    Run the planning pipeline, parallelising independent stages.
+    Latency is bounded by the critical path
+    (architecture → effort → sprints → critic) instead of the sum of all stages.
+    Every stage output is checkpointed under the brief's run ID, so a retry
+    of a failed run only runs the missing stages. Stages whose inputs match a
+    similar earlier brief reuse that run's output. `force_full_run` ignores
+    both and the LLM cache, and runs every stage.
+    """
+    summary = build_summary(input_data)
+    data = input_dict(input_data)
+    use_index = STAGE_REUSE_ENABLED and data is not None
+    run_id = run_id_for(data) if CHECKPOINTS_ENABLED and data is not None else None
+    done = load_checkpoints(run_id) if run_id and not force_full_run else {}
+    reused = reusable_stage_outputs(data) if use_index and not force_full_run and len(done) < len(PIPELINE_STAGES) else {}
+
+    def run(stage, upstream):
+        if stage.name in done:
+            return done[stage.name]
+        if stage.name in reused:
+            output = reused[stage.name]
+        else:
+            output = run_stage(stage, summary, upstream, refresh=force_full_run)
+        if run_id:
+            save_checkpoint(run_id, stage.name, output)
+        return output
+
+    outputs = run_dag(PIPELINE_STAGES, run)
+    if use_index and len(done) < len(PIPELINE_STAGES):
+        try:
+            stage_runs.record(data, outputs)
+        except Exception:
+            logger.exception("could not record stage outputs for reuse")
+    return merge_stage_outputs(outputs, budget=PLAN_CONTEXT_TOKENS)
+
+
+def stored_pipeline_output(run_id: str) -> Optional[str]:
+    """
+    Merged stage outputs of a finished run from its checkpoints, or None when
+    stages are missing (the run failed or its checkpoints expired).
+    """
+    done = checkpoint_store.load(run_id)
+    if any(stage.name not in done for stage in PIPELINE_STAGES):
+        return None
+    return merge_stage_outputs(done, budget=PLAN_CONTEXT_TOKENS)
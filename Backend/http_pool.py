@@ -0,0 +1,132 @@
+"""
+Shared HTTP connection pool for every LLM client.
+
+The OpenAI SDK clients in llm_client and the litellm calls made by the crews
+all send their requests through one httpx transport per I/O style (one sync,
+one async), so parallel load reuses keep-alive connections instead of every
+client opening its own TLS connections. httpx is imported when the first
+client is created. HTTP/2 is used when the `h2` package is installed
+(LLM_HTTP2=auto) or forced on/off with true/false.
+"""
+import importlib.util
+import os
+import sys
+import threading
+
+from metrics import LLM_HTTP_CONNECTIONS, LLM_HTTP_REQUESTS
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "64"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "32"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+
+_sync_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    if LLM_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return LLM_HTTP2 == "true"
+
+
+def _client_options() -> dict:
+    import httpx
+
+    return dict(
+        limits=httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=_http2_enabled(),
+        follow_redirects=True,
+    )
+
+
+def get_sync_http_client():
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            import httpx
+
+            def count(request):
+                LLM_HTTP_REQUESTS.labels("sync").inc()
+
+            _sync_client = httpx.Client(event_hooks={"request": [count]}, **_client_options())
+            _register_gauges("sync", _sync_client)
+        return _sync_client
+
+
+def get_async_http_client():
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            import httpx
+
+            async def count(request):
+                LLM_HTTP_REQUESTS.labels("async").inc()
+
+            _async_client = httpx.AsyncClient(event_hooks={"request": [count]}, **_client_options())
+            _register_gauges("async", _async_client)
+        return _async_client
+
+
+def install_litellm_sessions():
+    """
+    Make litellm (and so every crew agent LLM) use the shared clients.
+    """
+    import litellm
+
+    if litellm.client_session is None:
+        litellm.client_session = get_sync_http_client()
+    if litellm.aclient_session is None:
+        litellm.aclient_session = get_async_http_client()
+
+
+def _pool_stats(client) -> dict:
+    # httpx does not expose its pool; read httpcore's connection pool defensively
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    requests = list(getattr(pool, "_requests", []))
+    return {
+        "connections": len(connections),
+        "active": sum(1 for c in connections if not c.is_idle()),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "http2": sum(1 for c in connections if c.info().startswith("HTTP/2")),
+        "queued_requests": sum(1 for r in requests if r.is_queued()),
+        "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+    }
+
+
+def _register_gauges(name: str, client):
+    for state in ("active", "idle", "queued_requests"):
+        LLM_HTTP_CONNECTIONS.labels(name, state).set_function(lambda state=state: _pool_stats(client)[state])
+
+
+def pool_stats() -> dict:
+    clients = {"sync": _sync_client, "async": _async_client}
+    return {
+        "http2": _http2_enabled(),
+        "max_keepalive_connections": LLM_HTTP_MAX_KEEPALIVE,
+        "keepalive_expiry_seconds": LLM_HTTP_KEEPALIVE_EXPIRY,
+        "clients": {name: _pool_stats(client) for name, client in clients.items() if client is not None},
+    }
+
+
+async def close_http_clients():
+    global _sync_client, _async_client
+    with _lock:
+        sync_client, async_client = _sync_client, _async_client
+        _sync_client = _async_client = None
+    litellm = sys.modules.get("litellm")
+    if litellm is not None:
+        if litellm.client_session is sync_client:
+            litellm.client_session = None
+        if litellm.aclient_session is async_client:
+            litellm.aclient_session = None
+    if async_client is not None:
+        await async_client.aclose()
+    if sync_client is not None:
+        sync_client.close()
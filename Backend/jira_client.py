@@ -0,0 +1,207 @@
+"""
+Jira REST client used to push finalized tickets.
+
+Uses one keep-alive requests.Session for all calls, creates issues through
+the bulk endpoint in batches (several batches in parallel), and retries
+rate-limited and 5xx responses with jittered exponential backoff. Issue
+creation is not idempotent, so it is only retried when Jira cannot have
+acted on the request: a 429, or a connection that was never established.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.exceptions import NewConnectionError
+
+from metrics import JIRA_REQUEST_SECONDS, JIRA_RETRIES
+
+JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", "10"))
+JIRA_MAX_CONCURRENCY = int(os.getenv("JIRA_MAX_CONCURRENCY", "4"))
+# Jira accepts at most 50 issues per bulk request
+JIRA_BULK_BATCH_SIZE = min(int(os.getenv("JIRA_BULK_BATCH_SIZE", "50")), 50)
+JIRA_MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", "5"))
+JIRA_BACKOFF_BASE_SECONDS = float(os.getenv("JIRA_BACKOFF_BASE_SECONDS", "0.5"))
+JIRA_BACKOFF_MAX_SECONDS = float(os.getenv("JIRA_BACKOFF_MAX_SECONDS", "30"))
+JIRA_TIMEOUT_SECONDS = float(os.getenv("JIRA_TIMEOUT_SECONDS", "30"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=JIRA_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.auth = HTTPBasicAuth(os.getenv("JIRA_EMAIL"), os.getenv("JIRA_API_TOKEN"))
+            session.headers.update({"Accept": "application/json", "Content-Type": "application/json"})
+            _session = session
+        return _session
+
+
+def _backoff_delay(attempt: int, retry_after=None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), JIRA_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    # full jitter so parallel batches do not retry in lockstep
+    return random.uniform(0, min(JIRA_BACKOFF_MAX_SECONDS, JIRA_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _not_sent(error: Exception) -> bool:
+    """
+    True when the request failed before it reached Jira (no connection was made).
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def request_with_retry(method: str, url: str, operation: str, idempotent: bool = True, **kwargs) -> requests.Response:
+    """
+    Send a request on the shared session, retrying 429/5xx responses and
+    connection errors. A request that is not `idempotent` (e.g. creating
+    issues) is only retried on 429 and on errors before it was sent, since
+    Jira may have acted on it before a 5xx or a timeout. The last response
+    (or exception) is returned/raised once the retries are used up.
+    """
+    kwargs.setdefault("timeout", JIRA_TIMEOUT_SECONDS)
+    retry_codes = RETRY_STATUS_CODES if idempotent else {429}
+    for attempt in range(JIRA_MAX_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            JIRA_REQUEST_SECONDS.labels(operation, "error").observe(time.perf_counter() - started)
+            if attempt == JIRA_MAX_RETRIES or not (idempotent or _not_sent(e)):
+                raise
+            JIRA_RETRIES.labels(operation, type(e).__name__).inc()
+            time.sleep(_backoff_delay(attempt))
+            continue
+
+        JIRA_REQUEST_SECONDS.labels(operation, str(response.status_code)).observe(time.perf_counter() - started)
+        if response.status_code not in retry_codes or attempt == JIRA_MAX_RETRIES:
+            return response
+        JIRA_RETRIES.labels(operation, str(response.status_code)).inc()
+        time.sleep(_backoff_delay(attempt, response.headers.get("Retry-After")))
+
+
+def build_issue_fields(ticket) -> dict:
+    adf_description = {
+        "type": "doc",
+        "version": 1,
+        "content": [{"type": "paragraph", "content": [{"type": "text", "text": ticket.description or ""}]}],
+    }
+    return {
+        "project": {"key": os.getenv("JIRA_PROJECT_KEY")},
+        "summary": ticket.summary,
+        "description": adf_description,
+        "issuetype": {"name": "Task"},
+    }
+
+
+def _created(ticket, key: str) -> dict:
+    return {
+        "summary": ticket.summary,
+        "description": ticket.description,
+        "key": key,
+        "url": f"{os.getenv('JIRA_BASE_URL')}/browse/{key}",
+    }
+
+
+def _unknown_outcome(ticket, error: Exception) -> dict:
+    # the request may have been applied; pushing again could create a duplicate
+    return {"summary": ticket.summary, "error": f"No answer from Jira ({type(error).__name__}), "
+                                                "the issue may have been created: check Jira before pushing again"}
+
+
+def create_issue(ticket) -> dict:
+    try:
+        response = request_with_retry(
+            "POST",
+            f"{os.getenv('JIRA_BASE_URL')}/rest/api/3/issue",
+            operation="create_issue",
+            idempotent=False,
+            json={"fields": build_issue_fields(ticket)},
+        )
+    except requests.RequestException as e:
+        return _unknown_outcome(ticket, e)
+    if response.status_code == 201:
+        return _created(ticket, response.json()["key"])
+    return {"summary": ticket.summary, "error": response.text}
+
+
+def create_issue_batch(tickets) -> list:
+    """
+    Create up to JIRA_BULK_BATCH_SIZE issues with one bulk request.
+    Returns one result per ticket, in order.
+    """
+    try:
+        response = request_with_retry(
+            "POST",
+            f"{os.getenv('JIRA_BASE_URL')}/rest/api/3/issue/bulk",
+            operation="create_issue_bulk",
+            idempotent=False,
+            json={"issueUpdates": [{"fields": build_issue_fields(t)} for t in tickets]},
+        )
+    except requests.RequestException as e:
+        return [_unknown_outcome(t, e) for t in tickets]
+    if response.status_code in (404, 405):
+        # bulk create not available on this instance
+        return [create_issue(t) for t in tickets]
+    if response.status_code not in (201, 400):
+        return [{"summary": t.summary, "error": response.text} for t in tickets]
+
+    body = response.json()
+    failed = {}
+    for error in body.get("errors", []):
+        element_errors = error.get("elementErrors", {})
+        message = element_errors.get("errors") or element_errors.get("errorMessages") or error
+        failed[error.get("failedElementNumber")] = str(message)
+
+    if response.status_code == 400 and not body.get("issues") and None in failed:
+        return [{"summary": t.summary, "error": response.text} for t in tickets]
+
+    # created issues come back in request order, skipping the failed elements
+    created = iter(body.get("issues", []))
+    results = []
+    for index, ticket in enumerate(tickets):
+        if index in failed:
+            results.append({"summary": ticket.summary, "error": failed[index]})
+        else:
+            issue = next(created, None)
+            if issue is None:
+                results.append({"summary": ticket.summary, "error": "Missing from Jira bulk response"})
+            else:
+                results.append(_created(ticket, issue["key"]))
+    return results
+
+
+def create_issues(tickets) -> list:
+    """
+    Create all tickets in Jira, JIRA_BULK_BATCH_SIZE per request and up to
+    JIRA_MAX_CONCURRENCY requests in parallel. Returns one result per ticket
+    in input order: {"summary", "description", "key", "url"} on success,
+    {"summary", "error"} otherwise.
+    """
+    tickets = list(tickets)
+    batches = [tickets[i:i + JIRA_BULK_BATCH_SIZE] for i in range(0, len(tickets), JIRA_BULK_BATCH_SIZE)]
+    if len(batches) <= 1:
+        return create_issue_batch(batches[0]) if batches else []
+
+    with ThreadPoolExecutor(max_workers=JIRA_MAX_CONCURRENCY, thread_name_prefix="jira") as executor:
+        futures = [executor.submit(contextvars.copy_context().run, create_issue_batch, batch) for batch in batches]
+        return [result for future in futures for result in future.result()]
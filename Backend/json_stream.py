@@ -0,0 +1,241 @@
+"""
+Tolerant JSON parsing for model output.
+
+Models wrap JSON in code fences, add prose around it, leave trailing commas
+and sometimes stop mid-object. `loads_tolerant` repairs those defects before
+giving up, and `JsonItemStream` pulls the elements of a JSON list out of a
+token stream one by one, so each ticket/task can be sent to the client as
+soon as its closing brace arrives.
+"""
+import json
+import re
+
+# only a fence around the whole output; fences inside JSON strings (code snippets) are content
+_OPENING_FENCE = re.compile(r"^\s*```[\w-]*[ \t]*\n?")
+_CLOSING_FENCE = re.compile(r"\n?[ \t]*```\s*$")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def strip_fences(text: str) -> str:
+    return _CLOSING_FENCE.sub("", _OPENING_FENCE.sub("", text, count=1), count=1)
+
+
+def _strip_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort repair of a JSON document: drops the fence and prose around
+    it, removes trailing commas and closes a truncated tail. If the tail
+    cannot be closed as is, it is cut back to the last complete element.
+    """
+    text = strip_fences(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+    text = text[min(starts):]
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    # (length of `out`, open brackets) at the last point where the document can be cut
+    safe = (0, [])
+
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+            out.append(char)
+            safe = (len(out), list(stack))
+            continue
+        elif char in "}]":
+            if not stack:
+                continue
+            _strip_trailing_comma(out)
+            out.append(_CLOSERS[stack.pop()])
+            if not stack:
+                # top-level value complete, anything after it is prose
+                return "".join(out)
+            safe = (len(out), list(stack))
+            continue
+        elif char == ",":
+            safe = (len(out), list(stack))
+        out.append(char)
+
+    # truncated: close the open string and brackets
+    closed = list(out)
+    if in_string:
+        closed.append('"')
+    _strip_trailing_comma(closed)
+    if closed and closed[-1] == ":":
+        closed.append("null")
+    candidate = "".join(closed) + "".join(_CLOSERS[b] for b in reversed(stack))
+    try:
+        json.loads(candidate, strict=False)
+        return candidate
+    except json.JSONDecodeError:
+        pass
+
+    length, open_brackets = safe
+    cut = out[:length]
+    _strip_trailing_comma(cut)
+    return "".join(cut) + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+
+
+def loads_tolerant(text: str):
+    """
+    json.loads that falls back to `repair_json`. Raises ValueError when the
+    output holds no usable JSON.
+    """
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError as e:
+        error = e
+    try:
+        return json.loads(repair_json(text), strict=False)
+    except json.JSONDecodeError:
+        raise ValueError(f"Model output is not valid JSON: {error}") from None
+
+
+class JsonItemStream:
+    """
+    Incremental parser for a JSON list inside streamed model output.
+
+    `feed(chunk)` returns the list elements completed by that chunk and
+    `close()` returns whatever can be recovered from a truncated tail.
+    Text before the first "[" (prose, fences) is skipped; if the list is
+    wrapped in an object, the first list inside it is used.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.finished = False
+        self.repaired = 0
+        self._item = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> list:
+        items = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self.started:
+                if char == "[":
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._item.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.finished = True
+                    items.extend(self._flush())
+                    break
+            elif char == "," and self._depth == 1:
+                items.extend(self._flush())
+                continue
+            self._item.append(char)
+        return items
+
+    def _flush(self) -> list:
+        raw = "".join(self._item).strip()
+        self._item = []
+        if not raw:
+            return []
+        try:
+            return [json.loads(raw, strict=False)]
+        except json.JSONDecodeError:
+            pass
+        try:
+            item = loads_tolerant(raw)
+        except ValueError:
+            return []
+        self.repaired += 1
+        return [item]
+
+    def close(self) -> list:
+        """
+        End of stream. Returns the repaired last element if the list was cut off.
+        """
+        if not self.started or self.finished:
+            return []
+        self.finished = True
+        items = self._flush()
+        # a cut-off object repairs to {} or a partial object; drop the empty ones
+        return [item for item in items if item not in ({}, [], None)]
+
+
+def _loads_unfenced(text: str):
+    """
+    json.loads on the output as is, then without the fence around it.
+    """
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(strip_fences(text).strip(), strict=False)
+
+
+def parse_json_items(text: str) -> list:
+    """
+    Parse a complete model output that should hold a JSON list. A single
+    object is returned as a one-element list, and an object whose only key
+    holds a list (e.g. {"tickets": [...]}) yields that list.
+    """
+    try:
+        value = _loads_unfenced(text)
+    except json.JSONDecodeError:
+        list_start, object_start = text.find("["), text.find("{")
+        if list_start == -1 or -1 < object_start < list_start:
+            value = loads_tolerant(text)
+        else:
+            stream = JsonItemStream()
+            return stream.feed(text) + stream.close()
+
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        nested = list(value.values())
+        return nested[0] if len(nested) == 1 and isinstance(nested[0], list) else [value]
+    raise ValueError("Model output does not contain a JSON list")
+
+
+def require_json_items(text: str) -> list:
+    """
+    parse_json_items for the LLM cache `validate` hook: output without any
+    list items (a refusal, prose, "[]") raises ValueError, so it is never cached.
+    """
+    items = parse_json_items(text)
+    if not items:
+        raise ValueError("Model output holds no JSON list items")
+    return items
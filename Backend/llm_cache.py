@@ -0,0 +1,239 @@
+"""
+Content-addressed cache for LLM responses.
+
+Entries are keyed by a hash of (model, messages, params) and live in two tiers:
+an in-process LRU for hot entries and a SQLite file shared across restarts and
+workers. Both tiers expire entries after a TTL and evict the least recently
+used entries once they exceed their size limit.
+
+Async callers use aget / set(wait=False): the in-process tier is checked on
+the event loop, the SQLite tier is read and written on a dedicated I/O
+thread, so the loop never waits on disk and lookups never queue behind crew
+runs on the shared worker pool.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "20000"))
+# Comma-separated endpoint names that must always hit the model, e.g. "refine-project-plan"
+LLM_CACHE_OPT_OUT = {e.strip() for e in os.getenv("LLM_CACHE_OPT_OUT", "").split(",") if e.strip()}
+
+# Run the disk eviction query once every N writes instead of on every write
+_EVICT_EVERY = 50
+
+# SQLite reads and writes of async callers; one connection, so one thread
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(model: str, messages, **params) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_enabled(endpoint: Optional[str] = None) -> bool:
+    return LLM_CACHE_ENABLED and endpoint not in LLM_CACHE_OPT_OUT
+
+
+def is_valid(value: str, validate: Optional[Callable] = None) -> bool:
+    """
+    True when `validate` (e.g. loads_tolerant) accepts `value`. Answers the
+    caller cannot parse are neither stored nor served from the cache.
+    """
+    if validate is None:
+        return True
+    try:
+        validate(value)
+    except Exception:
+        return False
+    return True
+
+
+class LLMCache:
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 memory_entries=LLM_CACHE_MEMORY_ENTRIES, disk_entries=LLM_CACHE_DISK_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+
+        # memory tier and stats; never held during SQLite I/O
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # key -> (value, created_at, compute_seconds)
+        self._memory = OrderedDict()
+        self._conn = None
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "seconds_saved": 0.0,
+        }
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    compute_seconds REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+        return self._conn
+
+    def _remember(self, key, value, created_at, compute_seconds):
+        self._memory[key] = (value, created_at, compute_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at, compute_seconds = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    self._stats["seconds_saved"] += compute_seconds
+                    return value
+                del self._memory[key]
+        return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[str]:
+        with self._db_lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, created_at, compute_seconds FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            elif row is not None:
+                db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                row = None
+
+        with self._lock:
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            value, created_at, compute_seconds = row
+            self._remember(key, value, created_at, compute_seconds)
+            self._stats["disk_hits"] += 1
+            self._stats["seconds_saved"] += compute_seconds
+            return value
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        return value if value is not None else self._get_disk(key, now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """
+        get() for the event loop: a memory miss is looked up on the cache I/O thread.
+        """
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        return await asyncio.get_running_loop().run_in_executor(_io_executor, self._get_disk, key, now)
+
+    def set(self, key: str, value: str, compute_seconds: float = 0.0, wait: bool = True):
+        """
+        Store `value`. With wait=False (for the event loop) the SQLite write
+        runs on the cache I/O thread; the entry is served from memory meanwhile.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now, compute_seconds)
+            self._stats["stores"] += 1
+        if wait:
+            self._store_disk(key, value, now, compute_seconds)
+        else:
+            _io_executor.submit(self._store_disk, key, value, now, compute_seconds).add_done_callback(_log_write_failure)
+
+    def _store_disk(self, key: str, value: str, now: float, compute_seconds: float):
+        with self._db_lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at, compute_seconds) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, compute_seconds),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict_disk(now)
+
+    def delete(self, key: str, wait: bool = True):
+        with self._lock:
+            self._memory.pop(key, None)
+        if wait:
+            self._delete_disk(key)
+        else:
+            _io_executor.submit(self._delete_disk, key).add_done_callback(_log_write_failure)
+
+    def _delete_disk(self, key: str):
+        with self._db_lock:
+            self._db().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def _evict_disk(self, now):
+        db = self._db()
+        expired = db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_entries,),
+        ).rowcount
+        with self._lock:
+            self._stats["evictions"] += expired + overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        with self._db_lock:
+            stats["disk_entries"] = self._db().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["seconds_saved"] = round(stats["seconds_saved"], 3)
+        stats["enabled"] = LLM_CACHE_ENABLED
+        stats["opt_out"] = sorted(LLM_CACHE_OPT_OUT)
+        return stats
+
+
+def _log_write_failure(future):
+    if future.exception():
+        logger.warning("llm cache write failed: %s", future.exception())
+
+
+llm_cache = LLMCache()
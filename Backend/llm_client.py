@@ -0,0 +1,362 @@
+"""
+Async execution layer shared by the FastAPI routes.
+
+Direct OpenAI calls go through AsyncOpenAI, with the model chosen per call
+site by model_router, and CrewAI runs (plus any other blocking work such as
+the Jira pushes) are offloaded to a bounded thread pool, so a slow plan
+generation never blocks the event loop.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from http_pool import close_http_clients, get_async_http_client, get_sync_http_client
+from llm_cache import llm_cache, cache_enabled, is_valid, make_key
+from metrics import LLM_FALLBACKS, LLM_RETRIES, record_llm_call, record_openai_usage
+from model_router import ModelProfile, route
+from rate_limiter import AdmissionTimeout, effective_priority, estimate_tokens, rate_limiter, retry_after_seconds
+
+# Max number of OpenAI calls in flight at once across all routes
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Max number of Crew runs / blocking jobs executing in parallel
+BLOCKING_MAX_WORKERS = int(os.getenv("BLOCKING_MAX_WORKERS", "8"))
+# Retries for rate limits, timeouts and 5xx (done here so they show up in metrics)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+_async_client = None
+_sync_client = None
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix="blocking")
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    """
+    Errors worth retrying or falling back on. openai is imported on first use
+    to keep it out of the startup path; litellm (used by crewai) raises
+    subclasses of these as well.
+    """
+    from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+    return RateLimitError, APIConnectionError, APITimeoutError, InternalServerError, AdmissionTimeout
+
+
+def paused_for_rate_limit(endpoint: str, model: str, error: Exception, deadline: float, pauses: int) -> bool:
+    """
+    On a 429, pause admission for `model` and return True when the call can
+    queue again within its deadline (the pause does not use up a retry).
+    """
+    from openai import RateLimitError
+
+    if not isinstance(error, RateLimitError):
+        return False
+    pause = retry_after_seconds(error, pauses)
+    rate_limiter.pause(model, pause)
+    if deadline - time.monotonic() - pause < 1.0:
+        return False
+    LLM_RETRIES.labels(endpoint or "unknown", model, "RateLimitQueued").inc()
+    return True
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+
+        _async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, http_client=get_async_http_client())
+    return _async_client
+
+
+def get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        from openai import OpenAI
+
+        _sync_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0, http_client=get_sync_http_client())
+    return _sync_client
+
+
+async def close_clients():
+    global _async_client, _sync_client
+    _async_client = _sync_client = None
+    await close_http_clients()
+
+
+def _retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(20.0, 0.5 * 2 ** attempt))
+
+
+def _request_params(profile: ModelProfile, params: dict) -> dict:
+    if profile.max_tokens and "max_tokens" not in params and "max_completion_tokens" not in params:
+        return {**params, "max_completion_tokens": profile.max_tokens}
+    return params
+
+
+def _estimate(messages: list, request_params: dict) -> int:
+    max_tokens = request_params.get("max_completion_tokens") or request_params.get("max_tokens")
+    return estimate_tokens([m.get("content") for m in messages], max_tokens)
+
+
+def _used_tokens(usage):
+    return getattr(usage, "total_tokens", None)
+
+
+def _attempt_timeout(profile: ModelProfile, model: str, deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if model == profile.model and profile.fallback_model:
+        return min(profile.timeouts()[0], remaining)
+    return remaining
+
+
+def _fall_back(endpoint: str, profile: ModelProfile, error: Exception):
+    logger.warning("llm endpoint=%s model=%s failed (%s), falling back to %s",
+                   endpoint, profile.model, type(error).__name__, profile.fallback_model)
+    LLM_FALLBACKS.labels(endpoint or "unknown", profile.model, profile.fallback_model, type(error).__name__).inc()
+
+
+async def _create(endpoint: str, model: str, messages: list, limit: bool = True, **params):
+    """
+    chat.completions.create with routing, retries and latency/token/cost metrics.
+    The call site's profile (see model_router) picks the model, the output cap,
+    the time budget and the rate-limit priority; on a timeout or overload the
+    fallback model gets the rest of the budget. Without a fallback, retryable
+    errors are retried. A 429 pauses the model in rate_limiter and the call
+    queues again instead of failing.
+    Returns (response, model that answered). Streaming responses are recorded
+    by the caller once the stream ends (their token estimate is not settled).
+    `limit=False` skips the concurrency semaphore when the caller already holds it.
+    """
+    profile = route(endpoint, model)
+    deadline = time.monotonic() + profile.latency_budget
+    candidates = [profile.model] + ([profile.fallback_model] if profile.fallback_model else [])
+    request_params = _request_params(profile, params)
+
+    tokens = _estimate(messages, request_params)
+
+    for candidate in candidates:
+        attempt = pauses = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                reservation = await rate_limiter.acquire(
+                    candidate,
+                    tokens,
+                    effective_priority(profile.priority),
+                    timeout=_attempt_timeout(profile, candidate, deadline) - 1.0,
+                )
+                try:
+                    async with _llm_semaphore if limit else contextlib.nullcontext():
+                        response = await get_async_client().chat.completions.create(
+                            model=candidate,
+                            messages=messages,
+                            timeout=max(_attempt_timeout(profile, candidate, deadline), 1.0),
+                            **request_params,
+                        )
+                except BaseException:
+                    # a failed request still counts against the request limit, not the token estimate
+                    rate_limiter.settle(reservation, 0)
+                    raise
+            except retryable_errors() as e:
+                record_llm_call(endpoint, candidate, time.perf_counter() - started, outcome="error")
+                if paused_for_rate_limit(endpoint, candidate, e, deadline, pauses):
+                    pauses += 1
+                    continue
+                if candidate != candidates[-1]:
+                    _fall_back(endpoint, profile, e)
+                    break
+                if attempt == LLM_MAX_RETRIES or deadline - time.monotonic() < 1.0:
+                    raise
+                LLM_RETRIES.labels(endpoint or "unknown", candidate, type(e).__name__).inc()
+                await asyncio.sleep(_retry_delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                record_llm_call(endpoint, candidate, time.perf_counter() - started, outcome="error")
+                raise
+
+            if not params.get("stream"):
+                rate_limiter.settle(reservation, _used_tokens(response.usage))
+                record_openai_usage(endpoint, candidate, time.perf_counter() - started, response.usage)
+            return response, candidate
+
+
+def _create_sync(endpoint: str, model: str, messages: list, **params):
+    profile = route(endpoint, model)
+    deadline = time.monotonic() + profile.latency_budget
+    candidates = [profile.model] + ([profile.fallback_model] if profile.fallback_model else [])
+    request_params = _request_params(profile, params)
+
+    tokens = _estimate(messages, request_params)
+
+    for candidate in candidates:
+        attempt = pauses = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                reservation = rate_limiter.acquire_sync(
+                    candidate,
+                    tokens,
+                    effective_priority(profile.priority),
+                    timeout=_attempt_timeout(profile, candidate, deadline) - 1.0,
+                )
+                try:
+                    response = get_sync_client().chat.completions.create(
+                        model=candidate,
+                        messages=messages,
+                        timeout=max(_attempt_timeout(profile, candidate, deadline), 1.0),
+                        **request_params,
+                    )
+                except BaseException:
+                    rate_limiter.settle(reservation, 0)
+                    raise
+            except retryable_errors() as e:
+                record_llm_call(endpoint, candidate, time.perf_counter() - started, outcome="error")
+                if paused_for_rate_limit(endpoint, candidate, e, deadline, pauses):
+                    pauses += 1
+                    continue
+                if candidate != candidates[-1]:
+                    _fall_back(endpoint, profile, e)
+                    break
+                if attempt == LLM_MAX_RETRIES or deadline - time.monotonic() < 1.0:
+                    raise
+                LLM_RETRIES.labels(endpoint or "unknown", candidate, type(e).__name__).inc()
+                time.sleep(_retry_delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                record_llm_call(endpoint, candidate, time.perf_counter() - started, outcome="error")
+                raise
+
+            rate_limiter.settle(reservation, _used_tokens(response.usage))
+            record_openai_usage(endpoint, candidate, time.perf_counter() - started, response.usage)
+            return response, candidate
+
+
+async def _cached(key: str, endpoint: str, model: str, validate) -> Optional[str]:
+    cached = await llm_cache.aget(key)
+    if cached is None:
+        return None
+    if not is_valid(cached, validate):
+        llm_cache.delete(key, wait=False)
+        return None
+    record_llm_call(endpoint, model, 0.0, outcome="cache_hit")
+    return cached
+
+
+async def chat_completion(messages: list, endpoint: str = None, model: str = None, refresh: bool = False,
+                          validate: Callable = None, **params) -> str:
+    """
+    Run a chat completion without blocking the event loop.
+    The model comes from the `endpoint` profile unless `model` is given.
+    Returns the stripped message content, served from the LLM cache when
+    the same (model, messages, params) was answered before, unless
+    `endpoint` has opted out of caching or `refresh` asks for a new answer.
+    Answers from a fallback model, and answers `validate` (e.g.
+    require_json_items) rejects, are not cached.
+    """
+    primary = route(endpoint, model).model
+    use_cache = cache_enabled(endpoint)
+    key = make_key(primary, messages, **params)
+    if use_cache and not refresh:
+        cached = await _cached(key, endpoint, primary, validate)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    response, answered_by = await _create(endpoint, model, messages, **params)
+    content = response.choices[0].message.content.strip()
+
+    if use_cache and answered_by == primary and is_valid(content, validate):
+        llm_cache.set(key, content, time.perf_counter() - started, wait=False)
+    return content
+
+
+async def stream_chat_completion(messages: list, endpoint: str = None, model: str = None, refresh: bool = False,
+                                 validate: Callable = None, **params):
+    """
+    Stream a chat completion as an async generator of content deltas.
+    A cached answer is replayed as a single delta (unless `refresh`); a fully
+    streamed answer is stored in the cache once the stream completes, if
+    `validate` accepts it. The fallback model only takes over if the primary fails before
+    streaming starts.
+    """
+    primary = route(endpoint, model).model
+    use_cache = cache_enabled(endpoint)
+    key = make_key(primary, messages, **params)
+    if use_cache and not refresh:
+        cached = await _cached(key, endpoint, primary, validate)
+        if cached is not None:
+            yield cached
+            return
+
+    started = time.perf_counter()
+    parts = []
+    usage = None
+    answered_by = primary
+    outcome = "error"
+    try:
+        # the semaphore is held for the whole stream, not just the initial request
+        async with _llm_semaphore:
+            stream, answered_by = await _create(
+                endpoint, model, messages, limit=False, stream=True, stream_options={"include_usage": True}, **params
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        outcome = "ok"
+    finally:
+        record_openai_usage(endpoint, answered_by, time.perf_counter() - started, usage, outcome=outcome)
+
+    content = "".join(parts).strip()
+    if use_cache and answered_by == primary and is_valid(content, validate):
+        llm_cache.set(key, content, time.perf_counter() - started, wait=False)
+
+
+def chat_completion_sync(messages: list, endpoint: str = None, model: str = None,
+                         validate: Callable = None, **params) -> str:
+    """
+    Blocking variant of chat_completion for code already running on a worker thread.
+    """
+    primary = route(endpoint, model).model
+    use_cache = cache_enabled(endpoint)
+    key = make_key(primary, messages, **params)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None and is_valid(cached, validate):
+            record_llm_call(endpoint, primary, 0.0, outcome="cache_hit")
+            return cached
+        if cached is not None:
+            llm_cache.delete(key)
+
+    started = time.perf_counter()
+    response, answered_by = _create_sync(endpoint, model, messages, **params)
+    content = response.choices[0].message.content.strip()
+
+    if use_cache and answered_by == primary and is_valid(content, validate):
+        llm_cache.set(key, content, time.perf_counter() - started)
+    return content
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a synchronous callable on the shared worker pool. The caller's
+    context (e.g. the request trace ID) is carried over to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, context.run, functools.partial(func, *args, **kwargs))
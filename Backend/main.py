@@ -1,34 +1,71 @@
+# .env must be loaded before any project module reads its settings at import time
+from dotenv import load_dotenv
+load_dotenv()
+
 from fastapi import FastAPI, HTTPException, Request
-from crew_setup import build_crew
 from utils import build_prompt_from_agents
-from openai import OpenAI
 from pydantic import BaseModel
 from typing import List, Optional
-from dotenv import load_dotenv
 import os
 from fastapi.middleware.cors import CORSMiddleware
-import requests
-from requests.auth import HTTPBasicAuth
-from crewai import Crew, Task
-from agents import (
-    ticket_generator_agent,
-    development_task_extractor,
-    frontend_task_agent,
-    backend_task_agent,
-    database_task_agent,
-    cloud_task_agent,
-    devops_task_agent,
-    design_task_agent,
-)
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from contextlib import asynccontextmanager
+from crew_setup import CREW_PRELOAD, preload_crews, run_agent_task, stored_pipeline_output, stream_agent_task
+import asyncio
+import functools
 import json
 import logging
+import time
 
 # local import from our new helper module (that you paste as utils_free_text.py or inside utils.py)
-from utils_free_text import normalize_input, run_agents_wrapper, call_llm_to_extract_json_from_free_text
+from utils_free_text import ProjectInput, normalize_input, run_agents_wrapper, call_llm_to_extract_json_from_free_text
+from llm_client import chat_completion, close_clients, stream_chat_completion, run_blocking
+from llm_cache import llm_cache
+from http_pool import pool_stats
+from metrics import HTTP_REQUEST_SECONDS, configure_logging, new_trace_id, metrics_payload, prompt_cache_stats
+from jobs import job_queue, QueueFullError
+from singleflight import inflight, request_key
+from speculation import speculator
+from checkpoints import run_id_for
+import ticket_store
+from plan_sections import plan_context, plan_hash
+from json_stream import JsonItemStream, loads_tolerant, parse_json_items, require_json_items
+from prompts import CATEGORY_TASKS, CODE_SNIPPET, DEV_CATEGORIES, DEV_TASKS, JIRA_TICKETS, PLAN_DOCUMENT, REFINE_PLAN
+from plan_refinement import (
+    plan_refinement_scope,
+    iter_refined_sections,
+    splice_sections,
+    refine_plan_by_sections,
+)
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-app = FastAPI()
+configure_logging()
+
+# Snippets generated at once per batch request, and extra attempts per failed snippet
+CODE_SNIPPET_BATCH_CONCURRENCY = int(os.getenv("CODE_SNIPPET_BATCH_CONCURRENCY", "4"))
+CODE_SNIPPET_TASK_RETRIES = int(os.getenv("CODE_SNIPPET_TASK_RETRIES", "1"))
+CODE_SNIPPET_BATCH_MAX_TASKS = int(os.getenv("CODE_SNIPPET_BATCH_MAX_TASKS", "100"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_blocking(ticket_store.init_store)
+    await job_queue.start()
+    if CREW_PRELOAD:
+        # in the background: the server accepts requests while crewai loads
+        preload = asyncio.create_task(run_blocking(preload_crews))
+        preload.add_done_callback(log_preload_failure)
+    yield
+    speculator.cancel_all()
+    await job_queue.stop()
+    await close_clients()
+
+
+def log_preload_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logger.warning("crew preload failed: %s", task.exception())
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:5173"]
 app.add_middleware(
@@ -37,32 +74,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Give every request a trace ID (taken from X-Request-ID when present) that
+    is attached to its log lines, and record its latency per route.
+    """
+    trace_id = new_trace_id(request.headers.get("X-Request-ID"))
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        response.headers["X-Request-ID"] = trace_id
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            getattr(route, "path", "unmatched"), request.method, status
+        ).observe(time.perf_counter() - started)
+
 logger = logging.getLogger(__name__)
 
 # ------------------ DATA MODELS ------------------
 
-class ProjectInput(BaseModel):
-    projectName: str
-    projectDescription: str
-    stakeholder: str
-    category: str
-    startDate: str
-    expectedDuration: str
-    durationUnit: str
-    teamSize: str
-    budget: str
-    experience: str
-    locationType: str
-    frontend: List[str]
-    backend: List[str]
-    database: List[str]
-    cloud: List[str]
-    devops: List[str]
-    design: List[str]
-    otherTech: Optional[str] = None
-
 class RefinementRequest(BaseModel):
     original_plan: str
     user_feedback: str
@@ -79,23 +118,185 @@ class CodeSnippetSingleTaskRequest(BaseModel):
     task_description: str
     final_plan: str
 
-TICKET_STORE_PATH = "saved_tickets.json"
+class CodeSnippetTask(BaseModel):
+    task_name: str
+    task_description: str
+
+class CodeSnippetBatchRequest(BaseModel):
+    final_plan: str
+    tasks: List[CodeSnippetTask]
 
 def save_tickets_locally(ticket_list):
     try:
-        if os.path.exists(TICKET_STORE_PATH):
-            with open(TICKET_STORE_PATH, "r") as f:
-                existing = json.load(f)
-        else:
-            existing = []
+        ticket_store.append_tickets(ticket_list)
+
+    except Exception as e:
+        print("⚠️ Error saving tickets locally:", e)
+
+
+# ------------------ PLAN HELPERS ------------------
+
+# Plan sections each endpoint sends to the model (keys of plan_sections.PLAN_SECTION_KEYS).
+# Plans that do not follow the numbered layout are sent in full.
+ENDPOINT_PLAN_SECTIONS = {
+    "generate-jira-tickets-from-plan": ["wbs", "dependencies", "timeline"],
+    "get-suggested-dev-tasks": ["wbs", "dependencies", "architecture"],
+    "generate-code-snippet": ["architecture", "wbs"],
+    "get-dev-categories": ["architecture", "best_practices"],
+}
+
+CATEGORY_PLAN_SECTIONS = {
+    "Frontend": ["goals", "wbs", "architecture"],
+    "Backend": ["wbs", "dependencies", "architecture"],
+    "Database": ["wbs", "architecture"],
+    "Cloud": ["architecture", "budget", "best_practices"],
+    "DevOps": ["architecture", "quality", "best_practices"],
+    "Design": ["goals", "wbs", "architecture"],
+}
+
+async def run_plan_agents(data: dict) -> tuple:
+    """
+    Normalize a structured or free-text brief and run the agents on it.
+    Returns (merged agent output, run ID of the stage checkpoints).
+    """
+    # structured ProjectInput path
+    if "projectName" in data:
+        input_data = ProjectInput(**data)
+        agent_input = await run_blocking(normalize_input, input_data)
+
+    # free-text path
+    elif "text" in data:
+        free_text = data["text"]
+        agent_input = await run_blocking(normalize_input, free_text)
+
+    else:
+        raise HTTPException(status_code=400, detail="Input must include either 'projectName' or 'text'.")
+
+    # ---- run agents on normalized input ----
+    agent_output = await run_blocking(run_agents_wrapper, agent_input, force_full_run=bool(data.get("force_full_run")))
+    return agent_output, run_id_for(agent_input)
+
+
+async def build_plan_prompt(data: dict) -> str:
+    agent_output, _ = await run_plan_agents(data)
+    return build_prompt_from_agents(agent_output)
+
+
+async def generate_plan_document(data: dict) -> dict:
+    """
+    {"project_plan", "run_id"} for a brief; identical briefs in flight at the
+    same time share one run.
+    """
+    result = await inflight.do(request_key("generate-project-plan", data), lambda: plan_document(data))
+    speculate(result["project_plan"])
+    return result
+
+
+async def plan_document(data: dict) -> dict:
+    agent_output, run_id = await run_plan_agents(data)
+    # a forced full run writes a new document too
+    project_plan = await write_plan(build_prompt_from_agents(agent_output), refresh=bool(data.get("force_full_run")))
+    return {"project_plan": project_plan, "run_id": run_id}
+
+
+async def write_plan(prompt: str, refresh: bool = False) -> str:
+    return await chat_completion(
+        messages=[
+            {"role": "system", "content": PLAN_DOCUMENT.system},
+            {"role": "user", "content": prompt},
+        ],
+        endpoint="generate-project-plan",
+        refresh=refresh,
+    )
+
+
+def build_refine_prompt(data: RefinementRequest) -> str:
+    return REFINE_PLAN.render(data.original_plan, data.user_feedback)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_plan_events(prompt_factory, system_prompt: str, endpoint: str, result_field: str, announce: bool = True,
+                             replaces: str = None, refresh: bool = False):
+    """
+    Server-Sent Events for a streamed plan:
+    - `status` as soon as the request is accepted and again when writing starts
+    - `token` for every content delta
+    - `section` whenever a "### " section of the document is complete
+    - `done` with the full document under `result_field`
+    - `error` if anything fails
+    The finished document is handed to speculate(), replacing `replaces`.
+    `refresh` bypasses the LLM cache.
+    """
+    try:
+        if announce:
+            yield sse_event("status", {"stage": "preparing"})
+        prompt = await prompt_factory()
+        yield sse_event("status", {"stage": "writing"})
+
+        document = ""
+        section_start = 0
+        async for delta in stream_chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            endpoint=endpoint,
+            refresh=refresh,
+        ):
+            document += delta
+            yield sse_event("token", {"delta": delta})
+
+            # a new heading closes the section before it
+            heading = document.rfind("\n### ", section_start + 1)
+            if heading > section_start:
+                yield sse_event("section", {"markdown": document[section_start:heading].strip()})
+                section_start = heading
+
+        yield sse_event("section", {"markdown": document[section_start:].strip()})
+        speculate(document.strip(), replaces=replaces)
+        yield sse_event("done", {result_field: document.strip()})
+
+    except Exception as e:
+        logger.exception("Error while streaming %s", endpoint)
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        yield sse_event("error", {"detail": detail})
+
 
-        existing.extend(ticket_list)
+def ndjson_line(event: str, **data) -> str:
+    return json.dumps({"event": event, **data}) + "\n"
 
-        with open(TICKET_STORE_PATH, "w") as f:
-            json.dump(existing, f, indent=2)
+
+async def stream_json_items(deltas, endpoint: str):
+    """
+    NDJSON for an agent that answers with a JSON list:
+    - `item` with {"index", "item"} as soon as each list element is complete
+    - `done` with the item count and how many items needed repairs
+    - `error` if the run fails; items already sent stay valid
+    """
+    parser = JsonItemStream()
+    count = 0
+    try:
+        async for delta in deltas:
+            for item in parser.feed(delta):
+                yield ndjson_line("item", index=count, item=item)
+                count += 1
+        for item in parser.close():
+            yield ndjson_line("item", index=count, item=item)
+            count += 1
+        if not parser.started:
+            raise ValueError("Model output does not contain a JSON list")
+        yield ndjson_line("done", count=count, repaired=parser.repaired)
 
     except Exception as e:
-        print("⚠️ Error saving tickets locally:", e)
+        logger.exception("Error while streaming %s", endpoint)
+        yield ndjson_line("error", detail=str(e))
+
+
+def ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
 
 
 # ------------------ ROUTES ------------------
@@ -107,218 +308,393 @@ async def generate_project_plan(request: Request):
     - If user posts structured fields (ProjectInput), we parse normally.
     - If user posts free-text brief ({"text": "..."}), we extract JSON using LLM.
     Both paths are normalized, passed through agents, and then final plan generated.
+    - "force_full_run": true reruns every stage instead of reusing outputs of similar earlier briefs
+      or checkpoints of an earlier attempt.
+    Returns {"project_plan", "run_id"}; a retry of a failed request resumes from its checkpoints, and
+    /api/plan-runs/{run_id}/regenerate rewrites the document from them.
     """
     try:
         data = await request.json()
+        return await generate_plan_document(data)
 
-        # structured ProjectInput path
-        if "projectName" in data:
-            input_data = ProjectInput(**data)
-            agent_input = normalize_input(input_data)
+    except Exception as e:
+        logger.exception("Error in /api/generate-project-plan")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # free-text path
-        elif "text" in data:
-            free_text = data["text"]
-            agent_input = normalize_input(free_text)
 
-        else:
-            raise HTTPException(status_code=400, detail="Input must include either 'projectName' or 'text'.")
+@app.post("/api/generate-project-plan/stream")
+async def generate_project_plan_stream(request: Request):
+    """
+    Streaming variant of /api/generate-project-plan (Server-Sent Events).
+    The final `done` event carries {"project_plan": ...}.
+    """
+    data = await request.json()
+    events = stream_plan_events(
+        lambda: build_plan_prompt(data),
+        PLAN_DOCUMENT.system,
+        endpoint="generate-project-plan",
+        result_field="project_plan",
+        refresh=bool(data.get("force_full_run")),
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/api/jobs/project-plan", status_code=202)
+async def submit_project_plan_job(request: Request):
+    """
+    Queue a plan generation (same body as /api/generate-project-plan) and
+    return its job ID right away. Answers 429 when the queue is saturated.
+    """
+    data = await request.json()
+    if "projectName" not in data and "text" not in data:
+        raise HTTPException(status_code=400, detail="Input must include either 'projectName' or 'text'.")
 
-        # ---- run agents on normalized input ----
-        agent_output = run_agents_wrapper(agent_input)
+    try:
+        job = job_queue.submit("project-plan", lambda: generate_plan_document(data))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
 
-        # ---- build final plan prompt ----
-        prompt = build_prompt_from_agents(agent_output)
+    return job.to_dict()
 
-        response = client.chat.completions.create(
-            model="o3",
-            messages=[
-                {"role": "system", "content": "You are a helpful and precise software architect."},
-                {"role": "user", "content": prompt},
-            ]
-        )
 
-        return {"project_plan": response.choices[0].message.content.strip()}
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    return job_queue.stats()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job.to_dict()
+
 
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "succeeded":
+        return JSONResponse(status_code=202, content=job.to_dict())
+    return job.result
+
+
+@app.post("/api/plan-runs/{run_id}/regenerate")
+async def regenerate_plan(run_id: str):
+    """
+    Write the plan document again from the stage outputs stored for `run_id`
+    (returned by /api/generate-project-plan) without rerunning any agent.
+    """
+    agent_output = await run_blocking(stored_pipeline_output, run_id)
+    if agent_output is None:
+        raise HTTPException(status_code=404, detail=f"No complete stage outputs stored for run '{run_id}'")
+    try:
+        project_plan = await inflight.do(
+            request_key("generate-project-plan", {"run_id": run_id}),
+            # a regeneration asks for a new document, not the cached one
+            lambda: write_plan(build_prompt_from_agents(agent_output), refresh=True),
+        )
     except Exception as e:
-        logger.exception("Error in /api/generate-project-plan")
+        logger.exception("Error regenerating plan for run %s", run_id)
         raise HTTPException(status_code=500, detail=str(e))
+    speculate(project_plan)
+    return {"project_plan": project_plan, "run_id": run_id}
 
 
 @app.post("/api/refine-project-plan")
 async def refine_project_plan(data: RefinementRequest):
+    async def refine():
+        # regenerate only the sections the feedback touches when possible
+        refined_plan = await refine_plan_by_sections(data.original_plan, data.user_feedback)
+        if refined_plan is None:
+            refined_plan = await chat_completion(
+                messages=[
+                    {"role": "system", "content": REFINE_PLAN.system},
+                    {"role": "user", "content": build_refine_prompt(data)},
+                ],
+                endpoint="refine-project-plan",
+            )
+        return refined_plan
+
     try:
-        prompt = f"""
-You are a senior project planning assistant. A user has submitted feedback to refine the following project plan.
-
----
-USER FEEDBACK:
-{data.user_feedback}
-
----
-ORIGINAL PROJECT PLAN:
-{data.original_plan}
-
----
-Apply the feedback precisely. Keep the overall structure of the document, and modify only what's necessary.
-Output the full refined plan with improved clarity and consistency.
-"""
-        response = client.chat.completions.create(
-            model="o3",
-            messages=[
-                {"role": "system", "content": "You are an expert planner and editor."},
-                {"role": "user", "content": prompt},
-            ]
-        )
-        return {"refined_plan": response.choices[0].message.content.strip()}
+        refined_plan = await inflight.do(request_key("refine-project-plan", data.dict()), refine)
+        speculate(refined_plan, replaces=data.original_plan)
+        return {"refined_plan": refined_plan}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def stream_refine_events(data: RefinementRequest):
+    """
+    Section-scoped refinement emits one `section` event per regenerated
+    section (with its number) as it completes; otherwise the full rewrite
+    is streamed token by token like the plan generation. If a section
+    fails, a `status` event with stage "rewriting" discards the sections
+    sent so far and the full rewrite follows.
+    """
+    yield sse_event("status", {"stage": "preparing"})
+    try:
+        scope = await plan_refinement_scope(data.original_plan, data.user_feedback)
+    except Exception as e:
+        logger.exception("Error while streaming refine-project-plan")
+        yield sse_event("error", {"detail": str(e)})
+        return
+
+    if scope is not None:
+        preamble, sections, affected = scope
+        yield sse_event("status", {"stage": "writing", "sections": affected})
+        revised = []
+        try:
+            async for section in iter_refined_sections(sections, affected, data.user_feedback):
+                revised.append(section)
+                yield sse_event("section", {"number": section.number, "markdown": section.markdown})
+        except Exception:
+            logger.warning("Section refinement failed, falling back to a full rewrite", exc_info=True)
+            yield sse_event("status", {"stage": "rewriting"})
+        else:
+            refined_plan = splice_sections(preamble, sections, revised)
+            speculate(refined_plan, replaces=data.original_plan)
+            yield sse_event("done", {"refined_plan": refined_plan})
+            return
+
+    async def prompt_factory():
+        return build_refine_prompt(data)
+
+    async for event in stream_plan_events(
+        prompt_factory,
+        REFINE_PLAN.system,
+        endpoint="refine-project-plan",
+        result_field="refined_plan",
+        announce=False,
+        replaces=data.original_plan,
+    ):
+        yield event
+
+
+@app.post("/api/refine-project-plan/stream")
+async def refine_project_plan_stream(data: RefinementRequest):
+    """
+    Streaming variant of /api/refine-project-plan (Server-Sent Events).
+    The final `done` event carries {"refined_plan": ...}.
+    """
+    return StreamingResponse(stream_refine_events(data), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def jira_ticket_task(plan: str) -> dict:
+    plan = plan_context(plan, ENDPOINT_PLAN_SECTIONS["generate-jira-tickets-from-plan"])
+    return dict(
+        agent="ticket_generator_agent",
+        description=JIRA_TICKETS.render(plan),
+        expected_output="A plain JSON list of objects — do not wrap in code fences, return ONLY JSON",
+        endpoint="generate-jira-tickets-from-plan",
+        validate=require_json_items,
+    )
+
+
+async def jira_tickets(plan: str) -> str:
+    return await run_blocking(run_agent_task, **jira_ticket_task(plan))
+
+
 @app.post("/api/generate-jira-tickets-from-plan")
 async def generate_jira_tickets(data: JiraTicketPlanRequest):
     try:
-        plan = data.plan
-        crew = Crew(
-            agents=[ticket_generator_agent],
-            tasks=[
-                Task(
-                    agent=ticket_generator_agent,
-                    description=f"Generate JIRA ticket suggestions from this plan:\n{plan}",
-                    expected_output="A plain JSON list of objects — do not wrap in code fences, return ONLY JSON",
-                )
-            ],
-            process="sequential",
-            verbose=True,
+        raw_result = await speculator.shared(
+            request_key("generate-jira-tickets-from-plan", data.plan), lambda: jira_tickets(data.plan)
         )
-
-        output = crew.kickoff()
-        raw_result = output.raw
-        json_start = raw_result.find("[")
-        json_end = raw_result.rfind("]") + 1
-        clean_output = raw_result[json_start:json_end]
-        tickets = json.loads(clean_output)
-
-        return {"tickets": tickets}
+        return {"tickets": parse_json_items(raw_result)}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/generate-jira-tickets-from-plan/stream")
+async def generate_jira_tickets_stream(data: JiraTicketPlanRequest):
+    """
+    Streaming variant (NDJSON): one `item` line per ticket as soon as it is generated.
+    """
+    return ndjson_response(stream_json_items(stream_agent_task(**jira_ticket_task(data.plan)), "generate-jira-tickets-from-plan"))
+
+
+def create_jira_issues(tickets):
+    import jira_client  # pulls in requests; only needed once tickets are pushed
+
+    results = jira_client.create_issues(tickets)
+    save_tickets_locally(results)
+    return results
+
+
 @app.post("/api/push-finalized-tickets")
 async def push_finalized_tickets(tickets: List[FinalizedTicket]):
     try:
-        auth = HTTPBasicAuth(os.getenv("JIRA_EMAIL"), os.getenv("JIRA_API_TOKEN"))
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        jira_url = f"{os.getenv('JIRA_BASE_URL')}/rest/api/3/issue"
-
-        results = []
-
-        for ticket in tickets:
-            adf_description = {
-                "type": "doc",
-                "version": 1,
-                "content": [{"type": "paragraph", "content": [{"type": "text", "text": ticket.description or ""}]}],
-            }
-            payload = {
-                "fields": {
-                    "project": {"key": os.getenv("JIRA_PROJECT_KEY")},
-                    "summary": ticket.summary,
-                    "description": adf_description,
-                    "issuetype": {"name": "Task"},
-                }
-            }
-            response = requests.post(jira_url, json=payload, headers=headers, auth=auth)
-            if response.status_code == 201:
-                issue = response.json()
-                results.append({
-                    "summary": ticket.summary,
-                    "description": ticket.description,
-                    "key": issue["key"],
-                    "url": f"{os.getenv('JIRA_BASE_URL')}/browse/{issue['key']}",
-                })
-            else:
-                results.append({"summary": ticket.summary, "error": response.text})
-
-        save_tickets_locally(results)
+        # the Jira client is blocking, so the whole push runs on the worker pool
+        results = await run_blocking(create_jira_issues, tickets)
         return {"created_issues": results}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/saved-tickets")
+async def list_saved_tickets(offset: int = 0, limit: int = 50, summary: Optional[str] = None):
+    """
+    Saved tickets, newest first. `summary` filters by a case-insensitive summary prefix.
+    """
+    if offset < 0 or not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 500")
+    return await run_blocking(ticket_store.list_tickets, offset=offset, limit=limit, summary_prefix=summary)
+
+
+@app.get("/api/saved-tickets/{key}")
+async def get_saved_ticket(key: str):
+    ticket = await run_blocking(ticket_store.get_ticket, key)
+    if not ticket:
+        raise HTTPException(status_code=404, detail=f"No saved ticket with key '{key}'")
+    return ticket
+
+
+def dev_task_extraction_task(final_plan: str) -> dict:
+    return dict(
+        agent="development_task_extractor",
+        description=DEV_TASKS.render(plan_context(final_plan, ENDPOINT_PLAN_SECTIONS["get-suggested-dev-tasks"])),
+        expected_output="A JSON list of implementation tasks",
+        endpoint="get-suggested-dev-tasks",
+        validate=require_json_items,
+    )
+
+
+async def suggested_dev_tasks(final_plan: str) -> str:
+    return await run_blocking(run_agent_task, **dev_task_extraction_task(final_plan))
+
+
+async def read_final_plan(request: Request) -> str:
+    data = await request.json()
+    final_plan = data.get("final_plan")
+    if not final_plan:
+        raise HTTPException(status_code=400, detail="Missing 'final_plan' in request")
+    return final_plan
+
+
 @app.post("/api/get-suggested-dev-tasks")
 async def get_suggested_dev_tasks(request: Request):
     try:
-        data = await request.json()
-        final_plan = data.get("final_plan")
-        if not final_plan:
-            raise HTTPException(status_code=400, detail="Missing 'final_plan' in request")
+        final_plan = await read_final_plan(request)
+        raw_output = await speculator.shared(
+            request_key("get-suggested-dev-tasks", final_plan), lambda: suggested_dev_tasks(final_plan)
+        )
+        return {"suggested_tasks": parse_json_items(raw_output)}
 
-        task = Task(
-            agent=development_task_extractor,
-            description=f"""
-Review the following project plan and extract only development tasks (APIs, DB setup, CI/CD, frontend components, etc).
-Avoid planning or meetings.
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-PROJECT PLAN:
-{final_plan}
 
-Respond ONLY with JSON list:
-[{{"summary": "...", "description": "..."}}]
-""",
-            expected_output="A JSON list of implementation tasks"
-        )
+@app.post("/api/get-suggested-dev-tasks/stream")
+async def get_suggested_dev_tasks_stream(request: Request):
+    """
+    Streaming variant (NDJSON): one `item` line per task as soon as it is generated.
+    """
+    final_plan = await read_final_plan(request)
+    return ndjson_response(stream_json_items(stream_agent_task(**dev_task_extraction_task(final_plan)), "get-suggested-dev-tasks"))
 
-        crew = Crew(agents=[development_task_extractor], tasks=[task], process="sequential", verbose=True)
-        output = crew.kickoff()
-        raw_output = output.raw
 
-        json_start = raw_output.find("[")
-        json_end = raw_output.rfind("]") + 1
-        dev_tasks = json.loads(raw_output[json_start:json_end])
+def code_snippet_messages(final_plan: str, task_name: str, task_description: str) -> list:
+    """
+    Instructions and plan first, task last: every snippet request for one plan
+    starts with the same tokens, so the provider can reuse the cached prefix.
+    """
+    plan = plan_context(final_plan, ENDPOINT_PLAN_SECTIONS["generate-code-snippet"])
+    return CODE_SNIPPET.messages(plan, f"{task_name}\n{task_description}")
 
-        return {"suggested_tasks": dev_tasks}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def code_snippet(final_plan: str, task_name: str, task_description: str,
+                       endpoint: str = "generate-code-snippet", refresh: bool = False) -> dict:
+    raw_output = await chat_completion(
+        messages=code_snippet_messages(final_plan, task_name, task_description),
+        endpoint=endpoint,
+        refresh=refresh,
+        validate=loads_tolerant,
+        # route every request for this plan to the same prompt cache
+        extra_body={"prompt_cache_key": f"code-snippet:{plan_hash(final_plan)}"},
+    )
+    return loads_tolerant(raw_output)
 
 
 @app.post("/api/generate-code-snippet")
 async def generate_code_snippet(data: CodeSnippetSingleTaskRequest):
     try:
-        prompt = f"""
-You are an experienced senior software engineer. Based on the project plan below, generate a code snippet.
-
-### PROJECT PLAN
-{data.final_plan}
-
-### TASK
-{data.task_name}
-{data.task_description}
-
-Return ONLY JSON:
-{{"task": "Task name", "language": "Python | JS | etc.", "snippet": "your code"}}
-"""
-        response = client.chat.completions.create(
-            model="o3",
-            messages=[
-                {"role": "system", "content": "You are a precise full-stack developer."},
-                {"role": "user", "content": prompt}
-            ]
+        return await inflight.do(
+            request_key("generate-code-snippet", data.dict()),
+            lambda: code_snippet(data.final_plan, data.task_name, data.task_description),
         )
-        raw_output = response.choices[0].message.content.strip()
-        try:
-            return json.loads(raw_output)
-        except json.JSONDecodeError:
-            cleaned = raw_output.strip("```json").strip("```").strip()
-            return json.loads(cleaned)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def code_snippet_results(final_plan: str, tasks: List[CodeSnippetTask]):
+    """
+    Generate the snippets with at most CODE_SNIPPET_BATCH_CONCURRENCY in flight
+    and yield {"index", "task", "snippet"} or {"index", "task", "error"} for
+    each one as soon as it finishes. A failed snippet (including output that
+    is not valid JSON) is retried CODE_SNIPPET_TASK_RETRIES times.
+    """
+    semaphore = asyncio.Semaphore(CODE_SNIPPET_BATCH_CONCURRENCY)
+
+    async def run(index, task):
+        request = {"task_name": task.task_name, "task_description": task.task_description, "final_plan": final_plan}
+        async with semaphore:
+            for attempt in range(CODE_SNIPPET_TASK_RETRIES + 1):
+                try:
+                    snippet = await inflight.do(request_key("generate-code-snippet", request), lambda: code_snippet(
+                        final_plan, task.task_name, task.task_description,
+                        endpoint="generate-code-snippet:batch", refresh=attempt > 0,
+                    ))
+                    return {"index": index, "task": task.task_name, "snippet": snippet}
+                except Exception as e:
+                    logger.warning("Snippet %d (%s) failed on attempt %d: %s", index, task.task_name, attempt + 1, e)
+                    error = e
+        return {"index": index, "task": task.task_name, "error": str(error)}
+
+    for next_done in asyncio.as_completed([run(index, task) for index, task in enumerate(tasks)]):
+        yield await next_done
+
+
+@app.post("/api/generate-code-snippet/batch")
+async def generate_code_snippets(data: CodeSnippetBatchRequest, stream: bool = True):
+    """
+    Generate snippets for several tasks of one plan concurrently.
+    Body: {"final_plan": "...", "tasks": [{"task_name", "task_description"}, ...]}.
+    Streams one NDJSON line per task as it completes (`index` is the task's
+    position in the request); with ?stream=false returns {"results": [...]}
+    in request order at the end.
+    """
+    if not data.tasks:
+        raise HTTPException(status_code=400, detail="Missing tasks")
+    if len(data.tasks) > CODE_SNIPPET_BATCH_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"At most {CODE_SNIPPET_BATCH_MAX_TASKS} tasks per batch")
+
+    results = code_snippet_results(data.final_plan, data.tasks)
+    if not stream:
+        return {"results": sorted([result async for result in results], key=lambda r: r["index"])}
+
+    async def ndjson():
+        async for result in results:
+            yield json.dumps(result) + "\n"
+
+    return ndjson_response(ndjson())
+
+
+async def dev_categories(final_plan: str) -> str:
+    return await chat_completion(
+        messages=DEV_CATEGORIES.messages(plan_context(final_plan, ENDPOINT_PLAN_SECTIONS["get-dev-categories"])),
+        endpoint="get-dev-categories",
+        validate=require_json_items,
+    )
+
+
 @app.post("/api/get-dev-categories")
 async def get_dev_categories(request: Request):
     try:
@@ -327,63 +703,175 @@ async def get_dev_categories(request: Request):
         if not final_plan:
             raise HTTPException(status_code=400, detail="Missing final_plan")
 
-        prompt = f"""
-Given this plan, extract the tech stack across: Frontend, Backend, Database, Cloud, DevOps, Design.
-Respond ONLY JSON:
-[{{"name": "Frontend", "tech": ["React"]}}, ...]
-PROJECT PLAN:
-{final_plan}
-"""
-        response = client.chat.completions.create(
-            model="o3",
-            messages=[{"role": "system", "content": "You extract tech stack."}, {"role": "user", "content": prompt}]
-        )
-        raw = response.choices[0].message.content.strip()
-        try:
-            return {"categories": json.loads(raw)}
-        except json.JSONDecodeError:
-            cleaned = raw.strip("```json").strip("```").strip()
-            return {"categories": json.loads(cleaned)}
+        raw = await speculator.shared(request_key("get-dev-categories", final_plan), lambda: dev_categories(final_plan))
+        return {"categories": parse_json_items(raw)}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+CATEGORY_AGENTS = {
+    "Frontend": "frontend_task_agent",
+    "Backend": "backend_task_agent",
+    "Database": "database_task_agent",
+    "Cloud": "cloud_task_agent",
+    "DevOps": "devops_task_agent",
+    "Design": "design_task_agent",
+}
+
+
+def category_task(category: str, final_plan: str) -> dict:
+    return dict(
+        agent=CATEGORY_AGENTS[category],
+        description=CATEGORY_TASKS.render(plan_context(final_plan, CATEGORY_PLAN_SECTIONS[category]), category),
+        expected_output="JSON list of dev tasks",
+        endpoint="get-tasks-by-category",
+        validate=require_json_items,
+    )
+
+
+def generate_category_tasks(category: str, final_plan: str) -> list:
+    return parse_json_items(run_agent_task(**category_task(category, final_plan)))
+
+
+async def category_tasks(category: str, final_plan: str) -> list:
+    return await speculator.shared(
+        request_key("get-tasks-by-category", [category, final_plan]),
+        lambda: run_blocking(generate_category_tasks, category, final_plan),
+    )
+
+
+async def read_category_request(request: Request) -> tuple:
+    data = await request.json()
+    category = data.get("category")
+    final_plan = data.get("final_plan")
+    if not category or not final_plan:
+        raise HTTPException(status_code=400, detail="Missing category or final_plan")
+
+    if category not in CATEGORY_AGENTS:
+        raise HTTPException(status_code=400, detail=f"No agent found for '{category}'")
+    return category, final_plan
+
+
 @app.post("/api/get-tasks-by-category")
 async def get_tasks_by_category(request: Request):
     try:
-        data = await request.json()
-        category = data.get("category")
-        final_plan = data.get("final_plan")
-        if not category or not final_plan:
-            raise HTTPException(status_code=400, detail="Missing category or final_plan")
-
-        agent = {
-            "Frontend": frontend_task_agent,
-            "Backend": backend_task_agent,
-            "Database": database_task_agent,
-            "Cloud": cloud_task_agent,
-            "DevOps": devops_task_agent,
-            "Design": design_task_agent
-        }.get(category)
-
-        if not agent:
-            raise HTTPException(status_code=400, detail=f"No agent found for '{category}'")
-
-        description = f"""
-Given this project plan, list 5-10 dev tasks for {category}.
-Respond ONLY JSON: [{{"summary": "...", "description": "..."}}]
-PROJECT PLAN:
-{final_plan}
-"""
-        task = Task(agent=agent, description=description, expected_output="JSON list of dev tasks")
-        crew = Crew(agents=[agent], tasks=[task], process="sequential", verbose=True)
-        output = crew.kickoff()
-
-        raw = output.raw
-        json_start = raw.find("[")
-        json_end = raw.rfind("]") + 1
-        return {"tasks": json.loads(raw[json_start:json_end])}
+        category, final_plan = await read_category_request(request)
+        return {"tasks": await category_tasks(category, final_plan)}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/get-tasks-by-category/stream")
+async def get_tasks_by_category_stream(request: Request):
+    """
+    Streaming variant (NDJSON): one `item` line per task as soon as it is generated.
+    """
+    category, final_plan = await read_category_request(request)
+    return ndjson_response(stream_json_items(stream_agent_task(**category_task(category, final_plan)), "get-tasks-by-category"))
+
+
+async def category_task_results(categories: List[str], final_plan: str):
+    """
+    Run the category agents in parallel and yield {"category", "tasks"} or
+    {"category", "error"} for each one as soon as it finishes.
+    """
+    async def run(category):
+        try:
+            return {"category": category, "tasks": await category_tasks(category, final_plan)}
+        except Exception as e:
+            logger.exception("Task generation failed for category %s", category)
+            return {"category": category, "error": str(e)}
+
+    for next_done in asyncio.as_completed([run(category) for category in categories]):
+        yield await next_done
+
+
+@app.post("/api/get-tasks-by-category/batch")
+async def get_tasks_for_all_categories(request: Request, stream: bool = True):
+    """
+    Generate tasks for several categories of one plan concurrently.
+    Body: {"final_plan": "...", "categories": ["Frontend", ...]} (default: all six).
+    Streams one NDJSON line per category as it completes; with ?stream=false
+    returns {"tasks": {category: [...]}, "errors": {category: "..."}} at the end.
+    """
+    data = await request.json()
+    final_plan = data.get("final_plan")
+    categories = data.get("categories") or list(CATEGORY_AGENTS)
+    if not final_plan:
+        raise HTTPException(status_code=400, detail="Missing final_plan")
+    unknown = [c for c in categories if c not in CATEGORY_AGENTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"No agent found for {unknown}")
+
+    results = category_task_results(categories, final_plan)
+    if not stream:
+        combined = {"tasks": {}, "errors": {}}
+        async for result in results:
+            if "error" in result:
+                combined["errors"][result["category"]] = result["error"]
+            else:
+                combined["tasks"][result["category"]] = result["tasks"]
+        return combined
+
+    async def ndjson():
+        async for result in results:
+            yield json.dumps(result) + "\n"
+
+    return ndjson_response(ndjson())
+
+
+# ------------------ SPECULATION ------------------
+
+def plan_artifact_jobs(plan: str) -> dict:
+    """
+    {request key: coroutine function} for what the results page loads after a
+    plan, under the same keys the routes above use.
+    """
+    jobs = {
+        request_key("get-dev-categories", plan): lambda: dev_categories(plan),
+        request_key("get-suggested-dev-tasks", plan): lambda: suggested_dev_tasks(plan),
+    }
+    for category in CATEGORY_AGENTS:
+        jobs[request_key("get-tasks-by-category", [category, plan])] = functools.partial(
+            run_blocking, generate_category_tasks, category, plan
+        )
+    jobs[request_key("generate-jira-tickets-from-plan", plan)] = lambda: jira_tickets(plan)
+    return jobs
+
+
+def speculate(plan: str, replaces: str = None):
+    """
+    Start precomputing the artifacts of a new plan in the background when
+    SPECULATION_ENABLED is set; the work for the plan it `replaces` stops.
+    """
+    if replaces != plan:
+        speculator.cancel(replaces)
+    speculator.start(plan, plan_artifact_jobs(plan))
+
+
+@app.get("/api/speculation/stats")
+async def get_speculation_stats():
+    return speculator.stats()
+
+
+@app.get("/api/llm-cache/stats")
+async def get_llm_cache_stats():
+    return await run_blocking(llm_cache.stats)
+
+
+@app.get("/api/llm-prompt-cache/stats")
+async def get_llm_prompt_cache_stats():
+    return prompt_cache_stats()
+
+
+@app.get("/api/llm-http-pool/stats")
+async def get_llm_http_pool_stats():
+    return pool_stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
@@ -0,0 +1,230 @@
+"""
+Latency, token and cost instrumentation.
+
+Every OpenAI call, crew stage and Jira request records its wall time here,
+and the data is exposed in Prometheus format on /metrics. Each HTTP request
+gets a trace ID that is attached to every log line written while serving it,
+including lines logged from worker threads.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# USD per 1M tokens: (prompt, completion, cached prompt). Override with MODEL_PRICES_JSON.
+MODEL_PRICES = {
+    "o3": (2.00, 8.00, 0.50),
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+}
+MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("MODEL_PRICES_JSON") or "{}").items()})
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "HTTP request latency", ["route", "method", "status"], buckets=_LATENCY_BUCKETS
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_seconds", "OpenAI / agent call latency", ["endpoint", "model", "outcome"], buckets=_LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by LLM calls", ["endpoint", "model", "kind"])
+LLM_COST_USD = Counter("llm_cost_usd_total", "Estimated LLM spend in USD", ["endpoint", "model"])
+LLM_RETRIES = Counter("llm_retries_total", "Retried LLM calls", ["endpoint", "model", "reason"])
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total", "LLM calls moved to the fallback model", ["endpoint", "model", "fallback_model", "reason"]
+)
+CONTEXT_TOKENS = Histogram(
+    "llm_context_tokens", "Upstream context tokens per prompt before (raw) and after (sent) budgeting", ["site", "kind"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "llm_queue_seconds", "Time LLM calls waited for rate-limit admission", ["model", "priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+LLM_RATE_LIMITED = Counter("llm_rate_limited_total", "429 responses that paused admission for a model", ["model"])
+LLM_PROMPT_CACHE_SECONDS = Histogram(
+    "llm_prompt_cache_seconds", "LLM call latency by whether the provider reused a cached prompt prefix",
+    ["endpoint", "model", "prompt_cache"], buckets=_LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "crew_stage_seconds", "Planning pipeline stage latency", ["stage", "outcome"], buckets=_LATENCY_BUCKETS
+)
+STAGE_RESUMED = Counter("crew_stage_resumed_total", "Stage outputs taken from checkpoints of an earlier attempt", ["stage"])
+STAGE_REUSED = Counter("crew_stage_reused_total", "Stage outputs reused from a similar earlier brief", ["stage"])
+JIRA_REQUEST_SECONDS = Histogram(
+    "jira_request_seconds", "Jira REST request latency", ["operation", "status"], buckets=_LATENCY_BUCKETS
+)
+JIRA_RETRIES = Counter("jira_retries_total", "Retried Jira requests", ["operation", "reason"])
+
+COALESCED_REQUESTS = Counter(
+    "singleflight_requests_total", "Requests that started (leader) or joined (follower) a shared computation", ["endpoint", "role"]
+)
+LLM_HTTP_REQUESTS = Counter("llm_http_requests_total", "Requests sent through the shared LLM HTTP pool", ["client"])
+LLM_HTTP_CONNECTIONS = Gauge(
+    "llm_http_pool_connections", "Shared LLM HTTP pool: active/idle connections and queued requests", ["client", "state"]
+)
+
+SPECULATIVE_JOBS = Counter(
+    "speculative_jobs_total", "Speculatively precomputed plan artifacts by outcome", ["artifact", "outcome"]
+)
+SPECULATIVE_TOKENS = Counter(
+    "llm_speculative_tokens_total", "Tokens used by speculative work no user had asked for yet", ["endpoint", "model"]
+)
+SPECULATIVE_COST_USD = Counter(
+    "llm_speculative_cost_usd_total", "Estimated spend of speculative work no user had asked for yet", ["endpoint", "model"]
+)
+
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+# the speculation.Speculator job the current task runs for, if any
+speculation_var = contextvars.ContextVar("speculation", default=None)
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> [calls, calls with cached tokens, prompt tokens, cached tokens, seconds of hits, seconds of misses]
+_prompt_cache_totals = {}
+_prompt_cache_lock = threading.Lock()
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def configure_logging():
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [trace=%(trace_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    # per-call client logs are already covered by the llm/jira lines above
+    for noisy in ("LiteLLM", "httpx", "urllib3"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+
+def new_trace_id(incoming: str = None) -> str:
+    trace_id = incoming or uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    # dated snapshots (e.g. gpt-4o-mini-2024-07-18) are priced like their base model
+    prices = MODEL_PRICES.get(model) or next(
+        (p for name, p in sorted(MODEL_PRICES.items(), key=lambda i: -len(i[0])) if model.startswith(name)), None
+    )
+    if not prices:
+        return 0.0
+    prompt_price, completion_price, cached_price = prices
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * prompt_price + cached_tokens * cached_price + completion_tokens * completion_price) / 1_000_000
+
+
+def record_llm_call(endpoint: str, model: str, seconds: float, outcome: str = "ok",
+                    prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0):
+    endpoint = endpoint or "unknown"
+    LLM_CALL_SECONDS.labels(endpoint, model, outcome).observe(seconds)
+    LLM_TOKENS.labels(endpoint, model, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(endpoint, model, "completion").inc(completion_tokens)
+    LLM_TOKENS.labels(endpoint, model, "cached").inc(cached_tokens)
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+    LLM_COST_USD.labels(endpoint, model).inc(cost)
+    if outcome == "ok" and prompt_tokens:
+        _record_prompt_cache(endpoint, model, seconds, prompt_tokens, cached_tokens)
+    job = speculation_var.get()
+    if job is not None and job.priority == "speculative":
+        SPECULATIVE_TOKENS.labels(endpoint, model).inc(prompt_tokens + completion_tokens)
+        SPECULATIVE_COST_USD.labels(endpoint, model).inc(cost)
+    logger.info(
+        "llm endpoint=%s model=%s outcome=%s seconds=%.2f prompt_tokens=%d completion_tokens=%d cached_tokens=%d cost_usd=%.5f",
+        endpoint, model, outcome, seconds, prompt_tokens, completion_tokens, cached_tokens, cost,
+    )
+
+
+def _record_prompt_cache(endpoint: str, model: str, seconds: float, prompt_tokens: int, cached_tokens: int):
+    hit = cached_tokens > 0
+    LLM_PROMPT_CACHE_SECONDS.labels(endpoint, model, "hit" if hit else "miss").observe(seconds)
+    with _prompt_cache_lock:
+        totals = _prompt_cache_totals.setdefault(endpoint, [0, 0, 0, 0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += hit
+        totals[2] += prompt_tokens
+        totals[3] += cached_tokens
+        totals[4 if hit else 5] += seconds
+
+
+def prompt_cache_stats() -> dict:
+    """
+    Provider prompt-cache use per endpoint since startup: share of calls that
+    reused a cached prefix, share of prompt tokens served from the cache and
+    the mean latency of calls with and without a cached prefix.
+    """
+    with _prompt_cache_lock:
+        totals = {endpoint: list(values) for endpoint, values in _prompt_cache_totals.items()}
+    stats = {}
+    for endpoint, (calls, hits, prompt_tokens, cached_tokens, hit_seconds, miss_seconds) in sorted(totals.items()):
+        stats[endpoint] = {
+            "calls": calls,
+            "call_hit_rate": round(hits / calls, 4),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "token_hit_rate": round(cached_tokens / prompt_tokens, 4),
+            "mean_seconds_hit": round(hit_seconds / hits, 3) if hits else None,
+            "mean_seconds_miss": round(miss_seconds / (calls - hits), 3) if calls > hits else None,
+        }
+    return stats
+
+
+def record_openai_usage(endpoint: str, model: str, seconds: float, usage, outcome: str = "ok"):
+    """
+    Record a call from the `usage` object of an OpenAI response (may be None).
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    record_llm_call(
+        endpoint,
+        model,
+        seconds,
+        outcome,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+    )
+
+
+def record_crew_usage(endpoint: str, model: str, seconds: float, usage, outcome: str = "ok"):
+    """
+    Record a crew run from CrewOutput.token_usage (crewai UsageMetrics, may be None).
+    """
+    record_llm_call(
+        endpoint,
+        model,
+        seconds,
+        outcome,
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        cached_tokens=getattr(usage, "cached_prompt_tokens", 0) or 0,
+    )
+
+
+@contextmanager
+def track_stage(stage: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage, outcome).observe(seconds)
+        logger.info("stage=%s outcome=%s seconds=%.2f", stage, outcome, seconds)
+
+
+def metrics_payload():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,87 @@
+"""
+Model routing per call site.
+
+Every LLM call names its call site (the `endpoint` label used for metrics,
+e.g. "get-dev-categories" or "stage:risk"). The site's profile decides the
+model, the latency budget, the output token cap, the model to fall back
+to when the primary model times out or is overloaded, and the priority class
+the call queues with when the model's rate limit is reached (see
+rate_limiter): interactive edits go ahead of batch generation.
+
+Profiles are overridden with MODEL_PROFILES_JSON, e.g.
+    {"generate-project-plan": {"model": "o4-mini", "latency_budget": 90},
+     "stage": {"fallback_model": null}}
+Fields that are left out keep their defaults.
+"""
+import json
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    model: str
+    # seconds for the whole call, fallback included
+    latency_budget: float
+    max_tokens: Optional[int] = None
+    fallback_model: Optional[str] = None
+    # share of the budget the primary model gets when a fallback is configured
+    primary_share: float = 0.75
+    # "interactive", "standard" or "batch"
+    priority: str = "standard"
+
+    def timeouts(self) -> tuple:
+        """
+        (primary timeout, fallback timeout) in seconds.
+        """
+        if not self.fallback_model:
+            return self.latency_budget, 0.0
+        primary = self.latency_budget * self.primary_share
+        return primary, self.latency_budget - primary
+
+
+# Sites are matched exactly first, then by the part before ":" ("stage:risk" -> "stage"), then "default".
+DEFAULT_PROFILES = {
+    "default": ModelProfile("gpt-4o-mini", latency_budget=60, max_tokens=4000, fallback_model="gpt-4o"),
+    # long-form reasoning
+    "generate-project-plan": ModelProfile("o3", latency_budget=240, max_tokens=32000, fallback_model="gpt-4o", priority="batch"),
+    "refine-project-plan": ModelProfile("o3", latency_budget=180, max_tokens=32000, fallback_model="gpt-4o", priority="interactive"),
+    "generate-code-snippet": ModelProfile("o3", latency_budget=90, max_tokens=8000, fallback_model="gpt-4o", priority="interactive"),
+    "generate-code-snippet:batch": ModelProfile("o3", latency_budget=90, max_tokens=8000, fallback_model="gpt-4o", priority="batch"),
+    # cheap extraction / classification
+    "free-text-extraction": ModelProfile("gpt-4o-mini", latency_budget=20, max_tokens=1500, fallback_model="gpt-4o", priority="batch"),
+    "get-dev-categories": ModelProfile("gpt-4o-mini", latency_budget=20, max_tokens=1000, fallback_model="gpt-4o"),
+    "refine-scope": ModelProfile("gpt-4o-mini", latency_budget=10, max_tokens=100, priority="interactive"),
+    # crew agents
+    "stage": ModelProfile("gpt-4o-mini", latency_budget=90, max_tokens=3000, fallback_model="gpt-4o", priority="batch"),
+    "generate-jira-tickets-from-plan": ModelProfile(
+        "gpt-4o-mini", latency_budget=90, max_tokens=6000, fallback_model="gpt-4o", priority="batch"
+    ),
+    "get-suggested-dev-tasks": ModelProfile("gpt-4o-mini", latency_budget=60, max_tokens=4000, fallback_model="gpt-4o"),
+    "get-tasks-by-category": ModelProfile("gpt-4o-mini", latency_budget=60, max_tokens=4000, fallback_model="gpt-4o"),
+}
+
+
+def load_profiles(overrides: str = None) -> dict:
+    profiles = dict(DEFAULT_PROFILES)
+    for site, fields in json.loads(overrides or "{}").items():
+        base = profiles.get(site) or profiles.get(site.split(":", 1)[0]) or profiles["default"]
+        profiles[site] = replace(base, **fields)
+    return profiles
+
+
+MODEL_PROFILES = load_profiles(os.getenv("MODEL_PROFILES_JSON"))
+
+
+def get_profile(site: str = None) -> ModelProfile:
+    site = site or "default"
+    return MODEL_PROFILES.get(site) or MODEL_PROFILES.get(site.split(":", 1)[0]) or MODEL_PROFILES["default"]
+
+
+def route(site: str = None, model: str = None) -> ModelProfile:
+    """
+    Profile for `site`; an explicit `model` replaces the profile's primary model.
+    """
+    profile = get_profile(site)
+    return replace(profile, model=model) if model and model != profile.model else profile
@@ -0,0 +1,114 @@
+"""
+Section-scoped plan refinement.
+
+Instead of asking o3 to rewrite the whole plan for every piece of feedback,
+the plan is split into its numbered sections, a cheap model picks the
+sections the feedback touches, only those are regenerated (concurrently) and
+they are spliced back into the original document.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from llm_client import chat_completion
+from plan_sections import PlanSection, split_plan, join_plan, match_sections_by_keywords
+from prompts import REFINE_SCOPE, REFINE_SECTION
+# Above this many affected sections a full rewrite is used instead
+REFINE_MAX_SCOPED_SECTIONS = int(os.getenv("REFINE_MAX_SCOPED_SECTIONS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+def _outline(sections: List[PlanSection]) -> str:
+    return "\n".join(f"{s.number}. {s.title}" for s in sections)
+
+
+async def select_affected_sections(feedback: str, sections: List[PlanSection]) -> List[int]:
+    """
+    Ask a small model which sections the feedback affects. Falls back to
+    keyword matching when the answer cannot be parsed.
+    """
+    present = {s.number for s in sections}
+    try:
+        raw = await chat_completion(
+            messages=REFINE_SCOPE.messages(_outline(sections), feedback),
+            endpoint="refine-scope",
+            temperature=0,
+        )
+        numbers = json.loads(raw[raw.find("["):raw.rfind("]") + 1])
+        if 0 in numbers:
+            return sorted(present)
+        return sorted({int(n) for n in numbers} & present)
+    except Exception:
+        logger.warning("Could not classify refinement feedback, falling back to keywords", exc_info=True)
+        return sorted(set(match_sections_by_keywords(feedback)) & present)
+
+
+async def refine_section(section: PlanSection, feedback: str, sections: List[PlanSection]) -> PlanSection:
+    revised = await chat_completion(
+        # outline and feedback are the same for every section of one refinement
+        messages=REFINE_SECTION.messages(_outline(sections), feedback, section.markdown),
+        endpoint="refine-project-plan",
+    )
+    revised = revised.strip().removeprefix("```markdown").removeprefix("```").removesuffix("```").strip()
+    if not revised.startswith(section.heading):
+        first_line, _, rest = revised.partition("\n")
+        # keep the original heading so the document structure stays stable
+        revised = f"{section.heading}\n{rest if first_line.lstrip().startswith('#') else revised}".strip()
+    return PlanSection(number=section.number, heading=section.heading, markdown=revised)
+
+
+async def plan_refinement_scope(original_plan: str, feedback: str) -> Optional[Tuple[str, List[PlanSection], List[int]]]:
+    """
+    Returns (preamble, sections, affected section numbers), or None when the
+    plan has to be rewritten as a whole: the plan is not in the numbered
+    layout, no section could be identified, or too many sections change.
+    """
+    preamble, sections = split_plan(original_plan)
+    if len(sections) < 2:
+        return None
+
+    affected = await select_affected_sections(feedback, sections)
+    if not affected or len(affected) > REFINE_MAX_SCOPED_SECTIONS:
+        return None
+    return preamble, sections, affected
+
+
+async def iter_refined_sections(sections: List[PlanSection], affected: List[int], feedback: str):
+    """
+    Regenerate the affected sections concurrently and yield each one as soon
+    as it is done. The first failure is raised and the sections still being
+    regenerated are cancelled, as they are when the caller stops early.
+    """
+    jobs = [asyncio.create_task(refine_section(s, feedback, sections)) for s in sections if s.number in affected]
+    try:
+        for next_done in asyncio.as_completed(jobs):
+            yield await next_done
+    finally:
+        for job in jobs:
+            job.cancel()
+
+
+def splice_sections(preamble: str, sections: List[PlanSection], revised: List[PlanSection]) -> str:
+    by_number = {s.number: s for s in revised}
+    return join_plan(preamble, [by_number.get(s.number, s) for s in sections])
+
+
+async def refine_plan_by_sections(original_plan: str, feedback: str) -> Optional[str]:
+    """
+    Refine only the sections affected by the feedback. Returns None when a
+    full rewrite is needed instead, including when a section fails.
+    """
+    scope = await plan_refinement_scope(original_plan, feedback)
+    if scope is None:
+        return None
+    preamble, sections, affected = scope
+    try:
+        revised = [section async for section in iter_refined_sections(sections, affected, feedback)]
+    except Exception:
+        logger.warning("Section refinement failed, falling back to a full rewrite", exc_info=True)
+        return None
+    return splice_sections(preamble, sections, revised)
+
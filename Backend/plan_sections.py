@@ -0,0 +1,182 @@
+"""
+Parser for the project plan documents produced from build_prompt_from_agents.
+
+A plan is a title/preamble followed by the 11 numbered sections requested in
+the prompt. split_plan() cuts a plan into those sections and join_plan()
+puts it back together, so callers can work on individual sections.
+get_plan_index() caches the split per plan, so endpoints can send only the
+sections they need instead of the whole plan.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Numbered sections requested by build_prompt_from_agents
+PLAN_SECTION_TITLES = {
+    1: "Executive Summary & Project Charter",
+    2: "Business Goals and Objectives",
+    3: "Work Breakdown Structure (WBS) with Effort Estimation",
+    4: "Task Dependencies",
+    5: "Risk Assessment and Mitigation",
+    6: "Architecture Recommendation",
+    7: "Timeline and Sprint Plan",
+    8: "Resource & Team Structure",
+    9: "Budget & Cost Breakdown",
+    10: "Quality and Governance",
+    11: "Best Practices and Modern Trends",
+}
+
+# Short names used by callers to request sections
+PLAN_SECTION_KEYS = {
+    "executive_summary": 1,
+    "goals": 2,
+    "wbs": 3,
+    "dependencies": 4,
+    "risks": 5,
+    "architecture": 6,
+    "timeline": 7,
+    "team": 8,
+    "budget": 9,
+    "quality": 10,
+    "best_practices": 11,
+}
+
+PLAN_INDEX_CACHE_SIZE = int(os.getenv("PLAN_INDEX_CACHE_SIZE", "128"))
+
+# Words that point at a section when they show up in feedback or headings
+PLAN_SECTION_KEYWORDS = {
+    1: ["executive", "summary", "charter", "stakeholder", "scope", "vision", "mission", "business case", "success criteria"],
+    2: ["goal", "objective", "kpi", "accessibility goal", "compliance objective"],
+    3: ["wbs", "work breakdown", "deliverable", "effort", "story point", "estimate"],
+    4: ["dependenc", "critical path", "parallel", "bottleneck"],
+    5: ["risk", "mitigation", "contingency plan"],
+    6: ["architecture", "microservice", "monolith", "frontend", "backend", "database", "cloud", "ci/cd", "tech stack", "security"],
+    7: ["timeline", "sprint", "milestone", "schedule", "roadmap", "deadline", "month", "week"],
+    8: ["team", "resource", "role", "staff", "headcount", "developer", "capacity", "hire"],
+    9: ["budget", "cost", "price", "€", "$", "day rate", "contingency buffer", "spend"],
+    10: ["quality", "qa", "test", "governance", "ceremon", "standup", "retrospective", "change management"],
+    11: ["best practice", "trend", "observability", "owasp", "wcag", "cloud-native", "modern"],
+}
+
+_HEADING_RE = re.compile(r"^\s{0,3}(#{1,4})\s*(?:\*\*)?\s*(\d{1,2})[.)]\s*(.+?)\s*(?:\*\*)?\s*$")
+
+
+@dataclass
+class PlanSection:
+    number: int
+    heading: str
+    markdown: str
+
+    @property
+    def title(self) -> str:
+        return PLAN_SECTION_TITLES[self.number]
+
+
+def split_plan(plan: str) -> Tuple[str, List[PlanSection]]:
+    """
+    Split a plan into (preamble, sections). Only headings numbered 1-11 in
+    ascending order, and no deeper than the first section heading, count as
+    section boundaries, so numbered sub-headings inside a section stay part
+    of it. Returns an empty list when the plan does not follow the numbered
+    layout.
+    """
+    lines = plan.splitlines(keepends=True)
+    boundaries = []
+    last_number = 0
+    max_level = 4
+    for index, line in enumerate(lines):
+        match = _HEADING_RE.match(line)
+        if not match:
+            continue
+        level, number = len(match.group(1)), int(match.group(2))
+        if number in PLAN_SECTION_TITLES and number > last_number and level <= max_level:
+            boundaries.append((index, number, line.strip()))
+            last_number = number
+            max_level = level if len(boundaries) == 1 else max_level
+
+    if not boundaries:
+        return plan, []
+
+    preamble = "".join(lines[:boundaries[0][0]])
+    sections = []
+    for position, (start, number, heading) in enumerate(boundaries):
+        end = boundaries[position + 1][0] if position + 1 < len(boundaries) else len(lines)
+        sections.append(PlanSection(number=number, heading=heading, markdown="".join(lines[start:end]).strip()))
+    return preamble, sections
+
+
+def join_plan(preamble: str, sections: List[PlanSection]) -> str:
+    body = "\n\n".join(section.markdown for section in sections)
+    preamble = preamble.strip()
+    return f"{preamble}\n\n{body}" if preamble else body
+
+
+def match_sections_by_keywords(text: str) -> List[int]:
+    """
+    Section numbers mentioned in free text, either explicitly
+    ("section 9", "§4") or through their keywords.
+    """
+    lowered = text.lower()
+    numbers = {int(n) for n in re.findall(r"(?:section|§)\s*(\d{1,2})", lowered) if int(n) in PLAN_SECTION_TITLES}
+    for number, keywords in PLAN_SECTION_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            numbers.add(number)
+    return sorted(numbers)
+
+
+def plan_hash(plan: str) -> str:
+    """
+    Identity of a plan document; every cache or key that refers to a plan uses this.
+    """
+    return hashlib.sha256(plan.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class PlanIndex:
+    plan: str
+    preamble: str
+    sections: Dict[int, PlanSection]
+
+    def context(self, keys: List[str]) -> str:
+        """
+        The plan title plus the requested sections, in document order.
+        Falls back to the full plan when the plan is not in the numbered
+        layout or none of the requested sections are present.
+        """
+        numbers = sorted({PLAN_SECTION_KEYS[key] for key in keys})
+        selected = [self.sections[n] for n in numbers if n in self.sections]
+        if not selected:
+            return self.plan
+        return join_plan(self.preamble, selected)
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def get_plan_index(plan: str) -> PlanIndex:
+    """
+    Parse a plan once and reuse the index for every later request on the same plan.
+    """
+    key = plan_hash(plan)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    preamble, sections = split_plan(plan)
+    index = PlanIndex(plan=plan, preamble=preamble, sections={s.number: s for s in sections})
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > PLAN_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def plan_context(plan: str, keys: List[str]) -> str:
+    return get_plan_index(plan).context(keys)
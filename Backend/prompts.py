@@ -0,0 +1,258 @@
+"""
+Prompt templates for every direct LLM call and agent task.
+
+Providers cache prompts by exact prefix, so each prompt is assembled from
+the most stable part to the most variable one:
+
+1. a static prefix: the system prompt, the instructions and the output
+   format, identical for every call of the template
+2. per-plan context: the plan (or the sections a call needs), shared by
+   every call made on the same plan
+3. per-request data: the feedback, the task, the category
+
+Nothing variable may be put into the instructions; the variable parts are
+appended after them, each under its own heading, in the order of `parts`.
+How much of each prompt came from the cache is recorded per call from the
+responses' cached_tokens (see metrics.prompt_cache_stats).
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    system: str
+    instructions: str
+    # headings of the variable parts, most stable first
+    parts: tuple = ()
+
+    def render(self, *values) -> str:
+        """
+        The user prompt: the instructions followed by one block per part.
+        """
+        if len(values) != len(self.parts):
+            raise ValueError(f"Expected {len(self.parts)} prompt parts ({', '.join(self.parts)}), got {len(values)}")
+        blocks = [self.instructions.strip()]
+        blocks += [f"---\n{heading}:\n{value}" for heading, value in zip(self.parts, values)]
+        return "\n\n".join(blocks) + "\n"
+
+    def messages(self, *values) -> list:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render(*values)},
+        ]
+
+
+# ------------------ PLAN ------------------
+
+PLAN_DOCUMENT = PromptTemplate(
+    system="You are a helpful and precise software architect.",
+    instructions="""
+You are a senior software architect and project planner. Based on the following multi-agent analysis, generate a **professional, execution-ready planning document** for the described project.
+
+Your output must include **structured, detailed, and realistic execution-level planning**, with human-readable sections for the UI.
+Make sure necessary texts are bolded or highlighted for clarity.
+--- Human-readable sections to include ---
+
+# Include the title of the Project Plan at the top of the document. It should be highlighted as a title.
+
+### 1. Executive Summary & Project Charter
+- Background and justification
+- Vision, mission, and business case
+- Stakeholder matrix and approval authority
+- Scope boundaries (inclusions and exclusions)
+- Success criteria and KPIs
+- This is a critical section, do not be generic
+- Keep the content in detail, do not be generic
+
+### 2. Business Goals and Objectives
+- Strategic business goals
+- Technical and operational objectives
+- UX and accessibility goals
+- Compliance and security objectives
+- Highlight key goals and objectives
+- Keep the content in detail, do not be generic
+
+### 3. Work Breakdown Structure (WBS) with Effort Estimation
+- Major deliverables and sub-deliverables
+- WBS codes and task groupings
+- **Effort estimation for each task (in working-days or story points)**
+- Role assignment (who is expected to work on it)
+- Include a WBS Table with tasks, WBS codes, effort estimates, and role assignments
+- Highlight high-effort tasks and potential resource constraints
+
+### 4. Task Dependencies
+- Explicit mapping of dependencies (which tasks must finish before others start)
+- Tasks that can run in parallel across teams
+- Critical path identification
+- Highlight critical dependencies and potential bottlenecks
+- Keep the content in detail, do not be generic
+- Include Tables if needed
+- This is a critical section, do not be generic
+- Make sure to give a detailed task dependency mapping with realistic dependencies and parallel tasks.
+- The critical path should be clearly identified and explained. Depict it in a nice way which is easy to understand.
+
+### 5. Risk Assessment and Mitigation
+- Technical, resource, and integration risks
+- Security and compliance risks
+- Mitigation strategies
+- Contingency plans
+- Risk monitoring approach
+- Highlight high-impact/high-probability risks
+- Suggest risk mitigation strategies
+- Keep the content in detail, do not be generic
+
+### 6. Architecture Recommendation
+- System architecture pattern (e.g. microservices)
+- Frontend, backend, database, cloud design, UI/UX
+- DevOps and CI/CD strategy
+- Security and data flow
+- Make sure to give only 1 recommendation, not multiple options
+- Justify why this is the best fit for the project
+- This should be represented in a bullet-point format, do not be generic
+
+### 7. Timeline and Sprint Plan
+- Realistic sprint plan (2-week sprints)
+- For 6 months → ~12 sprints, mapped with features/deliverables
+- Parallel execution shown (e.g., backend + frontend teams working simultaneously)
+- Milestones and critical dependencies
+- High-level timeline & Milestones Table
+- Highlight if timeline is too aggressive for scope/team size
+- This is a critical section, do not be generic. Make sure to give a detailed timeline with realistic milestones. Table is mandatory.
+
+### 8. Resource & Team Structure
+- Detailed role assignments (frontend devs, backend devs, data engineers, QA, DevOps, architects, etc.)
+- Mapping of effort to team capacity
+- Highlight if current team size is under/over capacity for timeline
+
+### 9. Budget & Cost Breakdown
+- Estimate the total budget. Calculate it based on the project's team size, roles, and timeline.
+- Provide a detailed cost breakdown table with the following columns: Category, Calculation Basis, Estimated Cost, and Notes.
+- Calculate Labor Costs: Use the formula: (Number of people in a role) × (Number of working days) × (Average fully-loaded day rate for that role). Define the average day rates used in your calculation (e.g., Developer: €600/day, Project Manager: €800/day).
+- Itemize Non-Labor Costs: Separately list and estimate infrastructure (cloud hosting, SaaS tools), third-party services/licensing, and a contingency buffer.
+- Justify the Contingency Buffer: Set the contingency to 10-20% of the total budget and explicitly link this to the high-risk items identified in the Risk Assessment section (e.g., "15% contingency due to AI integration complexity").
+- Budget Tracking: Recommend a specific method for tracking (e.g., "Monthly budget vs. actuals review using a dedicated dashboard").
+- Adequacy Analysis: Explicitly state: "Based on this calculation, the estimated budget is [Sufficient/Insufficient] for the defined scope and timeline."
+- If Insufficient, Recommend Specific Actions: Provide concrete options, for example:
+- Descope: "Delay the implementation of [Specific Feature] to a Phase 2."
+- Extend Timeline: "A 2-month extension would reduce monthly burn rate by X%."
+- Adjust Resources: "Reduce the frontend team by one developer and extend the timeline for frontend tasks."
+- Mention that the budget is an estimate and actual costs may vary based on real-world factors.
+
+### 10. Quality and Governance
+- QA strategy (unit tests, integration tests, UAT)
+- Governance, communication & escalation protocols
+- Agile ceremonies (standups, retrospectives)
+- Change management process
+- Highlight critical quality risks and mitigation strategies
+- Keep the content in detail, do not be generic
+- This should be represented in a bullet-point format, do not be generic
+
+### 11. Best Practices and Modern Trends
+- Observability, performance optimization
+- Cloud-native practices
+- DevOps & CI/CD maturity model alignment
+- Security best practices (OWASP Top 10, data protection)
+- Accessibility standards (WCAG compliance)
+- Highlight cutting-edge practices relevant to the project
+- Justify why these practices are important for the project's success
+- This should be represented in a bullet-point format, do not be generic
+
+--- End of human-readable requirements ---
+
+Do not include any sections beyond those listed above. Ensure the document is well-structured, detailed, and tailored to the specific project described in the analysis.
+""",
+    parts=("MULTI-AGENT ANALYSIS",),
+)
+
+REFINE_PLAN = PromptTemplate(
+    system="You are an expert planner and editor.",
+    instructions="""
+You are a senior project planning assistant. A user has submitted feedback to refine the project plan below.
+Apply the feedback precisely. Keep the overall structure of the document, and modify only what's necessary.
+Output the full refined plan with improved clarity and consistency.
+""",
+    parts=("ORIGINAL PROJECT PLAN", "USER FEEDBACK"),
+)
+
+REFINE_SCOPE = PromptTemplate(
+    system="You map plan feedback to document sections.",
+    instructions="""
+A user gave feedback on a project plan with the numbered sections listed below.
+Which sections must change to apply this feedback, including sections whose numbers or statements would become inconsistent?
+Respond ONLY with a JSON list of section numbers, e.g. [9, 7]. Respond with [0] if the whole document must change.
+""",
+    parts=("PLAN SECTIONS", "USER FEEDBACK"),
+)
+
+REFINE_SECTION = PromptTemplate(
+    system=REFINE_PLAN.system,
+    instructions="""
+You are a senior project planning assistant editing one section of a larger project plan.
+Apply the user feedback to the section to revise as far as it concerns it. The other sections of the outline are revised separately if needed.
+Keep the heading line exactly as it is and keep the section's structure, tables and formatting.
+Output ONLY the revised section, starting with its heading line.
+""",
+    parts=("PLAN OUTLINE", "USER FEEDBACK", "SECTION TO REVISE"),
+)
+
+# ------------------ PLAN ARTIFACTS ------------------
+
+CODE_SNIPPET = PromptTemplate(
+    system="You are a precise full-stack developer.",
+    instructions="""
+You are an experienced senior software engineer. Based on the project plan below, generate a code snippet for the task at the end.
+
+Return ONLY JSON:
+{"task": "Task name", "language": "Python | JS | etc.", "snippet": "your code"}
+""",
+    parts=("PROJECT PLAN", "TASK"),
+)
+
+DEV_CATEGORIES = PromptTemplate(
+    system="You extract tech stack.",
+    instructions="""
+Given the project plan below, extract the tech stack across: Frontend, Backend, Database, Cloud, DevOps, Design.
+Respond ONLY JSON:
+[{"name": "Frontend", "tech": ["React"]}, ...]
+""",
+    parts=("PROJECT PLAN",),
+)
+
+# Agent tasks: the system prompt is the agent's persona (see agents.AGENT_SPECS)
+
+JIRA_TICKETS = PromptTemplate(
+    system="",
+    instructions="Generate JIRA ticket suggestions from the project plan below.",
+    parts=("PROJECT PLAN",),
+)
+
+DEV_TASKS = PromptTemplate(
+    system="",
+    instructions="""
+Review the project plan below and extract only development tasks (APIs, DB setup, CI/CD, frontend components, etc).
+Avoid planning or meetings.
+
+Respond ONLY with JSON list:
+[{"summary": "...", "description": "..."}]
+""",
+    parts=("PROJECT PLAN",),
+)
+
+CATEGORY_TASKS = PromptTemplate(
+    system="",
+    instructions="""
+Given the project plan below, list 5-10 dev tasks for the category named at the end.
+Respond ONLY JSON: [{"summary": "...", "description": "..."}]
+""",
+    parts=("PROJECT PLAN", "CATEGORY"),
+)
+
+# ------------------ BRIEF ------------------
+
+FREE_TEXT_EXTRACTION = PromptTemplate(
+    system="You are a precise project planner.",
+    instructions="""
+You are a software project planner. Extract the following fields from the project description below and respond ONLY with valid JSON matching the structure exactly.
+""",
+    parts=("FIELDS", "PROJECT DESCRIPTION"),
+)
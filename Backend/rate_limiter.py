@@ -0,0 +1,393 @@
+"""
+Admission control for all OpenAI traffic.
+
+Every direct OpenAI call and every crew run takes requests and tokens from a
+per-model token bucket (requests/min and tokens/min) before it is sent. Calls
+that do not fit wait in a per-model queue ordered by priority class
+(interactive < standard < batch, see the `priority` of the model_router
+profiles; speculative precomputation comes last): a waiting call goes ahead of lower classes queued less than
+LLM_PRIORITY_STEP_SECONDS per class earlier, so batch work is delayed but
+never starved. Token use is estimated up front and settled with the real
+usage afterwards.
+
+A 429 pauses the model's bucket for the Retry-After time, so the other calls
+queue instead of running into the same limit, and the rejected call is
+queued again while its latency budget allows.
+
+Buckets live in memory per process, or in a SQLite file shared by all
+workers on the host when RATE_LIMIT_SHARED_PATH is set. SQLite bucket
+updates never run on the event loop: async admission waits for them on a
+dedicated thread, and settle/pause hand them to that thread without waiting.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from context_budget import count_tokens
+from metrics import LLM_QUEUE_SECONDS, LLM_RATE_LIMITED, speculation_var
+
+# (requests/min, tokens/min) per model; override with MODEL_RATE_LIMITS_JSON, 0 = unlimited
+MODEL_RATE_LIMITS = {
+    "o3": (5000, 800_000),
+    "gpt-4o": (5000, 800_000),
+    "gpt-4o-mini": (5000, 4_000_000),
+}
+MODEL_RATE_LIMITS.update({k: tuple(v) for k, v in json.loads(os.getenv("MODEL_RATE_LIMITS_JSON") or "{}").items()})
+# Limits for models not listed above
+LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "0"))
+LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "0"))
+# Completion tokens assumed per call until the real usage is known
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "1000"))
+LLM_PRIORITY_STEP_SECONDS = float(os.getenv("LLM_PRIORITY_STEP_SECONDS", "30"))
+# Pause after a 429 without a Retry-After header
+LLM_RATE_LIMIT_PAUSE_SECONDS = float(os.getenv("LLM_RATE_LIMIT_PAUSE_SECONDS", "2"))
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH", "")
+
+PRIORITY_CLASSES = {"interactive": 0, "standard": 1, "batch": 2, "speculative": 3}
+
+# Bucket updates that would block the event loop; one thread keeps them in order
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limiter")
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionTimeout(Exception):
+    """
+    The call could not be admitted within its latency budget.
+    """
+
+
+def effective_priority(priority: str) -> str:
+    """
+    `priority`, unless the current task does speculative work (see speculation).
+    """
+    job = speculation_var.get()
+    return job.priority if job is not None and job.priority else priority
+
+
+def model_limits(model: str) -> tuple:
+    return MODEL_RATE_LIMITS.get(model, (LLM_DEFAULT_RPM, LLM_DEFAULT_TPM))
+
+
+# ------------------ BUCKETS ------------------
+
+class MemoryBuckets:
+    # updates never block, so they may run on the event loop
+    blocking = False
+
+    def __init__(self):
+        # model -> [requests, tokens, updated_at, paused_until]
+        self._state = {}
+
+    def take(self, model: str, tokens: int, now: float) -> float:
+        """
+        Take one request and `tokens` from the model's buckets, or return the
+        seconds until they would fit (nothing is taken then).
+        """
+        rpm, tpm = model_limits(model)
+        state = self._state.setdefault(model, [float(rpm), float(tpm), now, 0.0])
+        return _take(state, rpm, tpm, tokens, now)
+
+    def settle(self, model: str, tokens: int):
+        state = self._state.get(model)
+        if state is not None:
+            state[1] = min(state[1] + tokens, float(model_limits(model)[1]))
+
+    def pause(self, model: str, until: float):
+        rpm, tpm = model_limits(model)
+        state = self._state.setdefault(model, [float(rpm), float(tpm), time.time(), 0.0])
+        state[3] = max(state[3], until)
+
+
+class SqliteBuckets:
+    """
+    Buckets shared through SQLite by every worker process on the host.
+    """
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    model TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    paused_until REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+        return self._conn
+
+    def _update(self, model: str, change):
+        db = self._db()
+        rpm, tpm = model_limits(model)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT requests, tokens, updated_at, paused_until FROM rate_buckets WHERE model = ?", (model,)
+            ).fetchone()
+            state = list(row) if row else [float(rpm), float(tpm), time.time(), 0.0]
+            result = change(state, rpm, tpm)
+            db.execute(
+                "INSERT OR REPLACE INTO rate_buckets (model, requests, tokens, updated_at, paused_until) VALUES (?, ?, ?, ?, ?)",
+                (model, *state),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return result
+
+    def take(self, model: str, tokens: int, now: float) -> float:
+        return self._update(model, lambda state, rpm, tpm: _take(state, rpm, tpm, tokens, now))
+
+    def settle(self, model: str, tokens: int):
+        def change(state, rpm, tpm):
+            state[1] = min(state[1] + tokens, float(tpm))
+
+        self._update(model, change)
+
+    def pause(self, model: str, until: float):
+        def change(state, rpm, tpm):
+            state[3] = max(state[3], until)
+
+        self._update(model, change)
+
+
+def _take(state: list, rpm: int, tpm: int, tokens: int, now: float) -> float:
+    requests, available, updated_at, paused_until = state
+    if now < paused_until:
+        return paused_until - now
+    elapsed = max(now - updated_at, 0.0)
+    requests = min(requests + elapsed * rpm / 60, rpm) if rpm else 0.0
+    available = min(available + elapsed * tpm / 60, tpm) if tpm else 0.0
+    state[0], state[1], state[2] = requests, available, now
+
+    # a single call larger than the bucket only needs a full bucket
+    tokens = min(tokens, tpm) if tpm else 0
+    waits = []
+    if rpm and requests < 1:
+        waits.append((1 - requests) * 60 / rpm)
+    if tpm and available < tokens:
+        waits.append((tokens - available) * 60 / tpm)
+    if waits:
+        return max(waits)
+    if rpm:
+        state[0] -= 1
+    if tpm:
+        state[1] -= tokens
+    return 0.0
+
+
+# ------------------ ADMISSION ------------------
+
+@dataclass(order=True)
+class _Waiter:
+    # enqueue time shifted by the priority class; lowest goes first
+    rank: float
+    seq: int
+    tokens: int = field(compare=False)
+    wake: object = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+
+
+@dataclass
+class Reservation:
+    model: str
+    tokens: int
+    waited: float
+
+
+class RateLimiter:
+    def __init__(self, buckets=None):
+        self.buckets = buckets or (SqliteBuckets(RATE_LIMIT_SHARED_PATH) if RATE_LIMIT_SHARED_PATH else MemoryBuckets())
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._seq = itertools.count()
+
+    def _advance(self, model: str) -> float:
+        """
+        Admit queued calls from the head of the model's queue while they fit.
+        Returns the seconds until the head fits (0 when the queue is empty).
+        Must be called with the lock held.
+        """
+        queue = self._queues.get(model)
+        while queue:
+            head = queue[0]
+            wait = self.buckets.take(model, head.tokens, time.time())
+            if wait > 0:
+                return wait
+            heapq.heappop(queue)
+            head.granted = True
+            head.wake()
+        return 0.0
+
+    def _waiter(self, tokens: int, priority: str, wake) -> _Waiter:
+        rank = time.monotonic() + PRIORITY_CLASSES.get(priority, 1) * LLM_PRIORITY_STEP_SECONDS
+        return _Waiter(rank, next(self._seq), tokens, wake)
+
+    def _enqueue(self, model: str, waiter: _Waiter) -> float:
+        heapq.heappush(self._queues.setdefault(model, []), waiter)
+        return self._advance(model)
+
+    def _poll(self, model: str, waiter: _Waiter) -> float:
+        return self._advance(model) if not waiter.granted else 0.0
+
+    def _leave(self, model: str, waiter: _Waiter):
+        # cancelled or timed out: leave the queue, or hand back a grant that raced in
+        if waiter.granted:
+            self._settle(model, waiter.tokens)
+        else:
+            self._withdraw(model, waiter)
+
+    def _settle(self, model: str, tokens: int):
+        self.buckets.settle(model, tokens)
+        self._advance(model)
+
+    def _locked(self, func, *args):
+        with self._lock:
+            return func(*args)
+
+    async def _run(self, func, *args):
+        """
+        func(*args) under the lock, on the I/O thread when the buckets block.
+        """
+        if not self.buckets.blocking:
+            return self._locked(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(_io_executor, self._locked, func, *args)
+
+    def _submit(self, func, *args):
+        """
+        func(*args) under the lock; handed to the I/O thread without waiting
+        when the buckets block.
+        """
+        if not self.buckets.blocking:
+            self._locked(func, *args)
+        else:
+            _io_executor.submit(self._locked, func, *args).add_done_callback(_log_failure)
+
+    def _withdraw(self, model: str, waiter: _Waiter):
+        queue = self._queues.get(model, [])
+        if waiter in queue:
+            queue.remove(waiter)
+            heapq.heapify(queue)
+        # the next waiter may fit now
+        self._advance(model)
+
+    def _finish(self, model: str, priority: str, started: float, tokens: int) -> Reservation:
+        waited = time.monotonic() - started
+        LLM_QUEUE_SECONDS.labels(model, priority).observe(waited)
+        return Reservation(model, tokens, waited)
+
+    def acquire_sync(self, model: str, tokens: int, priority: str = "standard", timeout: float = None) -> Reservation:
+        """
+        Block until the call is admitted. Raises AdmissionTimeout after `timeout` seconds.
+        """
+        started = time.monotonic()
+        if model_limits(model) == (0, 0):
+            return self._finish(model, priority, started, 0)
+        event = threading.Event()
+        waiter = self._waiter(tokens, priority, event.set)
+        with self._lock:
+            wait = self._enqueue(model, waiter)
+        while not waiter.granted:
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                with self._lock:
+                    if not waiter.granted:
+                        self._withdraw(model, waiter)
+                        raise AdmissionTimeout(f"{model} did not admit the call within {timeout:.1f}s")
+                break
+            event.wait(min(wait or 1.0, remaining) if remaining is not None else wait or 1.0)
+            with self._lock:
+                wait = self._poll(model, waiter)
+        return self._finish(model, priority, started, tokens)
+
+    async def acquire(self, model: str, tokens: int, priority: str = "standard", timeout: float = None) -> Reservation:
+        """
+        Async variant of acquire_sync; the event loop is never blocked.
+        """
+        started = time.monotonic()
+        if model_limits(model) == (0, 0):
+            return self._finish(model, priority, started, 0)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._waiter(tokens, priority, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            wait = await self._run(self._enqueue, model, waiter)
+            while not waiter.granted:
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    raise AdmissionTimeout(f"{model} did not admit the call within {timeout:.1f}s")
+                try:
+                    await asyncio.wait_for(event.wait(), min(wait or 1.0, remaining) if remaining is not None else wait or 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                wait = await self._run(self._poll, model, waiter)
+        except BaseException:
+            self._submit(self._leave, model, waiter)
+            raise
+        return self._finish(model, priority, started, tokens)
+
+    def settle(self, reservation: Reservation, used_tokens: int):
+        """
+        Return the unused part of the token estimate (or charge the overrun).
+        """
+        if reservation.tokens and used_tokens is not None:
+            self._submit(self._settle, reservation.model, reservation.tokens - used_tokens)
+
+    def pause(self, model: str, seconds: float):
+        """
+        Stop admitting calls to `model` for `seconds` (after a 429).
+        """
+        LLM_RATE_LIMITED.labels(model).inc()
+        logger.warning("model=%s rate limited, pausing admission for %.1fs", model, seconds)
+        self._submit(self.buckets.pause, model, time.time() + seconds)
+
+
+def estimate_tokens(texts, max_tokens: int = None) -> int:
+    """
+    Tokens a call is charged up front: the prompt plus the expected completion.
+    """
+    completion = min(max_tokens, LLM_COMPLETION_TOKEN_ESTIMATE) if max_tokens else LLM_COMPLETION_TOKEN_ESTIMATE
+    return sum(count_tokens(t) for t in texts if isinstance(t, str)) + completion
+
+
+def retry_after_seconds(error, attempt: int = 0) -> float:
+    """
+    Pause requested by a 429 response, from Retry-After / retry-after-ms headers.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return min(LLM_RATE_LIMIT_PAUSE_SECONDS * 2 ** attempt, 30.0)
+
+
+def _log_failure(future):
+    if future.exception():
+        logger.warning("rate limit bucket update failed: %s", future.exception())
+
+
+rate_limiter = RateLimiter()
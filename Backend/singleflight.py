@@ -0,0 +1,82 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+Double clicks, several open tabs or teammates asking for the same plan at
+once would otherwise each start their own LLM calls and crew runs. Calls with
+the same key share one computation: the first caller starts it, later callers
+await the same task and all of them get its result or its exception.
+
+A caller that disconnects only stops waiting; the computation is cancelled
+once no caller is left (work already handed to a worker thread still runs to
+completion there, its result is dropped).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+
+from metrics import COALESCED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(endpoint: str, payload) -> str:
+    """
+    Key for `payload` sent to `endpoint`; insensitive to key order and
+    surrounding whitespace.
+    """
+    body = json.dumps(_normalize(payload), sort_keys=True, ensure_ascii=False, default=str)
+    return f"{endpoint}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: str, factory):
+        """
+        Await `factory()` (a coroutine function), sharing the run with every
+        concurrent caller that uses the same key.
+        """
+        endpoint = key.split(":", 1)[0]
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(factory()))
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            COALESCED_REQUESTS.labels(endpoint, "leader").inc()
+        else:
+            logger.info("coalesced request endpoint=%s waiters=%d", endpoint, call.waiters + 1)
+            COALESCED_REQUESTS.labels(endpoint, "follower").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller went away: stop the work and let the next caller start fresh
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+inflight = SingleFlight()
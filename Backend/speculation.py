@@ -0,0 +1,163 @@
+"""
+Speculative precomputation of the artifacts that follow a plan.
+
+After a plan is generated or refined, the results page almost always asks
+for its dev categories, suggested dev tasks, per-category tasks and Jira
+tickets. With SPECULATION_ENABLED those calls are started in the background
+as soon as the plan exists, keyed by the same request keys the routes use:
+
+- a route whose result is ready is answered from it
+- a route whose job is running joins it through single-flight, and the job
+  is promoted from the "speculative" to its normal rate-limit priority
+- a route whose job has not started yet cancels it and runs as usual
+
+Speculative calls queue behind every user call (priority class
+"speculative", see rate_limiter) and at most SPECULATION_MAX_CONCURRENCY run
+at once. Refining a plan cancels the work for the version it replaced, and
+only the SPECULATION_MAX_PLANS most recent plans are kept. Token spend of
+work no user has asked for yet is counted in llm_speculative_* metrics.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from metrics import SPECULATIVE_JOBS, speculation_var
+from plan_sections import plan_hash
+from singleflight import inflight
+
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+SPECULATION_MAX_CONCURRENCY = int(os.getenv("SPECULATION_MAX_CONCURRENCY", "2"))
+SPECULATION_MAX_PLANS = int(os.getenv("SPECULATION_MAX_PLANS", "16"))
+# How long finished results are kept for the routes to pick up
+SPECULATION_TTL_SECONDS = int(os.getenv("SPECULATION_TTL_SECONDS", "900"))
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    def __init__(self, plan: str, key: str):
+        self.plan = plan
+        self.key = key
+        self.artifact = key.split(":", 1)[0]
+        # read by rate_limiter / metrics through speculation_var
+        self.priority = "speculative"
+        self.task = None
+        self.started = False
+        self.result = None
+        self.finished_at = None
+        self.used = False
+
+
+class Speculator:
+    def __init__(self):
+        # plan hash -> {request key: job}, oldest plan first
+        self._plans = OrderedDict()
+        self._jobs = {}
+        self._semaphore = None
+
+    def start(self, plan: str, jobs: dict):
+        """
+        Start `jobs` ({request key: coroutine function}) in the background for
+        `plan`. Keys that already have a job are left alone.
+        """
+        # plans are echoed back by clients, often with different surrounding whitespace
+        plan = (plan or "").strip()
+        if not SPECULATION_ENABLED or not plan:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(SPECULATION_MAX_CONCURRENCY)
+        self._expire()
+        digest = plan_hash(plan)
+        plan_jobs = self._plans.setdefault(digest, {})
+        self._plans.move_to_end(digest)
+        for key, factory in jobs.items():
+            if key in self._jobs:
+                continue
+            job = plan_jobs[key] = self._jobs[key] = _Job(plan, key)
+            job.task = asyncio.create_task(self._run(job, factory))
+            SPECULATIVE_JOBS.labels(job.artifact, "started").inc()
+        while len(self._plans) > SPECULATION_MAX_PLANS:
+            self._drop(next(iter(self._plans)), "evicted")
+        logger.info("speculating on plan=%s jobs=%d", digest, len(plan_jobs))
+
+    async def _run(self, job: _Job, factory):
+        speculation_var.set(job)
+        try:
+            async with self._semaphore:
+                job.started = True
+                job.result = await inflight.do(job.key, factory)
+            job.finished_at = time.monotonic()
+        except asyncio.CancelledError:
+            self._forget(job)
+            raise
+        except Exception as e:
+            logger.warning("speculative %s failed: %s", job.artifact, e)
+            SPECULATIVE_JOBS.labels(job.artifact, "failed").inc()
+            self._forget(job)
+
+    async def shared(self, key: str, factory):
+        """
+        Result for `key`: precomputed, joined from the running speculative
+        job, or computed now through single-flight.
+        """
+        job = self._jobs.get(key)
+        if job is not None:
+            if job.finished_at is not None:
+                if not job.used:
+                    SPECULATIVE_JOBS.labels(job.artifact, "hit").inc()
+                job.used = True
+                return job.result
+            if job.started:
+                SPECULATIVE_JOBS.labels(job.artifact, "attached").inc()
+                job.used = True
+                job.priority = None
+            else:
+                SPECULATIVE_JOBS.labels(job.artifact, "preempted").inc()
+                job.task.cancel()
+        return await inflight.do(key, factory)
+
+    def cancel(self, plan: str):
+        """
+        Stop the work for a plan that has been replaced (e.g. by a refinement).
+        """
+        if plan and plan.strip():
+            self._drop(plan_hash(plan.strip()), "cancelled")
+
+    def cancel_all(self):
+        for digest in list(self._plans):
+            self._drop(digest, "cancelled")
+
+    def _drop(self, digest: str, outcome: str):
+        for job in self._plans.pop(digest, {}).values():
+            self._jobs.pop(job.key, None)
+            if job.finished_at is None:
+                job.task.cancel()
+                SPECULATIVE_JOBS.labels(job.artifact, outcome).inc()
+            elif not job.used:
+                SPECULATIVE_JOBS.labels(job.artifact, "unused").inc()
+
+    def _forget(self, job: _Job):
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+            self._plans.get(plan_hash(job.plan), {}).pop(job.key, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - SPECULATION_TTL_SECONDS
+        for digest, jobs in list(self._plans.items()):
+            if not jobs or all(job.finished_at is not None and job.finished_at < cutoff for job in jobs.values()):
+                self._drop(digest, "expired")
+
+    def stats(self) -> dict:
+        jobs = list(self._jobs.values())
+        return {
+            "enabled": SPECULATION_ENABLED,
+            "plans": len(self._plans),
+            "pending": sum(not j.started for j in jobs),
+            "running": sum(j.started and j.finished_at is None for j in jobs),
+            "ready": sum(j.finished_at is not None for j in jobs),
+        }
+
+
+speculator = Speculator()
@@ -0,0 +1,187 @@
+"""
+Similarity index over past planning briefs, used to reuse stage outputs.
+
+Every finished pipeline run is stored with its normalized brief (the
+`agent_input` from normalize_input) and its stage outputs. For a new brief,
+past runs are ranked by Jaccard similarity over feature tokens (tech stack
+entries, team/budget/duration facts and description words). A stage's output
+is reused from a run above STAGE_REUSE_THRESHOLD when every field the stage
+declares in `reuse_fields` is identical in both briefs; stages that read the
+differing fields (or have no reuse_fields at all) run again.
+
+Everything lives in a local SQLite file, so the index works offline and is
+shared across restarts and workers: each lookup first picks up the runs
+recorded since the previous one, including those of other workers.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+STAGE_REUSE_ENABLED = os.getenv("STAGE_REUSE_ENABLED", "true").lower() == "true"
+STAGE_REUSE_PATH = os.getenv("STAGE_REUSE_PATH", "stage_runs.sqlite3")
+STAGE_REUSE_THRESHOLD = float(os.getenv("STAGE_REUSE_THRESHOLD", "0.6"))
+# Most recent runs kept (and compared against)
+STAGE_REUSE_MAX_RUNS = int(os.getenv("STAGE_REUSE_MAX_RUNS", "2000"))
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOPWORDS = {"a", "an", "and", "the", "for", "of", "to", "in", "on", "with", "we", "our", "is", "are", "be", "by", "as", "at"}
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_value(value):
+    if isinstance(value, (list, tuple)):
+        return sorted(str(v).strip().lower() for v in value if str(v).strip())
+    if value is None:
+        return ""
+    return str(value).strip().lower()
+
+
+def flatten_brief(agent_input: dict, prefix: str = "") -> dict:
+    """
+    {"techStack": {"frontend": [...]}} -> {"techStack.frontend": [...]}, values normalized.
+    """
+    fields = {}
+    for key, value in (agent_input or {}).items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            fields.update(flatten_brief(value, f"{path}."))
+        else:
+            fields[path] = _normalize_value(value)
+    return fields
+
+
+def brief_tokens(fields: dict) -> set:
+    tokens = set()
+    for path, value in fields.items():
+        if path in ("projectName", "projectDescription"):
+            tokens.update(f"text:{w}" for w in _WORD.findall(value) if w not in _STOPWORDS)
+        elif isinstance(value, list):
+            tokens.update(f"{path}={v}" for v in value)
+        elif value:
+            tokens.add(f"{path}={value}")
+    return tokens
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def fields_match(current: dict, previous: dict, reuse_fields) -> bool:
+    """
+    True when every field under each `reuse_fields` path (a field or a
+    prefix such as "techStack") has the same value in both briefs.
+    """
+    for path in reuse_fields:
+        paths = {p for p in (*current, *previous) if p == path or p.startswith(f"{path}.")}
+        if any(current.get(p, "") != previous.get(p, "") for p in paths):
+            return False
+    return True
+
+
+class StageRunIndex:
+    def __init__(self, path=STAGE_REUSE_PATH, max_runs=STAGE_REUSE_MAX_RUNS):
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._conn = None
+        # run id -> (flattened fields, tokens), refreshed from the file on every lookup
+        self._runs = {}
+        self._last_id = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS stage_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    brief TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    def _load(self) -> dict:
+        """
+        The index with the runs recorded since the last call added (by any worker).
+        """
+        rows = self._db().execute(
+            "SELECT id, brief FROM stage_runs WHERE id > ? ORDER BY id DESC LIMIT ?", (self._last_id, self.max_runs)
+        ).fetchall()
+        for run_id, brief in rows:
+            fields = flatten_brief(json.loads(brief))
+            self._runs[run_id] = (fields, brief_tokens(fields))
+            self._last_id = max(self._last_id, run_id)
+        while len(self._runs) > self.max_runs:
+            del self._runs[min(self._runs)]
+        return self._runs
+
+    def similar_runs(self, agent_input: dict, threshold: float = STAGE_REUSE_THRESHOLD) -> list:
+        """
+        [(similarity, run id, flattened fields)] for past runs at or above
+        `threshold`, most similar first.
+        """
+        fields = flatten_brief(agent_input)
+        tokens = brief_tokens(fields)
+        with self._lock:
+            runs = list(self._load().items())
+        scored = [(jaccard(tokens, run_tokens), run_id, run_fields) for run_id, (run_fields, run_tokens) in runs]
+        return sorted((s for s in scored if s[0] >= threshold), key=lambda s: (-s[0], -s[1]))
+
+    def outputs(self, run_id: int) -> dict:
+        with self._lock:
+            row = self._db().execute("SELECT outputs FROM stage_runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def reusable_outputs(self, agent_input: dict, stages) -> dict:
+        """
+        {stage name: (output, run id, similarity)} for the stages whose
+        output can be taken from a similar past run. A stage with
+        dependencies is only reused when all of them are.
+        """
+        candidates = self.similar_runs(agent_input)
+        if not candidates:
+            return {}
+        fields = flatten_brief(agent_input)
+        loaded = {}
+        reused = {}
+        for stage in stages:
+            if stage.reuse_fields is None or any(dep not in reused for dep in stage.depends_on):
+                continue
+            for similarity, run_id, run_fields in candidates:
+                if not fields_match(fields, run_fields, stage.reuse_fields):
+                    continue
+                if run_id not in loaded:
+                    loaded[run_id] = self.outputs(run_id)
+                if stage.name in loaded[run_id]:
+                    reused[stage.name] = (loaded[run_id][stage.name], run_id, similarity)
+                    break
+        return reused
+
+    def record(self, agent_input: dict, outputs: dict):
+        brief = json.dumps(agent_input, sort_keys=True, ensure_ascii=False, default=str)
+        with self._lock:
+            db = self._db()
+            run_id = db.execute(
+                "INSERT INTO stage_runs (brief, outputs, created_at) VALUES (?, ?, ?)",
+                (brief, json.dumps(outputs, ensure_ascii=False), time.time()),
+            ).lastrowid
+            db.execute(
+                "DELETE FROM stage_runs WHERE id IN (SELECT id FROM stage_runs ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                (self.max_runs,),
+            )
+            self._load()
+        return run_id
+
+
+stage_runs = StageRunIndex()
@@ -0,0 +1,98 @@
+from brief_extractor import LABELED, PATTERN, WEAK, extract_brief, find_tech, split_tech_list
+
+
+def mentioned(text: str) -> dict:
+    return {group: names for group, names in find_tech(text).items() if names}
+
+
+def test_everyday_words_are_not_tech():
+    brief = "We need a swift rollout of an express checkout. Designers will sketch flows in spring, with the CTO at the helm."
+    assert mentioned(brief) == {}
+    assert mentioned("A swift rollout of an express checkout … sketch flows in spring … at the helm") == {}
+
+
+def test_everyday_words_leave_tech_fields_weak():
+    result = extract_brief("A swift rollout of an express checkout, rails and node signage, led by the team at the helm.")
+    assert all(result.fields[group] == [] for group in ("frontend", "backend", "devops", "design"))
+    assert result.confidence["backend"] == WEAK
+
+
+def test_capitalized_mid_sentence_counts():
+    found = mentioned("The API runs on Node with Express and the iOS client is written in Swift. Mockups live in Sketch.")
+    assert found["backend"] == ["Node.js", "Express"]
+    assert found["frontend"] == ["Swift"]
+    assert found["design"] == ["Sketch"]
+
+
+def test_capitalized_at_sentence_start_needs_context():
+    assert mentioned("Swift delivery matters. Express shipping too.") == {}
+    assert mentioned("Flutter app for both stores.") == {"frontend": ["Flutter"]}
+
+
+def test_context_word_or_tech_neighbour_counts():
+    assert mentioned("deployed with helm charts")["devops"] == ["Helm"]
+    assert mentioned("a spring framework service")["backend"] == ["Spring Boot"]
+    assert mentioned("react, node and postgres") == {
+        "frontend": ["React"], "backend": ["Node.js"], "database": ["PostgreSQL"],
+    }
+
+
+def test_unambiguous_aliases_match_in_any_case():
+    assert mentioned("built with spring boot and express.js on nodejs")["backend"] == ["Node.js", "Express", "Spring Boot"]
+    assert mentioned("a swiftui client")["frontend"] == ["Swift"]
+
+
+def test_react_native_does_not_count_as_react():
+    assert mentioned("A React Native app")["frontend"] == ["React Native"]
+    assert mentioned("React Native app and a React admin")["frontend"] == ["React", "React Native"]
+
+
+def test_labeled_tech_lists_are_canonical():
+    assert split_tech_list("react, Node and postgres / n/a") == ["React", "Node.js", "PostgreSQL"]
+    result = extract_brief("Project Name: Atlas\nBackend: node, express\nTeam Size: 4")
+    assert result.fields["backend"] == ["Node.js", "Express"]
+    assert result.confidence["backend"] == LABELED
+    assert result.fields["teamSize"] == "4"
+
+
+def test_prose_patterns():
+    result = extract_brief(
+        "Project called \"Atlas\" for a client-facing portal. A team of five senior engineers, "
+        "fully remote, starting March 3, 2025 for 6 months with a budget of €250k. Frontend in React."
+    )
+    assert result.fields["projectName"] == "Atlas"
+    assert result.fields["teamSize"] == "5"
+    assert (result.fields["expectedDuration"], result.fields["durationUnit"]) == ("6", "months")
+    assert result.fields["startDate"] == "2025-03-03"
+    assert result.fields["budget"] == "€250k"
+    assert result.fields["category"] == "Client-facing"
+    assert result.fields["experience"] == "Advanced"
+    assert result.fields["locationType"] == "Remote"
+    assert result.confidence["frontend"] == PATTERN
+
+
+def test_low_confidence_lists_missing_fields():
+    result = extract_brief("Team Size: 3")
+    missing = result.low_confidence(0.7)
+    assert "teamSize" not in missing
+    assert "budget" in missing and "startDate" in missing
+
+
+def test_budget_drops_trailing_punctuation():
+    assert extract_brief("The budget is $50,000. Work starts soon.").fields["budget"] == "$50,000"
+    assert extract_brief("We can spend 1.2m EUR, no more.").fields["budget"] == "1.2m EUR"
+    assert extract_brief("Funding of €250k.").fields["budget"] == "€250k"
+
+
+def test_team_size_needs_team_context():
+    result = extract_brief("Pricing is 5 people per account, billed monthly.")
+    assert result.fields.get("teamSize") is None
+    assert "teamSize" in result.low_confidence(0.7)
+    assert extract_brief("A 6-person team will build it.").fields["teamSize"] == "6"
+    assert extract_brief("We have 3 senior backend developers.").fields["teamSize"] == "3"
+    assert extract_brief("A team of four.").fields["teamSize"] == "4"
+
+
+def test_labeled_team_size_is_a_plain_headcount():
+    assert extract_brief("Team Size: 5 people").fields["teamSize"] == "5"
+    assert extract_brief("Team Size: five").fields["teamSize"] == "5"
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+from urllib3.exceptions import NewConnectionError
+
+import jira_client
+
+TICKETS = [SimpleNamespace(summary=f"Task {i}", description="") for i in range(3)]
+
+
+class FakeSession:
+    """
+    Answers requests from `outcomes` in order: a status code or an exception to raise.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        issues = kwargs.get("json", {}).get("issueUpdates", [])
+        body = {"issues": [{"key": f"P-{i}"} for i in range(len(issues))]}
+        return SimpleNamespace(
+            status_code=outcome, headers={}, text=str(outcome), json=lambda: body if outcome == 201 else {},
+        )
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def use(*outcomes):
+        fake = FakeSession(*outcomes)
+        monkeypatch.setattr(jira_client, "get_session", lambda: fake)
+        return fake
+
+    monkeypatch.setattr(jira_client, "_backoff_delay", lambda attempt, retry_after=None: 0)
+    return use
+
+
+def refused():
+    return requests.ConnectionError(SimpleNamespace(reason=NewConnectionError(None, "refused")))
+
+
+def test_bulk_create_is_not_retried_after_a_server_error(session):
+    fake = session(502, 201)
+    results = jira_client.create_issue_batch(TICKETS)
+    assert fake.calls == 1
+    assert all("error" in r for r in results)
+
+
+def test_bulk_create_is_not_retried_after_a_read_timeout(session):
+    fake = session(requests.ReadTimeout(), 201)
+    results = jira_client.create_issue_batch(TICKETS)
+    assert fake.calls == 1
+    assert all("may have been created" in r["error"] for r in results)
+
+
+def test_bulk_create_is_retried_when_nothing_was_sent(session):
+    fake = session(429, requests.ConnectTimeout(), refused(), 201)
+    results = jira_client.create_issue_batch(TICKETS)
+    assert fake.calls == 4
+    assert [r["key"] for r in results] == ["P-0", "P-1", "P-2"]
+
+
+def test_idempotent_requests_still_retry_server_errors(session):
+    fake = session(503, requests.ReadTimeout(), 200)
+    response = jira_client.request_with_retry("GET", "https://jira.example/rest/api/3/myself", operation="myself")
+    assert response.status_code == 200
+    assert fake.calls == 3
@@ -0,0 +1,66 @@
+import pytest
+
+from json_stream import JsonItemStream, loads_tolerant, parse_json_items, repair_json, require_json_items
+
+SNIPPET = '{"snippet": "```python\\nprint(1)\\n```", "language": "python"}'
+
+
+def test_valid_json_keeps_fences_inside_strings():
+    assert loads_tolerant(SNIPPET)["snippet"] == "```python\nprint(1)\n```"
+    assert parse_json_items(SNIPPET)[0]["snippet"] == "```python\nprint(1)\n```"
+
+
+def test_fence_around_the_output_is_dropped():
+    assert parse_json_items('```json\n[{"summary": "a"}]\n```') == [{"summary": "a"}]
+    assert loads_tolerant("```json\n" + SNIPPET + "\n```")["snippet"] == "```python\nprint(1)\n```"
+    fenced_items = '```json\n[{"code": "```js\\nx()\\n```"}]\n```'
+    assert parse_json_items(fenced_items) == [{"code": "```js\nx()\n```"}]
+
+
+def test_prose_around_a_fenced_answer_is_dropped():
+    assert parse_json_items('Here you go:\n```json\n[1, 2]\n```\nAnything else?') == [1, 2]
+    assert loads_tolerant('Sure!\n```json\n{"a": "```"}\n```') == {"a": "```"}
+
+
+def test_repair_closes_a_truncated_tail():
+    assert loads_tolerant('```json\n[{"summary": "a"}, {"summary": "b", "descr') == [
+        {"summary": "a"}, {"summary": "b"},
+    ]
+    assert repair_json('{"a": [1, 2,]}') == '{"a": [1, 2]}'
+
+
+def test_object_wrapping_a_list_yields_the_list():
+    assert parse_json_items('{"tickets": [{"summary": "a"}]}') == [{"summary": "a"}]
+    assert parse_json_items('{"summary": "a"}') == [{"summary": "a"}]
+
+
+def test_stream_yields_items_as_they_complete():
+    stream = JsonItemStream()
+    assert stream.feed('```json\n[{"a": "```"}, {"b"') == [{"a": "```"}]
+    assert stream.feed(': 2}]\n```') == [{"b": 2}]
+
+
+def test_not_json_raises():
+    with pytest.raises(ValueError):
+        loads_tolerant("I cannot help with that.")
+
+
+@pytest.mark.parametrize("output", [
+    "I cannot help [sorry]",
+    "I'm sorry, but I can't help with that request.",
+    "Here are the tickets:\n\n- Set up CI\n- Add login",
+    "[]",
+    '{"tickets": []}',
+])
+def test_refusals_and_prose_are_not_valid_items(output):
+    with pytest.raises(ValueError):
+        require_json_items(output)
+
+
+def test_refusal_parses_to_no_items():
+    # what the routes return, but not what the cache may store
+    assert parse_json_items("I cannot help [sorry]") == []
+
+
+def test_items_are_valid():
+    assert require_json_items('Sure:\n```json\n[{"summary": "a"}]\n```') == [{"summary": "a"}]
@@ -0,0 +1,52 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+from json_stream import require_json_items
+from llm_cache import LLMCache
+
+
+@pytest.fixture
+def answers(monkeypatch, tmp_path):
+    """
+    chat_completion against a fresh cache, answered from the `answers` list in order.
+    """
+    queue = []
+
+    async def create(endpoint, model, messages, **params):
+        message = SimpleNamespace(content=queue.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)]), llm_client.route(endpoint, model).model
+
+    monkeypatch.setattr(llm_client, "_create", create)
+    monkeypatch.setattr(llm_client, "llm_cache", LLMCache(str(tmp_path / "llm_cache.sqlite3")))
+    monkeypatch.setattr(llm_client, "cache_enabled", lambda endpoint=None: True)
+    return queue
+
+
+def ask():
+    messages = [{"role": "user", "content": "tickets please"}]
+    return asyncio.run(llm_client.chat_completion(messages, endpoint="get-dev-categories", validate=require_json_items))
+
+
+def test_refusal_is_not_cached(answers):
+    answers.extend(["I cannot help [sorry]", '[{"name": "Frontend"}]'])
+    assert ask() == "I cannot help [sorry]"
+    assert ask() == '[{"name": "Frontend"}]'
+
+
+def test_valid_items_are_cached(answers):
+    answers.append('[{"name": "Frontend"}]')
+    assert ask() == '[{"name": "Frontend"}]'
+    assert ask() == '[{"name": "Frontend"}]'
+    assert not answers
+
+
+def test_cached_entry_the_validator_rejects_is_recomputed(answers):
+    llm_client.llm_cache.set(
+        llm_client.make_key(llm_client.route("get-dev-categories").model, [{"role": "user", "content": "tickets please"}]),
+        "[]",
+    )
+    answers.append('[{"name": "Backend"}]')
+    assert ask() == '[{"name": "Backend"}]'
@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import crew_setup
+import main
+from stage_reuse import StageRunIndex
+
+BRIEF = {
+    "projectName": "Atlas",
+    "projectDescription": "A web shop for handmade furniture with online payments and order tracking.",
+    "stakeholder": "Retail team",
+    "category": "Client-facing",
+    "startDate": "2025-03-01",
+    "expectedDuration": "6",
+    "durationUnit": "months",
+    "teamSize": "5",
+    "budget": "250000",
+    "experience": "Intermediate",
+    "locationType": "Remote",
+    "frontend": ["React"],
+    "backend": ["Node.js"],
+    "database": ["PostgreSQL"],
+    "cloud": ["AWS"],
+    "devops": ["Docker"],
+    "design": ["Figma"],
+    "otherTech": "Stripe",
+}
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    """
+    Runs /api/generate-project-plan without any LLM and returns the stages each request ran.
+    """
+    runs = []
+    plans = []
+
+    def run_stage(stage, summary, upstream, refresh=False):
+        runs[-1].append((stage.name, refresh))
+        return f"{stage.name} output"
+
+    async def write_plan(prompt, refresh=False):
+        plans.append(refresh)
+        return "plan"
+
+    monkeypatch.setattr(crew_setup, "run_stage", run_stage)
+    monkeypatch.setattr(crew_setup, "stage_runs", StageRunIndex(str(tmp_path / "stage_runs.sqlite3")))
+    monkeypatch.setattr(crew_setup, "CHECKPOINTS_ENABLED", False)
+    monkeypatch.setattr(main, "write_plan", write_plan)
+    client = TestClient(main.app)
+
+    def post(brief):
+        runs.append([])
+        response = client.post("/api/generate-project-plan", json=brief)
+        assert response.status_code == 200, response.text
+        return {name for name, _ in runs[-1]}
+
+    post.runs = runs
+    post.plans = plans
+    return post
+
+
+def test_structured_brief_is_normalized():
+    agent_input = main.normalize_input(main.ProjectInput(**BRIEF))
+    assert agent_input["projectName"] == "Atlas"
+    assert agent_input["techStack"]["frontend"] == ["React"]
+    assert agent_input["meta"]["teamSize"] == "5"
+
+
+def test_brief_differing_only_in_name_reuses_stages(pipeline):
+    all_stages = {s.name for s in crew_setup.PIPELINE_STAGES}
+    assert pipeline(BRIEF) == all_stages
+
+    ran = pipeline(dict(BRIEF, projectName="Borealis"))
+    assert {"risk", "trends"}.isdisjoint(ran)
+    assert "architecture" in ran
+
+
+def test_force_full_run_runs_every_stage(pipeline):
+    pipeline(BRIEF)
+    ran = pipeline(dict(BRIEF, projectName="Borealis", force_full_run=True))
+    assert ran == {s.name for s in crew_setup.PIPELINE_STAGES}
+    # and none of them is answered from the LLM cache
+    assert all(refresh for _, refresh in pipeline.runs[-1])
+    assert pipeline.plans == [False, True]
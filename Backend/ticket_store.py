@@ -0,0 +1,156 @@
+"""
+Local store for pushed Jira tickets.
+
+Tickets are appended to a SQLite database in WAL mode, so a push costs one
+insert per ticket no matter how long the history is, and concurrent workers
+never overwrite each other. Ticket key and summary are indexed for lookups.
+The old saved_tickets.json file is imported once on first use.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+TICKET_STORE_PATH = os.getenv("TICKET_STORE_PATH", "saved_tickets.sqlite3")
+LEGACY_TICKET_JSON_PATH = os.getenv("LEGACY_TICKET_JSON_PATH", "saved_tickets.json")
+
+TICKET_FIELDS = ("key", "summary", "description", "url", "error")
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    # one connection per thread; WAL lets readers run alongside the writer
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(TICKET_STORE_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+    return conn
+
+
+def init_store():
+    """
+    Create the schema and import the legacy JSON file once.
+    """
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn = _connect()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS saved_tickets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT,
+                    summary TEXT,
+                    description TEXT,
+                    url TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_saved_tickets_key ON saved_tickets(key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_saved_tickets_summary ON saved_tickets(summary COLLATE NOCASE)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_meta (name TEXT PRIMARY KEY, value TEXT)")
+        _migrate_legacy_json(conn)
+        _initialized = True
+
+
+def _migrate_legacy_json(conn: sqlite3.Connection):
+    """
+    Import the legacy JSON file. The check and the import share one
+    BEGIN IMMEDIATE transaction, so when several workers start at once
+    exactly one of them imports and the others see the marker.
+    """
+    if _legacy_migrated(conn) or not os.path.exists(LEGACY_TICKET_JSON_PATH):
+        return
+    try:
+        with open(LEGACY_TICKET_JSON_PATH, "r") as f:
+            legacy = json.load(f)
+    except Exception:
+        logger.exception("Could not read %s, skipping ticket migration", LEGACY_TICKET_JSON_PATH)
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if _legacy_migrated(conn):
+            conn.rollback()
+            return
+        _insert(conn, legacy)
+        conn.execute(
+            "INSERT OR IGNORE INTO store_meta (name, value) VALUES ('legacy_json_migrated', ?)",
+            (str(len(legacy)),),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("Migrated %d tickets from %s", len(legacy), LEGACY_TICKET_JSON_PATH)
+
+
+def _legacy_migrated(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM store_meta WHERE name = 'legacy_json_migrated'").fetchone() is not None
+
+
+def _insert(conn: sqlite3.Connection, tickets):
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO saved_tickets (key, summary, description, url, error, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        [tuple(ticket.get(name) for name in TICKET_FIELDS) + (now,) for ticket in tickets],
+    )
+
+
+def append_tickets(tickets):
+    """
+    Append push results ({"summary", "description", "key", "url"} or {"summary", "error"}).
+    """
+    init_store()
+    conn = _connect()
+    with conn:
+        _insert(conn, tickets)
+
+
+def _row_to_ticket(row: sqlite3.Row) -> dict:
+    ticket = {name: row[name] for name in TICKET_FIELDS if row[name] is not None}
+    ticket["id"] = row["id"]
+    ticket["created_at"] = row["created_at"]
+    return ticket
+
+
+def list_tickets(offset: int = 0, limit: int = 50, summary_prefix: Optional[str] = None) -> dict:
+    """
+    Newest tickets first, optionally filtered by a case-insensitive summary prefix.
+    """
+    init_store()
+    conn = _connect()
+    where, params = "", []
+    if summary_prefix:
+        escaped = summary_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where, params = "WHERE summary LIKE ? ESCAPE '\\'", [escaped + "%"]
+
+    total = conn.execute(f"SELECT COUNT(*) FROM saved_tickets {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM saved_tickets {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+        params + [limit, offset],
+    ).fetchall()
+    return {"items": [_row_to_ticket(row) for row in rows], "total": total, "offset": offset, "limit": limit}
+
+
+def get_ticket(key: str) -> Optional[dict]:
+    init_store()
+    row = _connect().execute(
+        "SELECT * FROM saved_tickets WHERE key = ? ORDER BY id DESC LIMIT 1", (key,)
+    ).fetchone()
+    return _row_to_ticket(row) if row else None
@@ -1,12 +1,14 @@
-import json
+import logging
 import os
-from openai import OpenAI
-from crew_setup import build_crew
+
+from brief_extractor import BRIEF_FIELDS, extract_brief
+from json_stream import loads_tolerant
+from crew_setup import run_pipeline
+from llm_client import chat_completion_sync
+from prompts import FREE_TEXT_EXTRACTION
 from pydantic import BaseModel
 from typing import List, Optional
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 class ProjectInput(BaseModel):
     projectName: str
     projectDescription: str
@@ -27,63 +29,83 @@ class ProjectInput(BaseModel):
     design: List[str]
     otherTech: Optional[str] = None
 
+logger = logging.getLogger(__name__)
+
+# Fields the rule-based extractor scores below this are filled in by the LLM.
+# Set above 1 to always use the LLM for every field.
+BRIEF_CONFIDENCE_THRESHOLD = float(os.getenv("BRIEF_CONFIDENCE_THRESHOLD", "0.7"))
+
 # ------------------ FREE TEXT EXTRACTION ------------------
 
-def call_llm_to_extract_json_from_free_text(free_text: str) -> str:
+FIELD_FORMATS = {
+    "projectName": "string",
+    "projectDescription": "string",
+    "stakeholder": "string",
+    "category": "string",
+    "startDate": 'string, e.g. "2023-01-01"',
+    "expectedDuration": 'string, e.g. "4"',
+    "durationUnit": 'string, e.g. "weeks"',
+    "teamSize": 'string, e.g. "5"',
+    "budget": "string",
+    "experience": "string",
+    "locationType": "string",
+    "frontend": "list of strings",
+    "backend": "list of strings",
+    "database": "list of strings",
+    "cloud": "list of strings",
+    "devops": "list of strings",
+    "design": "list of strings",
+    "otherTech": "optional string, or empty string if none",
+}
+
+
+def call_llm_to_extract_json_from_free_text(free_text: str, fields: List[str] = None) -> str:
     """
-    Call OpenAI to parse free-text brief into structured JSON fields.
+    Call OpenAI to parse free-text brief into structured JSON fields
+    (all of them, or only `fields`).
     Returns raw string (may include JSON or markdown formatting).
     """
-    prompt = f"""
-You are a software project planner. Extract the following fields from the project description below and respond ONLY with valid JSON matching the structure exactly:
-
-- projectName (string)
-- projectDescription (string)
-- stakeholder (string)
-- category (string)
-- startDate (string, e.g. "2023-01-01")
-- expectedDuration (string, e.g. "4")
-- durationUnit (string, e.g. "weeks")
-- teamSize (string, e.g. "5")
-- budget (string)
-- experience (string)
-- locationType (string)
-- frontend (list of strings)
-- backend (list of strings)
-- database (list of strings)
-- cloud (list of strings)
-- devops (list of strings)
-- design (list of strings)
-- otherTech (optional string, or empty string if none)
-
-Project description:
-
-\"\"\"{free_text}\"\"\"
-"""
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are a precise project planner."},
-            {"role": "user", "content": prompt},
-        ],
+    field_list = "\n".join(f"- {name} ({FIELD_FORMATS[name]})" for name in fields or BRIEF_FIELDS)
+    return chat_completion_sync(
+        messages=FREE_TEXT_EXTRACTION.messages(field_list, f'"""{free_text}"""'),
+        endpoint="free-text-extraction",
         temperature=0,
     )
-    return response.choices[0].message.content.strip()
 
 
 def try_extract_hidden_plan_json(raw_output: str) -> dict:
     """
     Attempt to extract JSON from raw LLM output.
-    Handles fenced code blocks or extra formatting.
+    Handles fenced code blocks, extra formatting and truncated output.
     """
     try:
-        return json.loads(raw_output)
-    except json.JSONDecodeError:
-        cleaned = raw_output.strip("```json").strip("```").strip()
-        try:
-            return json.loads(cleaned)
-        except Exception:
-            return None
+        brief = loads_tolerant(raw_output)
+    except ValueError:
+        return None
+    return brief if isinstance(brief, dict) else None
+
+
+def extract_free_text_brief(free_text: str) -> dict:
+    """
+    Rule-based extraction first; only the fields it is unsure about go to the LLM.
+    If that call fails, the rule-based values are used as they are.
+    """
+    extraction = extract_brief(free_text)
+    brief = dict(extraction.fields)
+    uncertain = extraction.low_confidence(BRIEF_CONFIDENCE_THRESHOLD)
+    logger.info("free-text brief: %d/%d fields extracted locally, LLM for %s",
+                len(BRIEF_FIELDS) - len(uncertain), len(BRIEF_FIELDS), uncertain or "none")
+    if not uncertain:
+        return brief
+
+    try:
+        llm_fields = try_extract_hidden_plan_json(call_llm_to_extract_json_from_free_text(free_text, uncertain)) or {}
+    except Exception:
+        logger.exception("LLM extraction failed, using rule-based values only")
+        return brief
+
+    brief.update({name: llm_fields[name] for name in uncertain if name in llm_fields})
+    return brief
 
 
 # ------------------ NORMALIZATION ------------------
@@ -123,8 +145,7 @@ def normalize_input(input_payload):
 
     elif isinstance(input_payload, str):
         # Free-text brief
-        raw_output = call_llm_to_extract_json_from_free_text(input_payload)
-        brief_json = try_extract_hidden_plan_json(raw_output)
+        brief_json = extract_free_text_brief(input_payload)
         if brief_json:
             return {
                 "projectName": brief_json.get("projectName", ""),
@@ -171,9 +192,10 @@ def normalize_input(input_payload):
 
 # ------------------ AGENT RUNNER ------------------
 
-def run_agents_wrapper(agent_input: dict):
+def run_agents_wrapper(agent_input: dict, force_full_run: bool = False) -> str:
     """
-    Wrapper that builds a Crew and kicks it off using normalized input.
+    Wrapper that runs the stage pipeline on normalized input.
+    Returns the merged stage outputs for build_prompt_from_agents.
+    `force_full_run` skips reusing stage outputs from similar past briefs.
     """
-    crew = build_crew(agent_input)
-    return crew.kickoff()
+    return run_pipeline(agent_input, force_full_run=force_full_run)